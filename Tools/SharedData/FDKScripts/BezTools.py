@@ -11,6 +11,7 @@ import sys
 import re
 import time
 import os
+from array import array
 import FDKUtils
 import ConvertFontToCID
 from fontTools.misc.psCharStrings import T2OutlineExtractor, SimpleT2Decompiler
@@ -34,16 +35,118 @@ def hintOn( i, hintMaskBytes):
 	return ((2**offset) & byteValue) > 0
 
 
+# Bez operators known to BezOutline. The op code stored in BezOutline.ops is the
+# index into this list. kBezOpText gives the text written for each op; the hint
+# replacement ops carry their "beginsubr"/"endsubr" prefixes.
+kBezOpNames = ["sc", "mt", "rmt", "hmt", "vmt", "rdt", "hdt", "vdt", "rct", "rcv", "vhct", "hvct", "cp", "ed",
+		"rb", "ry", "rm", "rv", "snc", "enc", "newcolors", "preflx1", "preflx2", "flx"]
+(kBezSC, kBezMT, kBezRMT, kBezHMT, kBezVMT, kBezRDT, kBezHDT, kBezVDT, kBezRCT, kBezRCV, kBezVHCT, kBezHVCT, kBezCP, kBezED,
+		kBezRB, kBezRY, kBezRM, kBezRV, kBezSNC, kBezENC, kBezNewColors, kBezPreFlx1, kBezPreFlx2, kBezFlx) = range(len(kBezOpNames))
+kBezOpCodes = dict(zip(kBezOpNames, range(len(kBezOpNames))))
+kBezOpText = kBezOpNames[:]
+kBezOpText[kBezSNC] = "beginsubr snc"
+kBezOpText[kBezENC] = "endsubr enc"
+# The usual number of operands for each op.
+kBezArgCounts = [0, 2, 2, 1, 1, 2, 1, 1, 6, 6, 4, 4, 0, 0,
+		2, 2, 2, 2, 0, 0, 0, 0, 0, 12]
+kBezArgCountTable = "".join(map(chr, kBezArgCounts)).ljust(256, "\0")
+# Format strings used by BezOutline.toBez, keyed by (op code, number of operands).
+kBezOpFormats = {}
+kBezCommentPat = re.compile(r"%.+?\n")
+
+class BezOutline:
+	# Compact in-memory form of a bez outline. 'ops' holds one op code per bez operator,
+	# 'argCounts' the number of operands of each operator, and 'args' all the operands,
+	# in order. Tools can pass a BezOutline around in place of the bez text; toBez() is
+	# only needed where the text goes to the AC or checkOutlines engines.
+	def __init__(self, ops = None, args = None, argCounts = None):
+		if ops == None:
+			ops = array("B")
+		if args == None:
+			args = array("d")
+		if argCounts == None:
+			argCounts = array("B", ops.tostring().translate(kBezArgCountTable))
+		self.ops = ops
+		self.args = args
+		self.argCounts = argCounts
+
+	def __len__(self):
+		return len(self.ops)
+
+	def getOps(self):
+		# Return a list of (opName, argList) tuples. Integral operands are returned as ints.
+		vals = self.args.tolist()
+		nums = map(int, vals)
+		if nums != vals:
+			nums = [iv if iv == v else v for iv, v in zip(nums, vals)]
+		opList = []
+		pos = 0
+		for code, numArgs in zip(self.ops, self.argCounts):
+			opList.append((kBezOpNames[code], nums[pos:pos+numArgs]))
+			pos += numArgs
+		return opList
+
+	def toBez(self):
+		# Build a single format string for the whole outline, and apply it to all the
+		# operands at once. Fractional values are written in the bez form "<value*100> 100 div".
+		vals = self.args.tolist()
+		ints = map(int, vals)
+		if ints != vals:
+			ints = [str(iv) if iv == v else "%s 100 div" % int(v*100) for iv, v in zip(ints, vals)]
+		opFormats = kBezOpFormats
+		fmtList = []
+		for key in zip(self.ops, self.argCounts):
+			fmt = opFormats.get(key)
+			if fmt == None:
+				code, numArgs = key
+				fmt = opFormats[key] = "%s " * numArgs + kBezOpText[code] + "\n"
+			fmtList.append(fmt)
+		return "".join(fmtList) % tuple(ints)
+
+	def fromBez(bezString):
+		# Parse bez text, as written by the AC and checkOutlines engines, into a BezOutline.
+		if "%" in bezString:
+			bezString = kBezCommentPat.sub("", bezString) # supress comments
+		getCode = kBezOpCodes.get
+		ops = []
+		argCounts = []
+		args = []
+		numArgs = 0
+		for token in bezString.split():
+			code = getCode(token)
+			if code != None:
+				ops.append(code)
+				argCounts.append(numArgs)
+				numArgs = 0
+				continue
+			try:
+				args.append(int(token))
+				numArgs += 1
+			except ValueError:
+				if token == "div":
+					args[-2:] = [args[-2]/float(args[-1])]
+					numArgs -= 1
+				elif token not in ["beginsubr", "endsubr"]:
+					print "Unhandled operation", args[len(args) - numArgs:], token
+					raise KeyError
+		if numArgs:
+			del args[-numArgs:]
+		return BezOutline(array("B", ops), array("d", args), array("B", argCounts))
+	fromBez = staticmethod(fromBez)
+
+
 class T2ToBezExtractor(T2OutlineExtractor):
 	# The T2OutlineExtractor class calls a class method as the handler for each T2 operator.
-	# I use this to convert the T2 operands and arguments to bez operators.
+	# I use this to convert the T2 operands and arguments to bez operators, which are
+	# collected as op codes in self.ops and operands in self.args.
 	# Note: flex is converted to regulsr rcurveto's.
 	# cntrmasks just map to hint replacement blocks with the specified stems.
 	def __init__(self, localSubrs, globalSubrs, nominalWidthX, defaultWidthX, removeHints = 0):
 		T2OutlineExtractor.__init__(self, None, localSubrs, globalSubrs, nominalWidthX, defaultWidthX)
 		self.vhints = []
 		self.hhints = []
-		self.bezProgram = []
+		self.ops = []
+		self.args = []
 		self.removeHints = removeHints
 		self.firstMarkingOpSeen = 0
 		self.closePathSeen = 0
@@ -60,28 +163,33 @@ class T2ToBezExtractor(T2OutlineExtractor):
 		self._nextPoint(point)
 		if not self.firstMarkingOpSeen :
 			self.firstMarkingOpSeen = 1
-			self.bezProgram.append("sc\n")
+			self.ops.append(kBezSC)
 		debugMsg("moveto", point, "curpos", self.currentPoint)
 		dx = int(point[0])
 		dy = int(point[1])
 		if dy == 0:
 			if dx != 0:
-				self.bezProgram.append("%s hmt\n" % dx)
+				self.ops.append(kBezHMT)
+				self.args.append(dx)
 			else:
-				self.bezProgram.append("0 0 rmt\n" )
+				self.ops.append(kBezRMT)
+				self.args.extend((0, 0))
 
 		elif  dx == 0:
-			self.bezProgram.append("%s vmt\n" % dy)
+			self.ops.append(kBezVMT)
+			self.args.append(dy)
 		else:
-			self.bezProgram.append("%s  %s rmt\n" % (point[0], point[1]))
+			self.ops.append(kBezRMT)
+			self.args.extend((point[0], point[1]))
 		self.sawMoveTo = 1
 
 	def rLineTo(self, point):
 		self._nextPoint(point)
 		if not self.firstMarkingOpSeen :
 			self.firstMarkingOpSeen = 1
-			self.bezProgram.append("sc\n")
-			self.bezProgram.append("0 0 mt\n")
+			self.ops.append(kBezSC)
+			self.ops.append(kBezMT)
+			self.args.extend((0, 0))
 		debugMsg("lineto", point, "curpos", self.currentPoint)
 		if not self.sawMoveTo:
 			self.rMoveTo((0, 0))
@@ -89,14 +197,18 @@ class T2ToBezExtractor(T2OutlineExtractor):
 		dy = int(point[1])
 		if dy == 0:
 			if dx != 0:
-				self.bezProgram.append("%s hdt\n" % dx)
+				self.ops.append(kBezHDT)
+				self.args.append(dx)
 			else:
-				self.bezProgram.append("0 0 rdt\n")
+				self.ops.append(kBezRDT)
+				self.args.extend((0, 0))
 			
 		elif  dx == 0:
-			self.bezProgram.append("%s vdt\n" % dy)
+			self.ops.append(kBezVDT)
+			self.args.append(dy)
 		else :
-			self.bezProgram.append("%s  %s rdt\n" % (dx,dy))
+			self.ops.append(kBezRDT)
+			self.args.extend((dx, dy))
 
 	def rCurveTo(self, pt1, pt2, pt3):
 		self._nextPoint(pt1)
@@ -104,17 +216,21 @@ class T2ToBezExtractor(T2OutlineExtractor):
 		self._nextPoint(pt3)
 		if not self.firstMarkingOpSeen :
 			self.firstMarkingOpSeen = 1
-			self.bezProgram.append("sc\n")
-			self.bezProgram.append("0 0 mt\n")
+			self.ops.append(kBezSC)
+			self.ops.append(kBezMT)
+			self.args.extend((0, 0))
 		debugMsg("curveto", pt1, pt2, pt3, "curpos", self.currentPoint)
 		if not self.sawMoveTo:
 			self.rMoveTo((0, 0))
 		if pt1[0] == 0 and pt3[1] == 0:
-			self.bezProgram.append("%s %s %s %s vhct\n" %  (int(pt1[1]),  int(pt2[0]), int(pt2[1]),  int(pt3[0])))
+			self.ops.append(kBezVHCT)
+			self.args.extend((int(pt1[1]),  int(pt2[0]), int(pt2[1]),  int(pt3[0])))
 		elif   pt1[1] == 0 and pt3[0] == 0:
-			self.bezProgram.append("%s %s %s %s hvct\n" %  (int(pt1[0]),  int(pt2[0]),  int(pt2[1]),  int(pt3[1])))
+			self.ops.append(kBezHVCT)
+			self.args.extend((int(pt1[0]),  int(pt2[0]),  int(pt2[1]),  int(pt3[1])))
 		else:
-			self.bezProgram.append("%s %s %s %s %s %s rct\n" %  (int(pt1[0]),  int(pt1[1]),  int(pt2[0]),  int(pt2[1]),  int(pt3[0]),  int(pt3[1])))
+			self.ops.append(kBezRCT)
+			self.args.extend((int(pt1[0]),  int(pt1[1]),  int(pt2[0]),  int(pt2[1]),  int(pt3[0]),  int(pt3[1])))
 
 	def op_endchar(self, index):
 		self.endPath()
@@ -127,14 +243,14 @@ class T2ToBezExtractor(T2OutlineExtractor):
 		# finishing a sub path.
 		if self.sawMoveTo:
 			debugMsg("endPath")
-			self.bezProgram.append("cp\n")
+			self.ops.append(kBezCP)
 		self.sawMoveTo = 0
 	def closePath(self):
 		self.closePathSeen = 1
 		debugMsg("closePath")
-		if self.bezProgram and self.bezProgram[-1] != "cp\n":
-			self.bezProgram.append("cp\n")
-		self.bezProgram.append("ed\n")
+		if self.ops and self.ops[-1] != kBezCP:
+			self.ops.append(kBezCP)
+		self.ops.append(kBezED)
 
 	def updateHints(self, args,  hintList, bezCommand, writeHints = 1):
 		self.countHints(args)
@@ -146,43 +262,19 @@ class T2ToBezExtractor(T2OutlineExtractor):
 		if not writeHints:
 			return
 
-		lastval = args[0]
-		if type(lastval) == LongType:
-			lastval = float(lastval)/0x10000
-			arg = str(lastval) + " 100 div"
-		else:
-			arg = str(lastval)
-		hintList.append(arg)
-		self.bezProgram.append(arg)
-
-		for i in range(len(args))[1:]:
-			val = args[i]
-			if type(val) == LongType:
-				val = float(val)/0x10000
-			newVal =  lastval + val
-			lastval = newVal
-
-			if i % 2:
-				if (type(val) == FloatType):
-					if (int(val) != val):
-						arg = str(int(val*100)) + " 100 div"
-					else:
-						arg = str(int(val))
-				else:
-					arg = str(val)
-				hintList.append( arg )
-				self.bezProgram.append(arg)
-				self.bezProgram.append(bezCommand + "\n")
-			else:
-				if (type(newVal) == FloatType):
-					if (int(newVal) != newVal):
-						arg = str(int(newVal*100)) + " 100 div"
-					else:
-						arg = str(int(newVal))
-				else:
-					arg = str(newVal)
-				hintList.append( arg )
-				self.bezProgram.append(arg)
+		lastval = 0
+		for i in range(0, len(args) - 1, 2):
+			pos = args[i]
+			width = args[i+1]
+			if type(pos) == LongType:
+				pos = float(pos)/0x10000
+			if type(width) == LongType:
+				width = float(width)/0x10000
+			pos = lastval + pos
+			lastval = pos + width
+			hintList.extend([pos, width])
+			self.ops.append(kBezOpCodes[bezCommand])
+			self.args.extend((pos, width))
 
 
 	def op_hstem(self, index):
@@ -240,20 +332,15 @@ class T2ToBezExtractor(T2OutlineExtractor):
 			mask = [strout + hex(ord(ch)) for ch in self.hintMaskString]
 			debugMsg(bezCommand, mask, curhhints, curvhints, args)
 	
-			self.bezProgram.append("beginsubr snc\n")
-			i = 0
-			for hint in curhhints:
-				self.bezProgram.append(str(hint))
-				if i %2:
-					self.bezProgram.append("rb\n")
-				i +=1 
-			i = 0
-			for hint in curvhints:
-				self.bezProgram.append(str(hint))
-				if i %2:
-					self.bezProgram.append("ry\n")
-				i +=1 
-			self.bezProgram.extend(["endsubr enc\n", "newcolors\n"])
+			self.ops.append(kBezSNC)
+			for i in range(0, len(curhhints), 2):
+				self.ops.append(kBezRB)
+				self.args.extend((curhhints[i], curhhints[i+1]))
+			for i in range(0, len(curvhints), 2):
+				self.ops.append(kBezRY)
+				self.args.extend((curvhints[i], curvhints[i+1]))
+			self.ops.append(kBezENC)
+			self.ops.append(kBezNewColors)
 		return self.hintMaskString, index
 
 	def op_hintmask(self, index):
@@ -268,9 +355,8 @@ class T2ToBezExtractor(T2OutlineExtractor):
 	def countHints(self, args):
 		self.hintCount = self.hintCount + len(args) / 2
 
-def convertT2GlyphToBez(t2CharString, removeHints = 0):
+def convertT2GlyphToBezOutline(t2CharString, removeHints = 0):
 	# wrapper for T2ToBezExtractor which applies it to the supplied T2 charstring
-	bezString = ""
 	subrs = getattr(t2CharString.private, "Subrs", [])
 	extractor = T2ToBezExtractor(subrs, t2CharString.globalSubrs,
 				t2CharString.private.nominalWidthX, t2CharString.private.defaultWidthX, removeHints)
@@ -279,7 +365,12 @@ def convertT2GlyphToBez(t2CharString, removeHints = 0):
 		t2Wdth = extractor.width - t2CharString.private.nominalWidthX
 	else:
 		t2Wdth = None
-	return "".join(extractor.bezProgram), extractor.hintCount > 0, t2Wdth
+	outline = BezOutline(array("B", extractor.ops), array("d", extractor.args))
+	return outline, extractor.hintCount > 0, t2Wdth
+
+def convertT2GlyphToBez(t2CharString, removeHints = 0):
+	outline, hasHints, t2Wdth = convertT2GlyphToBezOutline(t2CharString, removeHints)
+	return outline.toBez(), hasHints, t2Wdth
 	
 class HintMask:
 	# class used to collect hints for the current hint mask when converting bez to T2.
@@ -862,8 +953,9 @@ def buildControlMaskList(hStem3List, vStem3List):
 	return controlMaskList
 				
 
-def convertBezToT2(bezString):
+def convertBezToT2(bezData):
 	# convert bez data to a T2 outline program, a list of operator tokens.
+	# bezData may be either bez text or a BezOutline.
 	#
 	# Convert all bez ops to simplest T2 equivalent
 	# Add all hints to vertical and horizontal hint lists as encountered; insert a HintMask class whenever a
@@ -872,9 +964,11 @@ def convertBezToT2(bezString):
 	# add all hints as prefix
 	# review operator list to optimize T2 operators.
 	
-	bezString = re.sub(r"%.+?\n", "", bezString) # supress comments
-	bezList = re.findall(r"(\S+)", bezString)
-	if not bezList:
+	if isinstance(bezData, BezOutline):
+		outline = bezData
+	else:
+		outline = BezOutline.fromBez(bezData)
+	if not outline:
 		return ""
 	hhints = []
 	vhints = []
@@ -889,20 +983,10 @@ def convertBezToT2(bezString):
 
 	lastPathOp = None
 	
-	for token in bezList:
-		try:
-			val = int(token)
-			argList.append(val)
-			continue
-		except ValueError:
-			pass
-
+	for token, argList in outline.getOps():
 		if token == "newcolors":
 			lastPathOp = token
 			pass
-		elif token in ["beginsubr", "endsubr"]:
-			lastPathOp = token
-			pass
 		elif token in ["snc"]:
 			lastPathOp = token
 			hintMask = HintMask(len(t2List)) # The index into the t2list is kept so we can quickly find them later.
@@ -911,10 +995,6 @@ def convertBezToT2(bezString):
 		elif token in ["enc"]:
 			lastPathOp = token
 			pass
-		elif token == "div":
-			# i specifically do NOT set lastPathOp for this.
-			value = argList[-2]/float(argList[-1])
-			argList[-2:] =[value]
 		elif token == "rb":
 			lastPathOp = token
 			try:
@@ -1105,13 +1185,12 @@ class CFFFontData:
 		psName = self.cffTable.cff.fontNames[0]
 		return psName
 		
-	def convertToBez(self, glyphName, removeHints, beVerbose):
+	def convertToBezOutline(self, glyphName, removeHints, beVerbose):
+		# Same as convertToBez, but returns a BezOutline rather than bez text.
 		gid = self.charStrings.charStrings[glyphName]
 		t2CharString = self.charStringIndex[gid]
 		try:
-			bezString, hasHints, t2Wdth = convertT2GlyphToBez(t2CharString, removeHints)
-			# Note: the glyph name is important, as it is used by autohintexe for various heurisitics, including [hv]stem3 derivation.
-			bezString  = (r"%%%s%ssc " % (glyphName, os.linesep)) + bezString
+			outline, hasHints, t2Wdth = convertT2GlyphToBezOutline(t2CharString, removeHints)
 		except SEACError:
 			t2Wdth = None
 			if not beVerbose:
@@ -1119,10 +1198,19 @@ class CFFFontData:
 				self.logMsg("") # end series of "."
 				self.logMsg("Checking %s -- ," % (glyphName)) # output message when SEAC glyph is found
 			self.logMsg("Skipping %s: can't process SEAC composite glyphs." % (glyphName))
-			bezString = None
+			outline = None
+		return outline, t2Wdth
+
+	def convertToBez(self, glyphName, removeHints, beVerbose):
+		outline, t2Wdth = self.convertToBezOutline(glyphName, removeHints, beVerbose)
+		if outline == None:
+			return None, t2Wdth
+		# Note: the glyph name is important, as it is used by autohintexe for various heurisitics, including [hv]stem3 derivation.
+		bezString  = (r"%%%s%ssc " % (glyphName, os.linesep)) + outline.toBez()
 		return bezString, t2Wdth		
 
 	def updateFromBez(self, bezData, glyphName, width, beVerbose):
+		# bezData may be either bez text or a BezOutline.
 		t2Program = [width] + convertBezToT2(bezData)
 		if t2Program:
 			gid = self.charStrings.charStrings[glyphName]
@@ -1412,5 +1500,46 @@ def test2():
 	t2Program = convertBezToT2(bezString)
 	
 
+def benchmarkBezConversion(fontPath, repeat = 3):
+	# Report the per-glyph cost of each step of the T2 <-> bez conversion for all the
+	# glyphs of a CFF-based OpenType font. Times are the best of 'repeat' runs.
+	from fontTools.ttLib import TTFont
+	ttFont = TTFont(fontPath)
+	topDict = ttFont["CFF "].cff.topDictIndex[0]
+	charStrings = topDict.CharStrings
+	t2CharStrings = []
+	for glyphName in ttFont.getGlyphOrder():
+		t2CharString = charStrings[glyphName]
+		try:
+			convertT2GlyphToBezOutline(t2CharString, 1)
+		except SEACError:
+			continue
+		t2CharStrings.append(t2CharString)
+	outlines = [convertT2GlyphToBezOutline(t2CharString, 1)[0] for t2CharString in t2CharStrings]
+	bezStrings = [outline.toBez() for outline in outlines]
+	steps = [
+		("T2 -> BezOutline", convertT2GlyphToBezOutline, t2CharStrings),
+		("BezOutline -> bez text", BezOutline.toBez, outlines),
+		("bez text -> BezOutline", BezOutline.fromBez, bezStrings),
+		("BezOutline -> T2", convertBezToT2, outlines),
+		("bez text -> T2", convertBezToT2, bezStrings),
+		]
+	numGlyphs = max(len(t2CharStrings), 1)
+	print "%s: %s glyphs" % (fontPath, len(t2CharStrings))
+	for label, func, items in steps:
+		best = None
+		for i in range(repeat):
+			start = time.time()
+			for item in items:
+				func(item)
+			elapsed = time.time() - start
+			if best == None or elapsed < best:
+				best = elapsed
+		print "%-24s %8.1f usec/glyph" % (label, 1e6*best/numGlyphs)
+
 if __name__=='__main__':
-	test2()
+	if len(sys.argv) > 2 and sys.argv[1] == "-bench":
+		for path in sys.argv[2:]:
+			benchmarkBezConversion(path)
+	else:
+		test2()
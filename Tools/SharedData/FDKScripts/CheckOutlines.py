@@ -7,7 +7,7 @@ CheckOutlines v1.23 April 16 2014
 
 Outline checking program for OpenType/CFF fonts.
 
-Usage: checkOutlines [-h]  [-u] [-he] -g <glyph list>] [-gf <glyphNameList>][-e] [-v] [-s] [-x] [-3] [-4] [-I] [-i] [-O] [-V] [-k] [-C <tol>] [-L <tol>] [-S <tol>] [-K <tol>] [-log <path>] [-o outputFile] input-font-file
+Usage: checkOutlines [-h]  [-u] [-he] -g <glyph list>] [-gf <glyphNameList>][-e] [-v] [-s] [-x] [-3] [-4] [-I] [-i] [-O] [-V] [-k] [-C <tol>] [-L <tol>] [-S <tol>] [-K <tol>] [-j <n>] [-log <path>] [-o outputFile] input-font-file
 Example:  checkOutlines -e -g A-B -o test.otf  MyNewFont.otf
 """
 
@@ -75,6 +75,10 @@ orientation problems, which always need to be fixed.
 
 -v	Verbose mode. Reports progress, as well as warnings.
 
+-j <n>	Check glyphs using <n> worker processes. The glyph reports are
+	collected and written in glyph order, as with one process. The
+	default is 1.
+
 -s	Check curve smoothness: default off.
 	This test checks that two curve segments come together such that there 
 	is no angle at the join. Another way of saying this is that the two 
@@ -318,6 +322,7 @@ import FDKUtils
 from BezTools import *
 import ufoTools
 import shutil
+import multiprocessing
 
 haveFocus = 1
 debug = 0
@@ -325,8 +330,7 @@ kDefaultLogFileName = "checkOutlines.log"
 gLogFile = None
 kSrcGLIFHashMap = "com.adobe.type.checkOutlinesHashMap"
 
-kTempFilepath = tempfile.mktemp()
-kTempFilepathOut = kTempFilepath + ".new"
+kCheckBatchSize = 100 # Number of glyphs handed to a worker process at a time.
 kTempCFFSuffix = ".temp.ac.cff"
 
 class focusOptions:
@@ -352,6 +356,7 @@ class focusOptions:
 		self.emSquare = ""
 		self.skipIfUnchanged = False
 		self.checkAll = False # overrides skipIfUnchanged: forces all glyphs to be processed even if src hasn't changed.
+		self.numWorkers = 1
 
 
 class FDKEnvironmentError(AttributeError):
@@ -546,6 +551,14 @@ def getOptions():
 			options.logFilePath = sys.argv[i]
 		elif arg == "-all":
 			options.checkAll = True
+		elif arg == "-j":
+			i = i + 1
+			try:
+				options.numWorkers = int(sys.argv[i])
+			except (IndexError, ValueError):
+				raise focusOptionParseError("Option Error: '-j' must be followed by the number of worker processes.")
+			if options.numWorkers < 1:
+				raise focusOptionParseError("Option Error: the number of worker processes following '-j' must be at least 1.")
 		elif arg[0] == "-":
 			raise focusOptionParseError("Option Error: Unknown option <%s>." %  arg) 
 		else:
@@ -747,6 +760,43 @@ def openOpenTypeFile(path, outFilePath):
 	return fontData
 
 
+def checkGlyphBatch(task):
+	# Run checkoutlinesexe on each bez string in a list, and return a list of
+	# (log text, fixed bez string or None). checkoutlinesexe takes only one bez
+	# file per call. Each batch uses its own scratch directory, so that several
+	# batches, or several checkOutlines jobs, can run at the same time. This is
+	# also the worker function for the -j option.
+	argList, bezList, debugMode = task
+	tempDir = tempfile.mkdtemp(prefix="checkOutlines")
+	bezPath = os.path.join(tempDir, "glyph.bez")
+	newBezPath = bezPath + ".new"
+	resultList = []
+	try:
+		for bezString in bezList:
+			if os.path.exists(newBezPath):
+				os.remove(newBezPath)
+			fp = open(bezPath, "wt")
+			fp.write(bezString)
+			fp.close()
+			command = argList + [bezPath]
+			if debugMode:
+				print "calling command", " ".join(command)
+			log = FDKUtils.runCmd(command)
+			# The suffix saying what bez file was written isn't useful here.
+			log = re.sub(r"Wrote fixed file.+\s*", "", log)
+			newBezString = None
+			if os.path.exists(newBezPath):
+				fp = open(newBezPath, "rt")
+				newBezString = fp.read()
+				fp.close()
+			resultList.append((log, newBezString))
+	finally:
+		if debugMode:
+			print "Temp bez files in", tempDir
+		else:
+			shutil.rmtree(tempDir, True)
+	return resultList
+
 def checkFile(path, options):
 	#    use fontTools library to open font and extract CFF table. 
 	#    If error, skip font and report error.
@@ -781,24 +831,13 @@ def checkFile(path, options):
 			
 	arg_string = buildArgString(options)
 		
-	dotCount = 0		
+	argList = ["checkoutlinesexe", "-o"] + arg_string.split()
+		
 	seenGlyphCount = 0
 	processedGlyphCount = 0
+	checkJobList = [] # [glyph name, width, bez string]
 	for name in glyphList:
 		seenGlyphCount +=1 
-		if options.beVerbose:
-			logMsg("Checking %s -- ," % ( aliasName(name) )) # output message when -v option is used
-		else:
-			logMsg(".,")
-			dotCount += 1
-			if dotCount > 40:
-				dotCount = 0
-				logMsg("") # I do this to never have more than 40 dots on a line.
-				# This in turn give reasonable performance when calling checkOutlines in a subprocess
-				# and getting output with std.readline()
-
-		if os.path.exists(kTempFilepathOut):
-			os.remove(kTempFilepathOut)
 		
 		# 	Convert to bez format
 		bezString, width= fontData.convertToBez(name, removeHints, options.beVerbose)
@@ -810,32 +849,54 @@ def checkFile(path, options):
 		if "mt" not in bezString:
 			# skip empty glyphs.
 			continue
-			
-		# write bez file and run checkoutlinesexe
-		fp = open(kTempFilepath, "wt")
-		fp.write(bezString)
-		fp.close()
-		command = "checkoutlinesexe -o %s %s" % (arg_string, kTempFilepath)
-		if debug:
-			print "calling command", command
-		log = FDKUtils.runShellCmd(command)
-		# The suffix saying what bez file was written isn't useful here.
-		log = re.sub(r"Wrote fixed file.+\s*", "", log)
-		if log:
-			if not options.beVerbose:
-				dotCount = 0
-				logMsg("")
-				logMsg("Checking %s -- ," % (aliasName(name))) # output message when -v option is NOT used
-				logMsg(log)
-			else:
-				logMsg(log)
-		if  options.allowChanges and os.path.exists(kTempFilepathOut):
-			fp = open(kTempFilepathOut, "rt")
-			bezData = fp.read()
-			fp.close()
-			if bezData != bezString:
-				fontData.updateFromBez(bezData, name, width, options.beVerbose)
-			seenChangedGlyph = 1
+		checkJobList.append([name, width, bezString])
+
+	# Run checkoutlinesexe on batches of glyphs. With -j the batches are spread over a pool of
+	# worker processes; imap returns the results in batch order, so the reports are written,
+	# and the fixed glyphs are updated, in glyph order.
+	taskList = []
+	for start in range(0, len(checkJobList), kCheckBatchSize):
+		batch = checkJobList[start:start + kCheckBatchSize]
+		taskList.append((argList, [job[2] for job in batch], debug))
+	pool = None
+	if options.numWorkers > 1 and len(taskList) > 1:
+		pool = multiprocessing.Pool(options.numWorkers)
+		resultIter = pool.imap(checkGlyphBatch, taskList)
+	else:
+		resultIter = (checkGlyphBatch(task) for task in taskList)
+
+	dotCount = 0		
+	jobIndex = 0
+	try:
+		for resultList in resultIter:
+			for log, bezData in resultList:
+				name, width, bezString = checkJobList[jobIndex]
+				jobIndex += 1
+				if options.beVerbose:
+					logMsg("Checking %s -- ," % ( aliasName(name) )) # output message when -v option is used
+				else:
+					logMsg(".,")
+					dotCount += 1
+					if dotCount > 40:
+						dotCount = 0
+						logMsg("") # I do this to never have more than 40 dots on a line.
+						# This in turn give reasonable performance when calling checkOutlines in a subprocess
+						# and getting output with std.readline()
+				if log:
+					if not options.beVerbose:
+						dotCount = 0
+						logMsg("")
+						logMsg("Checking %s -- ," % (aliasName(name))) # output message when -v option is NOT used
+						logMsg(log)
+					else:
+						logMsg(log)
+				if  options.allowChanges and (bezData != None):
+					if bezData != bezString:
+						fontData.updateFromBez(bezData, name, width, options.beVerbose)
+					seenChangedGlyph = 1
+	finally:
+		if pool:
+			pool.terminate()
 
 	if not options.beVerbose:
 		logMsg("")
@@ -848,14 +909,7 @@ def checkFile(path, options):
 	if processedGlyphCount != seenGlyphCount:
 		logMsg("Skipped %s of %s glyphs." % (seenGlyphCount - processedGlyphCount, seenGlyphCount))
 	logMsg("Done with font %s. End time: %s." % (path, time.asctime()))
-	if debug:
-		print "Temp bez file in", kTempFilepath
-		print "Temp bez file out", kTempFilepathOut
-	else:
-		if os.path.exists(kTempFilepathOut):
-			os.remove(kTempFilepathOut)
-		if os.path.exists(kTempFilepath):
-			os.remove(kTempFilepath)
+	if not debug:
 		# remove temp file left over from openFile.
 		tempPathCFF = path + kTempCFFSuffix
 		if os.path.exists(tempPathCFF):
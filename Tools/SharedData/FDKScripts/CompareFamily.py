@@ -668,8 +668,7 @@ def readGlyphInfo(cmpfFont):
 	# Use tx to get RSB
 	### glyph[tag] {gname,enc,width,{left,bottom,right,top}}
 	# glyph[1] {space,0x0020,250,{0,0,0,0}}
-	command = "tx -mtx \"%s\" 2>&1" % (cmpfFont.path)
-	report = FDKUtils.runShellCmd(command)
+	report = FDKUtils.getMetricsReport(cmpfFont.path)
 	metrics = re.findall(r"glyph\S+\s+{([^,]+),[^,]+,([^,]+),{([-0-9]+),([-0-9]+),([-0-9]+),([-0-9]+)}}", report)
 	if not metrics:
 		print "Error: Quitting. Could not run 'tx' against the font %s to get font metrics." % (cmpfFont.path)
@@ -680,8 +679,7 @@ def readGlyphInfo(cmpfFont):
 		valList = map(lambda val: eval(val), entry[1:])
 		cmpfFont.metricsDict[entry[0]] = valList
 	# use spot to get ligature defintions.
-	command = "spot -t GSUB=7 \"%s\" 2>&1" % (cmpfFont.path)
-	report = FDKUtils.runShellCmd(command)
+	report = FDKUtils.getSpotReport(cmpfFont.path, "GSUB=7")
 	if cmpfFont.isTTF:
 		report = re.sub(r"(\S+)@\d+", r"\1", report)
 	cmpfFont.ligDict = {}
@@ -1460,8 +1458,7 @@ def doSingleTest7():
 	for font in fontlist:
 		if not font.ttFont.has_key('CFF '):
 			continue
-		command = "tx -dump -5 -n \"%s\" 2>&1" % (font.path)
-		report = FDKUtils.runShellCmd(command)
+		report = FDKUtils.getToolReport(["tx", "-dump", "-5", "-n"], font.path)
 		glyphList = re.findall(r"glyph[^{]+?\{([^,]+),[^[\]]+\sdotsection\s", report)
 		if glyphList:
 			glyphList = ", ".join(glyphList)
@@ -513,8 +513,7 @@ def mergeFDDicts(prevDictList, privateDict):
 	
 
 def getGlyphList(fPath, removeNotdef = 0):
-	command = "tx -dump -4 %s 2>&1" % (fPath)
-	data = FDKUtils.runShellCmd(command)
+	data = FDKUtils.getGlyphListReport(fPath)
 	if not data:
 		print "Error: Failed getting glyph names from  %s with tx." % (fPath)
 		return []
@@ -530,8 +529,7 @@ def getGlyphList(fPath, removeNotdef = 0):
 
 def getFontBBox(fPath):
 	fontBBox = [-200, -200,1000,100]
-	command = "tx -dump -0 %s 2>&1" % (fPath)
-	data = FDKUtils.runShellCmd(command)
+	data = FDKUtils.getFontDictReport(fPath)
 	if not data:
 		raise FontInfoParseError("Error: Failed getting  log from tx from %, when tryingg to get FontBBox." % (fPath))
 	
@@ -544,8 +542,7 @@ def getFontBBox(fPath):
 	return fontBBox
 	
 def getFontName(fPath):
-	command = "tx -dump -0 %s 2>&1" % (fPath)
-	data = FDKUtils.runShellCmd(command)
+	data = FDKUtils.getFontDictReport(fPath)
 	if not data:
 		raise FontInfoParseError("Error: Failed getting  log from tx from %, when tryin to get FontName." % (fPath))
 		
@@ -557,8 +554,7 @@ def getFontName(fPath):
 
 def getBlueFuzz(fPath):
 	blueFuzz = 1.0
-	command = "tx -dump -0 %s 2>&1" % (fPath)
-	data = FDKUtils.runShellCmd(command)
+	data = FDKUtils.getFontDictReport(fPath)
 	if not data:
 		raise FontInfoParseError("Error: Failed getting  log from tx from %, when trying to get FontName." % (fPath))
 		
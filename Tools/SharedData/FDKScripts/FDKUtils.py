@@ -8,6 +8,8 @@ __copyright__ = """Copyright 2014 Adobe Systems Incorporated (http://www.adobe.c
 
 import os
 import sys
+import atexit
+import cPickle
 import subprocess
 import traceback
 import platform
@@ -78,6 +80,20 @@ def runShellCmd(cmd):
 		print(msg)
 		return ""
 
+def runCmd(argList):
+	""" Like runShellCmd, but takes an argument list and does not start a shell.
+	This is cheaper when a tool is run many times, and avoids having to quote
+	file paths.
+	"""
+	try:
+		p = subprocess.Popen(argList, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+		log = p.communicate()[0]
+		return log
+	except :
+		msg = "Error executing command '%s'. %s" % (" ".join(argList), traceback.print_exc())
+		print(msg)
+		return ""
+
 def runShellCmdLogging(cmd):
 	try:
 		retcode = subprocess.call(cmd, shell=True, stderr=subprocess.STDOUT)
@@ -90,3 +106,150 @@ def runShellCmdLogging(cmd):
 		print(msg)
 		return 1
 	return 0
+
+
+# Font query cache.
+# Several scripts get simple facts about a font file by running tx or spot and
+# regex-parsing the text dump: the font dict, the glyph list, the glyph metrics,
+# the ROS of a CID font, the GSUB ligatures. A makeotf + CID conversion
+# pipeline asks the same questions about the same file many times. The
+# FontQueryCache memoizes both the tool reports and the values parsed from them,
+# keyed by the font file path and its size, mtime and inode, so that each dump is run
+# and parsed once per version of the file. If the environment variable
+# FDK_QUERY_CACHE is set to a file path, the cache is loaded from and saved to
+# that file, so that the results are also shared between script runs.
+kQueryCacheEnvVar = "FDK_QUERY_CACHE"
+kQueryCacheVersion = 1
+
+class FontQueryUncached(Exception):
+	""" Raised by a query function to return value without storing it in the
+	cache, eg the empty output of a tool that could not be run.
+	"""
+	def __init__(self, value):
+		Exception.__init__(self)
+		self.value = value
+
+class FontQueryCache:
+	def __init__(self, cachePath=None):
+		self.cachePath = cachePath
+		self.entries = {} # abs path -> [(size, mtime, inode), {query key : result}]
+		self.dirty = 0
+		if cachePath and os.path.exists(cachePath):
+			try:
+				fp = open(cachePath, "rb")
+				data = cPickle.load(fp)
+				fp.close()
+				if data[0] == kQueryCacheVersion:
+					self.entries = data[1]
+			except (IOError, OSError, EOFError, cPickle.UnpicklingError, IndexError, TypeError, ValueError):
+				print "Warning: ignoring unreadable font query cache file '%s'." % (cachePath)
+				self.entries = {}
+
+	def getResults(self, fontPath):
+		""" Return the dict of query results for the current version of the
+		font file, or None if the path cannot be cached. Directories (UFO fonts)
+		are not cached, as their mtime does not change when a glyph file is
+		edited.
+		"""
+		try:
+			statInfo = os.stat(fontPath)
+		except OSError:
+			return None
+		if os.path.isdir(fontPath):
+			return None
+		path = os.path.abspath(fontPath)
+		stamp = (statInfo.st_size, statInfo.st_mtime, statInfo.st_ino)
+		entry = self.entries.get(path)
+		if (entry == None) or (entry[0] != stamp):
+			entry = [stamp, {}]
+			self.entries[path] = entry
+		return entry[1]
+
+	def query(self, fontPath, key, func, *args):
+		""" Return func(fontPath, *args), computing it only if there is no
+		result stored under key for the current version of the font file.
+		If func raises FontQueryUncached, its value is returned but not stored.
+		"""
+		results = self.getResults(fontPath)
+		if results != None:
+			try:
+				return results[key]
+			except KeyError:
+				pass
+		try:
+			value = func(fontPath, *args)
+		except FontQueryUncached, e:
+			return e.value
+		if results == None:
+			return value
+		results[key] = value
+		self.dirty = 1
+		return value
+
+	def save(self):
+		if not (self.cachePath and self.dirty):
+			return
+		# Drop entries for fonts that no longer exist, so the file does not grow without bound.
+		for path in self.entries.keys():
+			if not os.path.exists(path):
+				del self.entries[path]
+		tempPath = self.cachePath + ".tmp"
+		try:
+			fp = open(tempPath, "wb")
+			cPickle.dump([kQueryCacheVersion, self.entries], fp, cPickle.HIGHEST_PROTOCOL)
+			fp.close()
+			if os.path.exists(self.cachePath):
+				os.remove(self.cachePath)
+			os.rename(tempPath, self.cachePath)
+		except (IOError, OSError, cPickle.PicklingError):
+			print "Warning: failed to write font query cache file '%s'." % (self.cachePath)
+		self.dirty = 0
+
+gFontQueryCache = None
+
+def getFontQueryCache():
+	global gFontQueryCache
+	if gFontQueryCache == None:
+		gFontQueryCache = FontQueryCache(os.environ.get(kQueryCacheEnvVar))
+		if gFontQueryCache.cachePath:
+			atexit.register(gFontQueryCache.save)
+	return gFontQueryCache
+
+def queryFont(fontPath, key, func, *args):
+	""" Memoized func(fontPath, *args). key must be unique to func and args."""
+	return getFontQueryCache().query(fontPath, key, func, *args)
+
+def _runToolReport(fontPath, argList):
+	report = runCmd(argList + [fontPath])
+	if not report:
+		# The tool could not be run; try again on the next call.
+		raise FontQueryUncached(report)
+	return report
+
+def getToolReport(argList, fontPath):
+	""" Return the output of the tool command argList run on the font file,
+	eg getToolReport(["tx", "-dump", "-0"], path). The command is run only
+	once per version of the font file. Only the text of the report is cached:
+	each caller still parses it on every call.
+	"""
+	return queryFont(fontPath, "report:" + " ".join(argList), _runToolReport, argList)
+
+def getFontDictReport(fontPath):
+	""" The tx dump of the font dict keys. """
+	return getToolReport(["tx", "-dump", "-0"], fontPath)
+
+def getGlyphListReport(fontPath):
+	""" The tx dump of the glyph list. """
+	return getToolReport(["tx", "-dump", "-4"], fontPath)
+
+def getMetricsReport(fontPath):
+	""" The tx dump of the glyph widths and bounding boxes. """
+	return getToolReport(["tx", "-mtx"], fontPath)
+
+def getSpotReport(fontPath, tableArg=None):
+	""" The spot dump of the sfnt table list, or of the table selected by
+	tableArg, eg "GSUB=7".
+	"""
+	if tableArg:
+		return getToolReport(["spot", "-t", tableArg], fontPath)
+	return getToolReport(["spot"], fontPath)
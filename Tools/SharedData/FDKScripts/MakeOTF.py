@@ -249,8 +249,8 @@ import FDKUtils
 import glob
 import ufoTools
 
-from xml.etree.ElementTree import XML
-from xml.etree.ElementTree import tostring as xmlToString
+from fontTools.ttLib import TTFont, TTLibError
+from fontTools.ttLib.tables.DefaultTable import DefaultTable
 
 gDebug = 0
 
@@ -338,10 +338,6 @@ kMOTFOptions = {
 	kSuppressHintWarnings:  [kOptionNotSeen, "-shw", "-nshw"],
 }
 
-# Used to compile post table for TTF fonts. We need to stay in syn with the
-# std names in the fontTools, as we use ttx to import/export the post table.
-from fontTools.ttLib.standardGlyphOrder import standardGlyphOrder as kStdNames
-
 # The paths in this list of keys need to be 'fixed' when written to a proejct file; they need to be converted
 # from relative to the current dir to being relatifve to the fpr directory, and ther reverse when being read.
 
@@ -1252,7 +1248,12 @@ def getROS(fontPath):
 	  /Ordering (Japan1) def
 	  /Supplement 3 def
 	
+	The result is memoized in the FDKUtils font query cache, as makeotf
+	asks for it more than once.
 	"""
+	return FDKUtils.queryFont(fontPath, "ROS", readROS)
+
+def readROS(fontPath):
 	R=O=S=None
 	fp = open(fontPath, "rb")
 	data = fp.read(5000)
@@ -1479,8 +1480,7 @@ def setMissingParams(makeOTFParams):
 	path = eval("makeOTFParams.%s%s" % (kFileOptPrefix, kOutputFont))
 	if not path:
 		# need to figure out PS name in order to derive default output path.
-		command = "%s -dump -0 \"%s\" 2>&1" % (makeOTFParams.txPath, inputFontPath)
-		report = FDKUtils.runShellCmd(command)
+		report = FDKUtils.getFontDictReport(inputFontPath)
 
 		match = re.search(r"CIDFontName\s+\"(\S+)\"", report)
 		if match:
@@ -1544,8 +1544,7 @@ def convertFontIfNeeded(makeOTFParams):
 			print "makeotf [Error] Failed to convert input font '%s' to temp file." % (filePath)
 			raise MakeOTFTXError
 	else:
-		commandString = "spot %s 2>&1" % (filePath)
-		report = FDKUtils.runShellCmd(commandString)
+		report = FDKUtils.getSpotReport(filePath)
 		if ("sfnt" in report):
 			needsConversion = 1
 			if "glyf" in report:
@@ -1568,8 +1567,7 @@ def convertFontIfNeeded(makeOTFParams):
 	
 		# Warn if there are any seac operators in the input file.
 		if not (makeOTFParams.srcIsTTF or isTextPS):
-			command = "tx -dump -5 -n \"%s\" 2>&1" % (filePath)
-			report = FDKUtils.runShellCmd(command)
+			report = FDKUtils.getToolReport(["tx", "-dump", "-5", "-n"], filePath)
 			glyphList = re.findall(r"glyph[^{]+?\{([^,]+),[^[\]]+\sseac\s", report)
 			if glyphList:
 				glyphList = ", ".join(glyphList)
@@ -1666,8 +1664,7 @@ def updateFontRevision(featuresPath, fontRevision):
 		print "makeotf [Error] When trying to update the head table fontRevision field, failed to write the new data to '%s'." % (featuresPath)
 
 def checkFSTypeValue(FSType, outputPath):
-	command = "spot -t OS/2 \"%s\" 2>&1" % (outputPath)
-	report = FDKUtils.runShellCmd(command)
+	report = FDKUtils.getSpotReport(outputPath, "OS/2")
 	match = re.search(r"type\s+=(\S+)", report)
 	if not match:
 		print "makeotf [Error] Could not find 'type' in spot dump of OS/2 table of file at '%s'." % (outputPath)
@@ -1684,8 +1681,7 @@ def checkFSTypeValue(FSType, outputPath):
 
 def getSourceGOADBData(inputFilePath):
 	# First, get the Unicode mapping from the TTF cmap table.
-	command = "spot -t cmap=7 %s 2>&1" % (inputFilePath)
-	report = FDKUtils.runShellCmd(command)
+	report = FDKUtils.getSpotReport(inputFilePath, "cmap=7")
 	glyphList = re.findall("[\n\t]\[(....+)\]=<([^>]+)>", report)
 	hasDoubleMapping = 0
 	# Becuase this dumps all the Unicode map tables, there are a number of duplicates.
@@ -1706,8 +1702,7 @@ def getSourceGOADBData(inputFilePath):
 	# We'll also use this to set the glyph order. I use tx so as to get teh same names
 	# as tx for the TTF glyphs; this can differ from spot. I don't use tx for Unicode values.
 	# as tx doesn't check 32 bit UV's, and doesn't report double-encodings.
-	command = "tx -mtx %s 2>&1" % (inputFilePath)
-	report = FDKUtils.runShellCmd(command)
+	report = FDKUtils.getMetricsReport(inputFilePath)
 	glyphList = re.findall("[\n\r]glyph\[(\d+)\]\s+\{([^,]+)", report)
 	gnameDict = {}
 	for gid, gname in glyphList:
@@ -1763,57 +1758,62 @@ def writeTempGOADB(inputFilePath, srcGOADBList):
 	fp.close()
 	return fpath
 	
+# Tables built by makeotf that are copied from the temp OTF font to the output TTF font.
+kTTFCopyTableList = ["GDEF", "GSUB", "GPOS", "cmap", "name", "OS/2", "BASE",]
+# Fields updated in the output TTF font from the temp OTF font. The rest of the
+# head table values control interpretation of the glyf data, and must be kept.
+kHeadUpdateFieldList = ["fontRevision", "created", "modified", "macStyle", "xMin", "xMax", "yMin", "yMax"]
+kHheaUpdateFieldList = ["ascent", "descent", "lineGap"]
+
 def copyTTFGlyphTables(inputFilePath, tempOutputPath, outputPath):
 	# tempOutputPath exists and is an OTF/CFF font.
 	# outputPath does not yet exist, or is the same as inputFilePath.
-	
-	command = "spot %s" % (tempOutputPath)
-	tableDump = FDKUtils.runShellCmd(command)
+	# The output font is put together in memory from the source TTF font and the
+	# temp OTF font, and written once. Tables which are not changed are copied from the
+	# source font as is, without being decompiled.
+	try:
+		otfFont = TTFont(tempOutputPath)
+		ttFont = TTFont(inputFilePath, recalcBBoxes=False, recalcTimestamp=False)
+	except (IOError, TTLibError), e:
+		print "makeotf [Error] Failed to open font file for merging makeotf tables with TrueType source font. %s" % (e)
+		raise MakeOTFRunError
 
 	# Get the final glyph name list.
-	tempTablePath = inputFilePath + ".temp.table"
-
-	command = "tx -mtx %s 2>&1" % (tempOutputPath)
-	report = FDKUtils.runShellCmd(command)
-	glyphList = re.findall("[\n\r]glyph\[\d+\]\s+\{([^,]+)", report)
+	glyphList = otfFont.getGlyphOrder()
 	
-	if os.path.exists(outputPath):
-		os.remove(outputPath)
 	print "Fixing output font 'post' table..."
-	fixPost(glyphList, inputFilePath, outputPath) # This has the side-effect of creating outputPath if it doesn't yet exist.
-	# Need to update the head values. Can't just copy the entire table from the OTF temp font, as
-	# as some of the head table values control interpretation of the glyf data.
+	fixPost(glyphList, ttFont)
 	print "Fixing output font 'head' table..."
-	fixHead(tempOutputPath, outputPath)
+	fixHead(otfFont, ttFont)
 	print "Fixing output font 'hhea' table..."
-	fixHhea(tempOutputPath, outputPath)
+	fixHhea(otfFont, ttFont)
 	
 	print "Copying makeotf-generated tables from temp OTF file to output font..."
-	for tableTag in ["GDEF", "GSUB", "GPOS", "cmap", "name", "OS/2", "BASE",]:
-		if tableTag not in tableDump:
+	for tableTag in kTTFCopyTableList:
+		if tableTag not in otfFont:
 			continue
-		command = "sfntedit -x \"%s\"=%s %s 2>&1" % (tableTag, tempTablePath, tempOutputPath)
-		log = FDKUtils.runShellCmd(command)
-		if not ("Done." in log):
-			print log
-			print "Error in merging makeotf tables with TrueType source font to final TrueType output font at '%s'." % (outputPath)
-			return
-	
-	
-		command = "sfntedit -a \"%s\"=%s %s 2>&1" % (tableTag, tempTablePath, outputPath)
-		log = FDKUtils.runShellCmd(command)
-		if not ("Done." in log):
-			print log
-			print "Error in merging makeotf tables with TrueType source font to final TrueType output font at '%s'." % (outputPath)
-			return
-		
+		table = DefaultTable(tableTag)
+		table.data = otfFont.getTableData(tableTag)
+		ttFont[tableTag] = table
 		print "\tcopied %s." % (tableTag)
-		
-	command = "sfntedit -f %s 2>&1" % (outputPath)
-	log = FDKUtils.runShellCmd(command)
+
+	# outputPath may be the same as inputFilePath, which ttFont is still reading from.
+	tempTTFPath = outputPath + ".temp.ttf"
+	try:
+		ttFont.save(tempTTFPath)
+	except (IOError, TTLibError), e:
+		print "makeotf [Error] Failed to write final TrueType output font. %s" % (e)
+		print "Error in merging makeotf tables with TrueType source font to final TrueType output font at '%s'." % (outputPath)
+		if os.path.exists(tempTTFPath):
+			os.remove(tempTTFPath)
+		return
+	finally:
+		ttFont.close()
+		otfFont.close()
+	if os.path.exists(outputPath):
+		os.remove(outputPath)
+	os.rename(tempTTFPath, outputPath)
 	if not gDebug:
-		if os.path.exists(tempTablePath):
-			os.remove(tempTablePath)
 		if os.path.exists(tempOutputPath):
 			os.remove(tempOutputPath)
 	
@@ -1822,224 +1822,32 @@ def copyTTFGlyphTables(inputFilePath, tempOutputPath, outputPath):
 	return
 
 		
-def fixPost(glyphList, inputFilePath, outputPath):
-	"""In order to chang the 'post' table, you need to
-	export and change both the post and GlyphOrder tables."""
-	tempPostPath = os.path.splitext(outputPath)[0] + ".ttx"
-	
-	command = "ttx -t GlyphOrder -t post \"%s\"" % (inputFilePath)
-	report = FDKUtils.runShellCmd(command)
-
-	# get xml file name:
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract source TTF font post table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-		
-	postFileName = m.group(1)
-	fp = open(postFileName, "rt")
-	postData = fp.read()
-	fp.close()
-	os.remove(postFileName)
-
-	startGlyphOrderIndex = re.search(r"<GlyphOrder>", postData).start()
-	endGlyphOrderIndex = re.search(r"</GlyphOrder>", postData).end()
-	startPostNamesIndex = re.search(r"<psNames>", postData).start()
-	endPostNamesIndex = re.search(r"</extraNames>", postData).end()
-	prefix = postData[:startGlyphOrderIndex]
-	middle = postData[endGlyphOrderIndex:startPostNamesIndex]
-	suffix = postData[endPostNamesIndex:]
-	
-	# build glyph lists.
-	extraNameList = []
-	glyphOrderList = []
-	for i in range(len(glyphList)):
-		gname = glyphList[i]
-		glyphOrderList.append("\t<GlyphID id=\"%d\" name=\"%s\"/>" % (i, gname))
-		if not (gname in kStdNames):
-			extraNameList.append("\t<psName name=\"%s\"/>" % (gname))
-	
-	# make sure we are using format 2.0 post table.
-	prefix = re.sub(r"formatType\s+value=\"\d\.\d\"", "formatType value=\"2.0\"", prefix)
-	
-	# build new ttx file.
-	nameLists = [prefix, "<GlyphOrder>"]
-	nameLists.extend(glyphOrderList)
-	nameLists.extend(["</GlyphOrder>", middle, "<psNames>", "</psNames>", "<extraNames>"])
-	nameLists.extend(extraNameList)
-	nameLists.extend(["</extraNames>", suffix])
-	nameLists.append("")
-
-	postData = os.linesep.join(nameLists) 
-	fp = open(tempPostPath, "wt")
-	fp.write(postData)
-	fp.close()
-
-	command = "ttx -m \"%s\" \"%s\"" % (inputFilePath, tempPostPath)
-	report = FDKUtils.runShellCmd(command)
-	os.remove(tempPostPath)
-
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract source TTF font post table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-
-	newTTFName = m.group(1)
-	
-	if newTTFName != outputPath:
-		if os.path.exists(outputPath):
-			os.remove(outputPath)
-		os.rename(newTTFName, outputPath)
+def fixPost(glyphList, ttFont):
+	"""Set the glyph names in the font to those in glyphList, and
+	make sure we are using a format 2.0 post table, so the names
+	are written to the font."""
+	postTable = ttFont["post"]
+	postTable.formatType = 2.0
+	postTable.extraNames = []
+	postTable.mapping = {}
+	if hasattr(postTable, "glyphOrder"):
+		del postTable.glyphOrder
+	ttFont.setGlyphOrder(glyphList)
 	return
 
-def fixHead(tempOTFFilePath, outputPath):
-	tempHeadPath = os.path.splitext(outputPath)[0] + ".head.ttx"
-	
-	command = "ttx -t head \"%s\"" % (outputPath)
-	report = FDKUtils.runShellCmd(command)
-
-	# get xml file name:
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract output TTF font head table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-		
-	headFileName = m.group(1)
-	
-	fp = open(headFileName, "rt")
-	oldHeadData = fp.read()
-	fp.close()
-	os.remove(headFileName)
-
-	command = "ttx -t head \"%s\"" % (tempOTFFilePath)
-	report = FDKUtils.runShellCmd(command)
-
-	# get xml file name:
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract temp OTF font head table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-		
-	headFileName = m.group(1)
-	
-	fp = open(headFileName, "rt")
-	newHeadData = fp.read()
-	fp.close()
-	os.remove(headFileName)
-	
-	oldHead = HeadTable(oldHeadData)
-	newHead = HeadTable(newHeadData)
-	oldHead.updateFromTable(newHead)
-	headData = oldHead.toXMLFileString()
-	fp = open(tempHeadPath, "wt")
-	fp.write(headData)
-	fp.close()
-
-	command = "ttx -m \"%s\" \"%s\"" % (outputPath, tempHeadPath)
-	report = FDKUtils.runShellCmd(command)
-
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to merge TTF font head table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-	os.remove(tempHeadPath)
-
-	newTTFName = m.group(1)
-	
-	if newTTFName != outputPath:
-		if os.path.exists(outputPath):
-			os.remove(outputPath)
-		os.rename(newTTFName, outputPath)
-	
-class HeadTable:
-	tagName="head"
-	updateFieldList = ["fontRevision", "created", "modified", "macStyle", "xMin", "xMax", "yMin", "yMax"]
-	def __init__(self, data):
-		self.fileXML = XML(data)
-		self.tableElement = self.fileXML.find(self.tagName)
-			
-	def updateFromTable(self, newHead):
-	
-		for fieldName in self.updateFieldList:
-			self.tableElement.find(fieldName).attrib["value"] = newHead.tableElement.find(fieldName).attrib["value"]
-
-	def toXMLFileString(self):
-		data = xmlToString(self.fileXML)
-		data = "<?xml version=\"1.0\" encoding=\"ISO-8859-1\"?>%s%s" % (os.linesep, data)
-		return data
-		
-	
-
-def fixHhea(tempOTFFilePath, outputPath):
-	tempHheaPath = os.path.splitext(outputPath)[0] + ".hhea.ttx"
-	
-	command = "ttx -t hhea \"%s\"" % (outputPath)
-	report = FDKUtils.runShellCmd(command)
-	# get xml file name:
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract output TTF font hhea table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-		
-	hheaFileName = m.group(1)
-	
-	fp = open(hheaFileName, "rt")
-	oldHheaData = fp.read()
-	fp.close()
-	os.remove(hheaFileName)
-
-	command = "ttx -t hhea \"%s\"" % (tempOTFFilePath)
-	report = FDKUtils.runShellCmd(command)
-	# get xml file name:
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract temp OTF font hhea table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
-		
-	hheaFileName = m.group(1)
-	
-	fp = open(hheaFileName, "rt")
-	newHheaData = fp.read()
-	fp.close()
-	os.remove(hheaFileName)
-
-	oldHhea = HheaTable(oldHheaData)
-	newHhea = HheaTable(newHheaData)
-
-	oldHhea.updateFromTable(newHhea)
-	hheaData = oldHhea.toXMLFileString()
-	
-	fp = open(tempHheaPath, "wt")
-	fp.write(hheaData)
-	fp.close()
-
-	command = "ttx -m \"%s\" \"%s\"" % (outputPath, tempHheaPath)
-	report = FDKUtils.runShellCmd(command)
-	os.remove(tempHheaPath)
-
-	m = re.search(r"to\s+\"([^\"]+)\"", report)
-	if not m:
-		print "makeotf [Error] Failed to extract source TTF font hhea table with 'ttx' tool. Report follows."
-		print report
-		raise MakeOTFRunError
+def fixHead(otfFont, ttFont):
+	newHead = otfFont["head"]
+	oldHead = ttFont["head"]
+	for fieldName in kHeadUpdateFieldList:
+		setattr(oldHead, fieldName, getattr(newHead, fieldName))
+	return
 
-	newTTFName = m.group(1)
-	
-	if newTTFName != outputPath:
-		if os.path.exists(outputPath):
-			os.remove(outputPath)
-		os.rename(newTTFName, outputPath)
-	
-class HheaTable(HeadTable):
-	tagName="hhea"
-	updateFieldList = ["ascent", "descent", "lineGap"]
+def fixHhea(otfFont, ttFont):
+	newHhea = otfFont["hhea"]
+	oldHhea = ttFont["hhea"]
+	for fieldName in kHheaUpdateFieldList:
+		setattr(oldHhea, fieldName, getattr(newHhea, fieldName))
+	return
 	
 
 def makeRelativePath(curDir, targetPath):
@@ -2357,8 +2165,7 @@ def runMakeOTF(makeOTFParams):
 
 	if eval("makeOTFParams.%s%s" % (kFileOptPrefix, kRelease)):
 		try:
-			command = "spot -t head \"%s\" 2>&1" % (outputPath)
-			report = FDKUtils.runShellCmd(command)
+			report = FDKUtils.getSpotReport(outputPath, "head")
 			match = re.search(r"fontRevision\s+=(\S+)", report)
 			if not match:
 				print "makeotf [Error] Could not find fontRevision in spot dump of head table of file %s." % (outputPath)
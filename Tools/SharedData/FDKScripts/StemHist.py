@@ -25,7 +25,7 @@ __usage__ = """
 stemHist program v1.24 Oct 16 2013
 stemHist -h
 stemHist -u
-stemHist [-g <glyph list>] [-gf <filename>] [-xg <glyph list>] [-xgf <filename>] [-all] [-a] [-new] -q font-path1 font-path2...
+stemHist [-g <glyph list>] [-gf <filename>] [-xg <glyph list>] [-xgf <filename>] [-all] [-a] [-both] [-new] -q font-path1 font-path2...
 
 Stem and Alignment zone report for OT/CFF fonts.
 Copyright (c) 2006 Adobe Systems Incorporated
@@ -81,6 +81,9 @@ A range of glyphs may be specified by providing two names separated only
 
 -a   Print alignment zone report rather than stem report
 
+-both Print both the alignment zone and the stem reports. Both are
+	collected in the same pass through the font.
+
 -all Include stems formed by curved line segments; by default, includes
 	only stems formed by straight line segments.
 
@@ -99,6 +102,7 @@ A range of glyphs may be specified by providing two names separated only
 	With the -a option, the report files are:
 	   <base path>.top.txt   The top zones.
 	  <base path >.bot.txt   The bottom zones.
+	With the -both option, all four report files are written.
 
 -o  Don't print glyph names - just print a dot occasionally to show progress. 
 
@@ -116,8 +120,11 @@ import warnings
 import FDKUtils
 import ufoTools
 import traceback
+import tempfile
+import shutil
 
 kTempCFFSuffix = ".temp.ac.cff"
+kStemBatchSize = 200 # Max number of bez files passed to one autohintexe call.
 
 warnings.simplefilter("ignore", RuntimeWarning) # supress waring about use of os.tempnam().
 
@@ -156,6 +163,7 @@ class ACOptions:
 		self.excludeGlyphList = 0
 		self.allStems = 0
 		self.doAlign = 0
+		self.doStems = 1
 		self.reportPath = None
 		self.new = 0
 		self.noFlex = 1
@@ -245,6 +253,10 @@ def getOptions():
 			options.allStems = 1
 		elif arg == "-a":
 			options.doAlign = 1
+			options.doStems = 0
+		elif arg == "-both":
+			options.doAlign = 1
+			options.doStems = 1
 		elif arg == "-d":
 			options.debug = 1
 		elif arg == "-q":
@@ -510,6 +522,8 @@ kStemZone = "stemZone"
 kHStem = "HStem"
 kVStem = "VStem"
 class GlyphReports:
+	# The per-glyph stem and zone lists are added to the font histograms as soon as
+	# the next glyph is started, so only the current glyph's lists are kept.
 	def __init__(self):
 		self.glyphName = None
 		self.hStemList = {}
@@ -518,16 +532,19 @@ class GlyphReports:
 		self.vStemPosList = {}
 		self.charZoneList = {}
 		self.stemZoneStemList = {}
-		self.glyphs = {}
+		self.hStemDict = {}
+		self.vStemDict = {}
+		self.topZoneDict = {}
+		self.bottomZoneDict = {}
 
 	def startGlyphName(self, glyphName):
+		self.accumulateGlyph()
 		self.hStemList = {}
 		self.vStemList = {}
 		self.hStemPosList = {}
 		self.vStemPosList = {}
 		self.charZoneList = {}
 		self.stemZoneStemList = {}
-		self.glyphs[glyphName] = [self.hStemList, self.vStemList, self.charZoneList, self.stemZoneStemList]
 		self.glyphName = glyphName
 	
 	def addGlyphReport(self, reportString):
@@ -558,89 +575,156 @@ class GlyphReports:
 				raise ACFontError("Error: Found unknown keyword %s in report file for glyph %s." % (key, self.glyphName))
 				
 	
+	def accumulateGlyph(self):
+		gName = self.glyphName
+		if gName == None:
+			return
+		hStemDict = self.hStemDict
+		vStemDict = self.vStemDict
+		topZoneDict = self.topZoneDict
+		bottomZoneDict = self.bottomZoneDict
+
+		for item in self.hStemList.items():
+			width, gcount = item
+			if width >= 0:
+				width = int(width + 0.5)
+			else:
+				width = int(width - 0.5)
+			try:
+				count, glyphList = hStemDict[width]
+				hStemDict[width][0] = count + gcount
+				hStemDict[width][1].append(gName)
+			except KeyError:
+				hStemDict[width] = [gcount,[gName]]
+				
+		for item in self.vStemList.items():
+			width, gcount = item
+			if width >= 0:
+				width = int(width + 0.5)
+			else:
+				width = int(width - 0.5)
+			try:
+				count, glyphList = vStemDict[width]
+				vStemDict[width][0] = count + gcount
+				vStemDict[width][1].append(gName)
+			except KeyError:
+				vStemDict[width] = [gcount,[gName]]
+				
+		for btval in self.charZoneList.values() + self.stemZoneStemList.values():
+			top, bottom = btval
+			if top >= 0:
+				top = int(top + 0.5)
+			else:
+				top = int(top - 0.5)
+			if bottom >= 0:
+				bottom = int(bottom + 0.5)
+			else:
+				bottom = int(bottom - 0.5)
+			try:
+				count, glyphList = topZoneDict[top]
+				topZoneDict[top][0] = count + 1
+				topZoneDict[top][1].append(gName)
+			except KeyError:
+				topZoneDict[top] = [1,[gName]]
+			try:
+				count, glyphList = bottomZoneDict[bottom]
+				bottomZoneDict[bottom][0] = count + 1
+				bottomZoneDict[bottom][1].append(gName)
+			except KeyError:
+				bottomZoneDict[bottom] = [1,[gName]]
+		self.glyphName = None
+
 	def getReportDicts(self):
-		hStemDict = {}
-		vStemDict = {}
-		topZoneDict = {}
-		bottomZoneDict = {}
-		for item in  self.glyphs.items():
-			gName = item[0]
-			hStemList, vStemList, charZoneList, stemZoneStemList = item[1]
-
-			for item in hStemList.items():
-				width, gcount = item
-				if width >= 0:
-					width = int(width + 0.5)
-				else:
-					width = int(width - 0.5)
-				try:
-					count, glyphList = hStemDict[width]
-					hStemDict[width][0] = count + gcount
-					hStemDict[width][1].append(gName)
-				except KeyError:
-					hStemDict[width] = [gcount,[gName]]
-					
-			for item in vStemList.items():
-				width, gcount = item
-				if width >= 0:
-					width = int(width + 0.5)
-				else:
-					width = int(width - 0.5)
-				try:
-					count, glyphList = vStemDict[width]
-					vStemDict[width][0] = count + gcount
-					vStemDict[width][1].append(gName)
-				except KeyError:
-					vStemDict[width] = [gcount,[gName]]
-					
-			for btval in charZoneList.values():
-				top, bottom = btval
-				if top >= 0:
-					top = int(top + 0.5)
-				else:
-					top = int(top - 0.5)
-				if bottom >= 0:
-					bottom = int(bottom + 0.5)
-				else:
-					bottom = int(bottom - 0.5)
-				try:
-					count, glyphList = topZoneDict[top]
-					topZoneDict[top][0] = count + 1
-					topZoneDict[top][1].append(gName)
-				except KeyError:
-					topZoneDict[top] = [1,[gName]]
-				try:
-					count, glyphList = bottomZoneDict[bottom]
-					bottomZoneDict[bottom][0] = count + 1
-					bottomZoneDict[bottom][1].append(gName)
-				except KeyError:
-					bottomZoneDict[bottom] = [1,[gName]]
-					
-			for btval in stemZoneStemList.values():
-				top, bottom = btval
-				if top >= 0:
-					top = int(top + 0.5)
-				else:
-					top = int(top - 0.5)
-				if bottom >= 0:
-					bottom = int(bottom + 0.5)
+		self.accumulateGlyph()
+		return self.hStemDict, self.vStemDict, self.topZoneDict, self.bottomZoneDict
+
+
+class StemReportEngine:
+	""" Collects the autohintexe stem and/or alignment zone reports for a
+	stream of glyphs. Glyphs are queued until the fontinfo changes or the
+	batch is full; then autohintexe is run once over the whole batch for each
+	report type, and the reports are added to the GlyphReports in glyph
+	order. The bez files are written once per batch, so the alignment zone
+	and stem reports come from the same pass through the font.
+	"""
+	def __init__(self, options, glyphReports):
+		self.debug = options.debug
+		self.glyphReports = glyphReports
+		self.tempDir = tempfile.mkdtemp(prefix="stemHist")
+		self.fontInfoPath = os.path.join(self.tempDir, "font.fi")
+		self.curFontInfo = None
+		self.batch = []
+		self.glyphCount = 0
+		reportArgs = []
+		if options.doAlign:
+			reportArgs.append("-ra")
+		if options.doStems:
+			reportArgs.append("-rs")
+		argList = ["autohintexe", "-q"]
+		if options.allStems:
+			argList.append("-a")
+		self.commandList = [argList + [reportArg, "-f", self.fontInfoPath] for reportArg in reportArgs]
+
+	def addGlyph(self, name, bezString, fontInfo):
+		if (fontInfo != self.curFontInfo) or (len(self.batch) >= kStemBatchSize):
+			self.flush()
+		if fontInfo != self.curFontInfo:
+			fp = open(self.fontInfoPath, "wt")
+			fp.write(fontInfo)
+			fp.close()
+			self.curFontInfo = fontInfo
+		self.glyphCount += 1
+		bezPath = os.path.join(self.tempDir, "g%06d.bez" % self.glyphCount)
+		bp = open(bezPath, "wt")
+		bp.write(bezString)
+		bp.close()
+		self.batch.append([name, bezPath, []])
+
+	def flush(self):
+		if not self.batch:
+			return
+		pathList = [entry[1] for entry in self.batch]
+		for command in self.commandList:
+			command = command + pathList
+			if self.debug:
+				print " ".join(command)
+			log = FDKUtils.runCmd(command)
+			if log:
+				print log
+				if "number terminator while" in log:
+					print self.tempDir
+					sys.exit()
+			for entry in self.batch:
+				reportPath = entry[1] + ".rpt"
+				if os.path.exists(reportPath):
+					bp = open(reportPath, "rt")
+					entry[2].append(bp.read())
+					bp.close()
+					os.remove(reportPath)
 				else:
-					bottom = int(bottom - 0.5)
-				try:
-					count, glyphList = topZoneDict[top]
-					topZoneDict[top][0] = count + 1
-					topZoneDict[top][1].append(gName)
-				except KeyError:
-					topZoneDict[top] = [1,[gName]]
-				try:
-					count, glyphList = bottomZoneDict[bottom]
-					bottomZoneDict[bottom][0] = count + 1
-					bottomZoneDict[bottom][1].append(gName)
-				except KeyError:
-					bottomZoneDict[bottom] = [1,[gName]]
-					
-	
-		return hStemDict, vStemDict,topZoneDict, bottomZoneDict
+					entry[2].append(None)
+
+		for name, bezPath, reportList in self.batch:
+			if not self.debug:
+				os.remove(bezPath)
+			self.glyphReports.startGlyphName(name)
+			for report in reportList:
+				if report == None:
+					print "Error - failure in processing outline data"
+					continue
+				report = report.strip()
+				if report:
+					self.glyphReports.addGlyphReport(report)
+					if self.debug:
+						rawData.append(report)
+		self.batch = []
+
+	def close(self):
+		self.flush()
+		if self.debug:
+			print "Wrote AC fontinfo and bez files to", self.tempDir
+		else:
+			shutil.rmtree(self.tempDir, True)
 
 
 def srtCnt(first, second):
@@ -673,11 +757,12 @@ def  formatReport(rDict, sortFnc):
 	return reportLines
 
 
-def checkReportExists(path, doAlign):
+def checkReportExists(path, doAlign, doStems = 1):
+	suffixes = ()
 	if doAlign:
-		suffixes = (".top.txt", ".bot.txt")
-	else:
-		suffixes = (".hstm.txt", ".vstm.txt")
+		suffixes += (".top.txt", ".bot.txt")
+	if doStems:
+		suffixes += (".hstm.txt", ".vstm.txt")
 	foundOne = 0
 	for i in range(len(suffixes)):
 		fName = path + suffixes[i]
@@ -728,7 +813,9 @@ def collectStemsFont(path, options, txPath):
 	#    If error, skip font and report error.
 	fontFileName = os.path.basename(path)
 	logMsg("")
-	if options.doAlign:
+	if options.doAlign and options.doStems:
+		logMsg( "Collecting alignment zones and stems for font %s. Start time: %s." % (path, time.asctime()))
+	elif options.doAlign:
 		logMsg( "Collecting alignment zones for font %s. Start time: %s." % (path, time.asctime()))
 	else:
 		logMsg( "Collecting stems for font %s. Start time: %s." % (path, time.asctime()))
@@ -748,11 +835,6 @@ def collectStemsFont(path, options, txPath):
 	if not glyphList:
 		raise ACFontError("Error: selected glyph list is empty for font <%s>." % fontFileName)
 
-	tempBaseName = os.tempnam()
-	tempBez = tempBaseName + ".bez"
-	tempReport = tempBez + ".rpt"
-	tempFI = tempBaseName + ".fi"
-	
 	#    open font plist file, if any. If not, create empty font plist.
 	psName = fontData.getPSName()
 	
@@ -764,9 +846,7 @@ def collectStemsFont(path, options, txPath):
 
 	if fdGlyphDict == None:
 		fdDict = fontDictList[0]
-		fp = open(tempFI, "wt")
-		fp.write(fdDict.getFontInfo())
-		fp.close()
+		fontInfo = fdDict.getFontInfo()
 	else:
 		if not options.verbose:
 			logMsg("Note: Using alternate FDDict global values from fontinfo file for some glyphs. Remove option '-q' to see which dict is used for which glyphs.")
@@ -775,6 +855,7 @@ def collectStemsFont(path, options, txPath):
 	isCID = fontData.isCID()
 	lastFDIndex = None
 	glyphReports = GlyphReports()
+	engine = StemReportEngine(options, glyphReports)
 
 	if not options.verbose:
 		dotCount = 0
@@ -813,9 +894,7 @@ def collectStemsFont(path, options, txPath):
 			if not fdIndex == lastFDIndex:
 				lastFDIndex = fdIndex
 				fdDict = fontData.getFontInfo(psName, path, options.allow_no_blues, options.noFlex, options.vCounterGlyphs, options.hCounterGlyphs, fdIndex)
-				fp = open(tempFI, "wt")
-				fp.write(fdDict.getFontInfo())
-				fp.close()
+				fontInfo = fdDict.getFontInfo()
 		else:
 			if (fdGlyphDict != None):
 				try:
@@ -826,58 +905,13 @@ def collectStemsFont(path, options, txPath):
 				if lastFDIndex != fdIndex:
 					lastFDIndex = fdIndex
 					fdDict = fontDictList[fdIndex]
-					fp = open(tempFI, "wt")
-					fp.write(fdDict.getFontInfo())
-					fp.close()
-		
-		glyphReports.startGlyphName(name)
+					fontInfo = fdDict.getFontInfo()
 		
+		# 	Queue the glyph for the auto-hint library. The reports are added to glyphReports
+		# as each batch is run.
+		engine.addGlyph(name, bezString, fontInfo)
 
-		# 	Call auto-hint library on bez string.
-		bp = open(tempBez, "wt")
-		bp.write(bezString)
-		bp.close()
-
-		if os.path.exists(tempReport):
-			os.remove(tempReport)
-		if options.doAlign:
-			doAlign = "-ra"
-		else:
-			doAlign = "-rs"
-			
-		if options.allStems:
-			allStems = "-a"
-		else:
-			allStems = ""
-			
-		command = "autohintexe -q %s %s  -f \"%s\" \"%s\"" % (doAlign, allStems, tempFI, tempBez)
-		if options.debug:
-			print command
-		log = FDKUtils.runShellCmd(command)
-		if log:
-			print log
-			if "number terminator while" in log:
-				print tempBez
-				sys.exit()
- 
-		if os.path.exists(tempReport):
-			bp = open(tempReport, "rt")
-			report = bp.read()
-			bp.close()
-			if options.debug:
-				print "Wrote AC fontinfo data file to", tempFI
-				print "Wrote AC output rpt file to", tempReport
-			else:
-				os.remove(tempReport)
-			report.strip()
-			if report:
-				glyphReports.addGlyphReport(report)
-				if options.debug:
-					rawData.append(report)
-		else:
-			print "Error - failure in processing outline data"
-			report = None
-			
+	engine.close()
 	hStemDict, vStemDict,topZoneDict, bottomZoneDict = glyphReports.getReportDicts()
 	if options.reportPath:
 		reportPath = options.reportPath
@@ -916,7 +950,7 @@ def main():
 				reportPath = options.reportPath
 			else:
 				reportPath = path
-			foundOne = checkReportExists(reportPath, options.doAlign)
+			foundOne = checkReportExists(reportPath, options.doAlign, options.doStems)
 			if foundOne:
 				logMsg( "Skipping %s, as a report already exists." % (path))
 				continue
@@ -8,7 +8,7 @@ autohint -h
 autohint -u
 autohint -hfd
 autohint -pfd
-autohint [-g <glyph list>] [-gf <filename>] [-xg <glyph list>] [-xgf <filename>] [-cf path] [-a] [-logOnly] [-log <logFile path>] [-r] [-q] [-c] [-nf] [-ns] [-nb] [-o <output font path>]  font-path
+autohint [-g <glyph list>] [-gf <filename>] [-xg <glyph list>] [-xgf <filename>] [-cf path] [-a] [-logOnly] [-log <logFile path>] [-r] [-q] [-c] [-nf] [-ns] [-nb] [-j <n>] [-cache <dir path>] [-cacheSize <n>] [-o <output font path>]  font-path
 
 Auto-hinting program for PostScript and OpenType/CFF fonts.
 """
@@ -120,6 +120,26 @@ alignment zones in an "fontinfo" file.
 -nb	Allow the font to have to no stem widths or blue values specified.
 	Without this option, autohint will complain and quit.
 
+-j <n>	Hint using <n> worker processes. The glyphs for each FDDict are
+	divided among the workers, and the results are merged back in glyph
+	order, so the output font is the same as when hinting with one process.
+	The default is 1.
+
+-cache <dir path>
+	Use a hint result cache in the specified directory. Before a glyph is
+	hinted, autohint looks up the cache using a hash of the unhinted bez
+	outline, the FDDict global values, and the options that change the
+	hinting. When the same outline has already been hinted with the same
+	values, by this or any other font, the cached result is used and the
+	glyph is not passed to the hinting program. Note that the hinting
+	program's comments are not repeated for cached glyphs. The cache may
+	be shared by several fonts and by concurrent autohint runs.
+
+-cacheSize <n>
+	Maximum size of the hint result cache, in megabytes. When the cache
+	grows past this, the least recently used entries are deleted. The
+	default is 200.
+
 -o <output font path>
 	If not specified, autohint will write the hinted output to the original 
 	font path name.
@@ -442,6 +462,9 @@ import FDKUtils
 import ufoTools
 import traceback
 import shutil
+import tempfile
+import multiprocessing
+import hashlib
 
 warnings.simplefilter("ignore", RuntimeWarning) # supress waring about use of os.tempnam().
 
@@ -450,6 +473,8 @@ kACIDKey = "AutoHintKey"
 gLogFile = None
 kFontPlistSuffix  = ".plist"
 kTempCFFSuffix = ".temp.ac.cff"
+kDefaultCacheSize = 200 # megabytes
+kACBatchSize = 200 # Max number of bez files passed to one autohintexe call; keeps the command line well under the Windows limit.
 
 class ACOptions:
 	def __init__(self):
@@ -473,6 +498,9 @@ class ACOptions:
 		self.printDefaultFDDict = 0
 		self.printFDDictList = 0
 		self.debug = 0
+		self.numWorkers = 1
+		self.cacheDir = None
+		self.cacheSize = kDefaultCacheSize
 		
 class ACOptionParseError(KeyError):
 	pass
@@ -721,6 +749,27 @@ def getOptions():
 		elif arg == "-o":
 			i = i +1
 			options.outputPath = sys.argv[i]
+		elif arg == "-j":
+			i = i +1
+			try:
+				options.numWorkers = int(sys.argv[i])
+			except (IndexError, ValueError):
+				raise ACOptionParseError("Option Error: '-j' must be followed by the number of worker processes.")
+			if options.numWorkers < 1:
+				raise ACOptionParseError("Option Error: the number of worker processes following '-j' must be at least 1.")
+		elif arg == "-cache":
+			i = i +1
+			if (i >= numOptions) or (sys.argv[i][0] == "-"):
+				raise ACOptionParseError("Option Error: '-cache' must be followed by the path to the hint cache directory.")
+			options.cacheDir = sys.argv[i]
+		elif arg == "-cacheSize":
+			i = i +1
+			try:
+				options.cacheSize = int(sys.argv[i])
+			except (IndexError, ValueError):
+				raise ACOptionParseError("Option Error: '-cacheSize' must be followed by the maximum cache size in megabytes.")
+			if options.cacheSize < 1:
+				raise ACOptionParseError("Option Error: the cache size following '-cacheSize' must be at least 1 megabyte.")
 		elif arg == "-d":
 			options.debug = 1
 		elif arg[0] == "-":
@@ -1008,6 +1057,175 @@ def removeTempFiles(fileList):
 		if os.path.exists(filePath):
 			os.remove(filePath)
 
+class ACHintEngine:
+	""" Runs autohintexe over batches of glyphs, rather than starting one
+	process per glyph. autohintexe accepts any number of bez file paths after
+	the fontinfo file, so a batch costs one process start. The fontinfo file
+	is rewritten only when the FDDict changes, and the hinted bez strings are
+	returned in memory. All temp files are written in a private directory, so
+	several autohint jobs can run at the same time.
+	"""
+	def __init__(self, options):
+		self.debug = options.debug
+		self.tempDir = tempfile.mkdtemp(prefix="autohint")
+		self.fontInfoPath = os.path.join(self.tempDir, "font.fi")
+		self.curFontInfo = None
+		self.glyphCount = 0
+		argList = ["autohintexe"]
+		if not options.verbose:
+			argList.append("-q")
+		if not options.allowChanges:
+			argList.append("-e")
+		if options.noHintSub:
+			argList.append("-n")
+		self.argList = argList + ["-s", ".new", "-f", self.fontInfoPath]
+
+	def setFontInfo(self, fontInfo):
+		if fontInfo == self.curFontInfo:
+			return
+		fp = open(self.fontInfoPath, "wt")
+		fp.write(fontInfo)
+		fp.close()
+		self.curFontInfo = fontInfo
+
+	def hintGlyphs(self, bezList):
+		# Hint a list of bez strings which all use the current fontinfo.
+		# Returns the list of hinted bez strings, with None for any glyph that
+		# failed, and the autohintexe log text.
+		newBezList = []
+		report = ""
+		for start in range(0, len(bezList), kACBatchSize):
+			pathList = []
+			for bezString in bezList[start:start + kACBatchSize]:
+				self.glyphCount += 1
+				bezPath = os.path.join(self.tempDir, "g%06d.bez" % self.glyphCount)
+				bp = open(bezPath, "wt")
+				bp.write(bezString)
+				bp.close()
+				pathList.append(bezPath)
+
+			command = self.argList + pathList
+			if self.debug:
+				print " ".join(command)
+			report += FDKUtils.runCmd(command)
+
+			for bezPath in pathList:
+				newBezPath = bezPath + ".new"
+				newBezString = None
+				if os.path.exists(newBezPath):
+					bp = open(newBezPath, "rt")
+					newBezString = bp.read()
+					bp.close()
+				if not self.debug:
+					removeTempFiles([bezPath, newBezPath])
+				newBezList.append(newBezString)
+		return newBezList, report
+
+	def close(self):
+		if self.debug:
+			print "Wrote AC fontinfo and bez files to", self.tempDir
+		else:
+			shutil.rmtree(self.tempDir, True)
+
+class ACHintCache:
+	""" Persistent, content addressed cache of autohintexe results. Each entry
+	is a file holding the hinted bez string, named by the SHA-1 of the
+	unhinted bez string, the fontinfo string, and the options which change
+	the hinting result. Since the key depends only on the content, glyphs
+	with identical outlines share entries across fonts, instances and runs.
+	A hit touches the entry's modification time; on close, the least recently
+	used entries are removed until the cache fits within maxSize bytes.
+	"""
+	def __init__(self, cacheDir, maxSize, options):
+		self.cacheDir = cacheDir
+		self.maxSize = maxSize
+		self.flags = "e%s n%s" % (options.allowChanges, options.noHintSub)
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		if not os.path.isdir(cacheDir):
+			os.makedirs(cacheDir)
+
+	def getPath(self, bezString, fontInfo):
+		key = hashlib.sha1("\0".join([self.flags, fontInfo, bezString])).hexdigest()
+		return os.path.join(self.cacheDir, key[:2], key[2:])
+
+	def get(self, bezString, fontInfo):
+		path = self.getPath(bezString, fontInfo)
+		try:
+			fp = open(path, "rb")
+			newBezString = fp.read()
+			fp.close()
+			os.utime(path, None)
+		except (IOError, OSError):
+			self.misses += 1
+			return None
+		self.hits += 1
+		return newBezString
+
+	def put(self, bezString, fontInfo, newBezString):
+		path = self.getPath(bezString, fontInfo)
+		dirPath = os.path.dirname(path)
+		try:
+			if not os.path.isdir(dirPath):
+				os.makedirs(dirPath)
+			# Write to a temp file and rename, so that concurrent runs never see a partial entry.
+			fd, tempPath = tempfile.mkstemp(dir=dirPath)
+			os.write(fd, newBezString)
+			os.close(fd)
+			if os.path.exists(path):
+				os.remove(tempPath)
+			else:
+				os.rename(tempPath, path)
+		except (IOError, OSError):
+			pass # The cache is only an optimization.
+
+	def evict(self):
+		entryList = []
+		totalSize = 0
+		for dirPath, dirNames, fileNames in os.walk(self.cacheDir):
+			for fileName in fileNames:
+				path = os.path.join(dirPath, fileName)
+				try:
+					st = os.stat(path)
+				except OSError:
+					continue
+				entryList.append((st.st_mtime, st.st_size, path))
+				totalSize += st.st_size
+		if totalSize <= self.maxSize:
+			return
+		entryList.sort()
+		for mtime, size, path in entryList:
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			self.evictions += 1
+			totalSize -= size
+			if totalSize <= self.maxSize:
+				break
+
+	def close(self):
+		self.evict()
+		numLookups = self.hits + self.misses
+		if numLookups:
+			hitRate = 100.0 * self.hits / numLookups
+		else:
+			hitRate = 0.0
+		return "Hint cache %s: %s hits, %s misses (%.1f%% hit rate), %s entries evicted." % (self.cacheDir, self.hits, self.misses, hitRate, self.evictions)
+
+def hintBatch(task):
+	# Worker process entry point for hinting with -j. task is
+	# (options, fontinfo string, list of bez strings). Each worker uses its
+	# own engine and temp directory.
+	options, fontInfo, bezList = task
+	engine = ACHintEngine(options)
+	try:
+		engine.setFontInfo(fontInfo)
+		return engine.hintGlyphs(bezList)
+	finally:
+		engine.close()
+
 def cmpFDDictEntries(entry1, entry2):
 	# entry = [glyphName, [fdIndex, glyphListIndex] ]
 	if entry1[1][1] > entry2[1][1]:
@@ -1039,13 +1257,6 @@ def hintFile(options):
 	if not glyphList:
 		raise ACFontError("Error: selected glyph list is empty for font <%s>." % fontFileName)
 
-	# temp file names for input and output bez files, and for the fontinfo file.
-	tempBaseName = os.tempnam()
-	tempBez = tempBaseName + ".bez"
-	tempBezNew = tempBez + ".new"
-	tempFI = tempBaseName + ".fi"
-	
-	#print "tempBaseName", tempBaseName
 	psName = fontData.getPSName()
 	
 	if (not options.logOnly) and options.usePlistFile:
@@ -1102,9 +1313,7 @@ def hintFile(options):
 		
 	if fdGlyphDict == None:
 		fdDict = fontDictList[0]
-		fp = open(tempFI, "wt")
-		fp.write(fdDict.getFontInfo())
-		fp.close()
+		fontInfo = fdDict.getFontInfo()
 	else:
 		if not options.verbose:
 			logMsg("Note: Using alternate FDDict global values from fontinfo file for some glyphs. Remove option '-q' to see which dict is used for which glyphs.")
@@ -1121,26 +1330,10 @@ def hintFile(options):
 	if isCID:
 		options.noFlex = 1
 		
-	if options.verbose:
-		verboseArg = ""
-	else:
-		verboseArg = " -q" 
-		dotCount = 0
-		curTime = time.time()
-
-	if options.allowChanges:
-		suppressEditArg = ""
-	else:
-		suppressEditArg = " -e"
-
-	if options.noHintSub:
-		supressHintSubArg = " -n"
-	else:
-		supressHintSubArg = ""
-
 	dotCount = 0
 	seenGlyphCount = 0
 	processedGlyphCount = 0
+	hintJobList = [] # [glyph name, width, bez string, fontinfo string, prevACIdentifier, new bez string]
 	for name in glyphList:
 		prevACIdentifier = None
 		seenGlyphCount +=1 
@@ -1161,9 +1354,7 @@ def hintFile(options):
 			if not fdIndex == lastFDIndex:
 				lastFDIndex = fdIndex
 				fdDict = fontData.getFontInfo(psName, path, options.allow_no_blues, options.noFlex, options.vCounterGlyphs, options.hCounterGlyphs, fdIndex)
-				fp = open(tempFI, "wt")
-				fp.write(fdDict.getFontInfo())
-				fp.close()
+				fontInfo = fdDict.getFontInfo()
 		else:
 			if (fdGlyphDict != None):
 				try:
@@ -1174,9 +1365,7 @@ def hintFile(options):
 				if lastFDIndex != fdIndex:
 					lastFDIndex = fdIndex
 					fdDict = fontDictList[fdIndex]
-					fp = open(tempFI, "wt")
-					fp.write(fdDict.getFontInfo())
-					fp.close()
+					fontInfo = fdDict.getFontInfo()
 			
 
 		# 	Build autohint point list identifier
@@ -1224,41 +1413,74 @@ def hintFile(options):
 				# and getting output with std.readline()
 
 		anyGlyphChanged = 1
-		# 	Call auto-hint library on bez string.
-		bp = open(tempBez, "wt")
-		bp.write(bezString)
-		bp.close()
-
-		#print "oldBezString", oldBezString
-		#print ""
-		#print "bezString", bezString
-		
-		if oldBezString != "" and oldBezString == bezString:
+		# Compare the tokens rather than the text, so that a change in how the
+		# bez text is spaced does not make every glyph look changed.
+		if oldBezString != "" and oldBezString.split() == bezString.split():
 			newBezString = oldHintBezString
 		else:
-			if os.path.exists(tempBezNew):
-				os.remove(tempBezNew)
-			command = "autohintexe %s%s%s -s .new -f \"%s\" \"%s\"" % (verboseArg, suppressEditArg, supressHintSubArg, tempFI, tempBez)
-			if  options.debug:
-				print command
-			report = FDKUtils.runShellCmd(command)
-			if report:
-				if not options.verbose:
-					logMsg("") # end series of "."
-				logMsg(report)
-	
-			if os.path.exists(tempBezNew):
-				bp = open(tempBezNew, "rt")
-				newBezString = bp.read()
-				bp.close()
-				if options.debug:
-					print "Wrote AC fontinfo data file to", tempFI
-					print "Wrote AC output bez file to", tempBezNew
-				else:
-					os.remove(tempBezNew)
-			else:
-				newBezString = None
-			
+			newBezString = None # filled in by the hinting engine.
+		hintJobList.append([name, width, bezString, fontInfo, prevACIdentifier, newBezString])
+
+	# Use the hint cache, if any, for glyphs that have not already been resolved from the history file.
+	hintCache = None
+	if options.cacheDir:
+		hintCache = ACHintCache(options.cacheDir, options.cacheSize*1024*1024, options)
+		for job in hintJobList:
+			if job[5] == None:
+				job[5] = hintCache.get(job[2], job[3])
+
+	# 	Call auto-hint library on the bez strings, one batch per fontinfo. All the glyphs that
+	# share a fontinfo go in the same batch, even when other FDs come between them in glyph
+	# order, as in CID fonts. With -j, each batch is split into at most one contiguous shard
+	# per worker, so each fontinfo is loaded at most numWorkers times, however the FDs are
+	# interleaved. The results go back into hintJobList, which stays in glyph order.
+	fontInfoList = []
+	batchDict = {}
+	for job in hintJobList:
+		if job[5] != None:
+			continue
+		fontInfo = job[3]
+		try:
+			batchDict[fontInfo].append(job)
+		except KeyError:
+			batchDict[fontInfo] = [job]
+			fontInfoList.append(fontInfo)
+	batchList = []
+	for fontInfo in fontInfoList:
+		batch = batchDict[fontInfo]
+		numShards = min(options.numWorkers, len(batch))
+		shardSize = (len(batch) + numShards - 1) / numShards
+		for start in range(0, len(batch), shardSize):
+			batchList.append([fontInfo, batch[start:start + shardSize]])
+
+	if options.numWorkers > 1 and len(batchList) > 1:
+		pool = multiprocessing.Pool(options.numWorkers)
+		try:
+			resultList = pool.map(hintBatch, [(options, fontInfo, [job[2] for job in batch]) for fontInfo, batch in batchList], 1)
+		finally:
+			pool.terminate()
+	else:
+		resultList = []
+		engine = ACHintEngine(options)
+		for fontInfo, batch in batchList:
+			engine.setFontInfo(fontInfo)
+			resultList.append(engine.hintGlyphs([job[2] for job in batch]))
+		engine.close()
+
+	# pool.map returns the results in task order, so the merge below is the same as for a serial run.
+	for (fontInfo, batch), (newBezList, report) in zip(batchList, resultList):
+		if report:
+			if not options.verbose:
+				logMsg("") # end series of "."
+			logMsg(report)
+		for job, newBezString in zip(batch, newBezList):
+			job[5] = newBezString
+			if hintCache and newBezString:
+				hintCache.put(job[2], job[3], newBezString)
+	if hintCache:
+		logMsg(hintCache.close())
+
+	for name, width, bezString, fontInfo, prevACIdentifier, newBezString in hintJobList:
 		if not newBezString:
 			print "Error - failure in processing outline data"
 			continue
@@ -1288,11 +1510,9 @@ def hintFile(options):
 	if not options.verbose:
 		print "" # print final new line after progress dots.
 
-	if  options.debug:
-		print "Wrote input AC bez file to", tempBez
-	else:
+	if not options.debug:
 		tempPathCFF = options.inputPath + kTempCFFSuffix # created when a PS file is opened.
-		removeTempFiles( [tempBez, tempBezNew, tempFI, tempPathCFF] )
+		removeTempFiles( [tempPathCFF] )
 					
 	if not options.logOnly:
 		if anyGlyphChanged:
@@ -1642,7 +1642,7 @@ def makePDF(pdfFont, params, progressBarInstance = None):
 		pdfPath = params.rt_pdfFileName 
 	else:
 		pdfPath = os.path.splitext(fontPath)[0] + ".pdf"
-	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1)
+	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1, streamPages = 1)
 	
 	if params.waterfallRange:
 		makeWaterfallPDF(params, pdfFont, progressBarInstance)
@@ -2010,7 +2010,7 @@ def makeFontSetPDF(pdfFontList,  params, progressBarInstance = None):
 		firstPDFFont = pdfFontList[0][1]
 		fontPath = params.rt_filePath = firstPDFFont.path
 		pdfPath = os.path.splitext(fontPath)[0] + ".fontset.pdf"
-	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1)
+	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1, streamPages = 1)
 
 	# figure out how much space to leave at start of line for PS names and fond index fields.
 	psNameSize = params.fontsetGroupPtSize
@@ -2305,7 +2305,7 @@ def makeKernPairPDF(pdfFont, kernOverlapList, params, progressBarInstance = None
 		fontPath = params.rt_filePath = pdfFont.path
 		pdfPath = os.path.splitext(fontPath)[0] + ".kc.pdf"
 		
-	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1)
+	params.rt_canvas = rt_canvas = pdfgen.Canvas(pdfPath, pagesize=params.pageSize, bottomup = 1, streamPages = 1)
 
 	# figure out how much space to leave at start of line for PS names and fond index fields..
 	maxLen = 0
@@ -8,8 +8,10 @@ kernCheck performs several (lengthy) checks on the GPOS table kern
 feature in an OpenType font.
 
 It first looks for glyph pairs that collide/overlap. It uses the 'tx'
-tool to rasterize glyphs at 200 pts, and uses the 'spot -t GPOS=7
-<font>" command to get the kerning data. It then checks every glyph 
+tool to rasterize glyphs at 200 pts, and reads the kerning data from
+the 'kern' feature lookups in the font's GPOS table (or, with the
+-useSpot option, from the output of the 'spot -t GPOS=7 <font>'
+command). It then checks every glyph 
 pair by overlapping the bitmaps at the  (advance width + kern
 adjustment) to see if any pixels overlap. By default, it checks only
 kerned glyph pairs, but with an option it will check all possible glyph
@@ -55,7 +57,7 @@ the InDesign method, which actually works less well.
 """
 __usage__ = """kernCheck v 1.6 January 16 2014
 kernCheck [-u] [-h]
-kernCheck [-ppEM <integer>] [-doAll] [-log <path to output log file>] -limit <number> -sortByName -sortByArea <path to font file>
+kernCheck [-ppEM <integer>[,<integer>...]] [-doAll] [-j <n>] [-useSpot] [-log <path to output log file>] -limit <number> -sortByName -sortByArea <path to font file> [<path to font file>...]
 kernCheck  -ptSize <number> -limit <number> -sortByName -sortByArea -makePDF <font file path> [<log file path>] [<pdf file path>]
 kernCheck  -subtableCheck [-log <path to output log file>] <path to font file>
 
@@ -68,6 +70,7 @@ option.
 -h                : show help: explains logic for ignoring some glyph pairs.
 
 -ppEM <integer>   : Sets the  size of the bitmaps used for the glyph overlap checks. Default value is 100 pixels per em-square.
+                  A comma-separated list of sizes, such as "-ppEM 50,100,200", checks the glyph pairs at each size.
 
 -doMore           : The glyph overlap check will check most of the possible glyph pairs; by default, only kerned pairs are checked.
 
@@ -75,6 +78,11 @@ option.
 
 -log< path to output log file>
                   : Write output to the named log file. By default, the log file has same name and location as font file, but with suffix ".kc.txt".
+                  When more than one font file is given, the report for all the fonts is written to one log file. This has by default
+                  the name "kernCheck.kc.txt", in the directory of the first font file.
+
+-j <n>            : Run the overlap checks for each font and ppEM size, and the subtable checks for each font, on <n> worker processes.
+                  The GPOS kern data is collected only once for each font.
 
 -limit <integer>  : Omit all glyph pairs with an overlap less than the limit.
 
@@ -82,6 +90,9 @@ option.
  
 -sortByName       : Sort output by left and right glyph names; default is the log file order. Affects log file and PDF, but not messages during processing.
 
+-useSpot          : Get the kern data by parsing the output of the command 'spot -t GPOS=7'. By default,
+                  the kern feature lookups are read directly from the font's GPOS table.
+
 -subtableCheck    : Do only the check of subtables to see if any GPOS table kerning rules mask other rules.
 
 -makePDF  <font file path>  [<log file path>] [<pdf file path>]
@@ -92,7 +103,8 @@ option.
                   formed by adding the suffix 'kc.txt" to the font file
                   path. If the path to the output PDF file is omitted,
                   it is constructed by adding ".pdf" to the log file
-                  path.
+                  path. If the log file has the report for several fonts,
+                  only the overlaps for the given font are used.
 
 -ptSize <number> : Set the point size of the glyph pair outline in the PDF report.
 """
@@ -107,10 +119,14 @@ __methods__ = """
 import sys
 import os
 import re
+import string
 import FDKUtils
 import math
+import bisect
+import multiprocessing
 import agd
 import traceback
+from fontTools.ttLib import TTFont, TTLibError
 
 kDefaultppEM = 100
 kLogFileExt = ".kc.txt"
@@ -125,6 +141,7 @@ class Reporter:
 	def __init__(self,logFileName = None):
 		self.fp = None
 		self.fileName = logFileName
+		self.numReports = 0
 		if logFileName:
 			try:
 				self.fp = open(logFileName, "wt")
@@ -137,8 +154,9 @@ class Reporter:
 		for arg in args:
 			print arg
 				
-	def close(self, fontPath, sortType, overlapList, conflictMsgList):
-		fontName = os.path.basename(fontPath)
+	def writeReport(self, fontPath, sortType, overlapList, conflictMsgList):
+		# The full path tells apart fonts with the same file name in a multi-font log.
+		fontName = os.path.abspath(fontPath)
 		if self.fp:
 			if sortType == 1:
 				overlapList = map(lambda entry: (entry[2:] + entry[:2]), overlapList)
@@ -149,6 +167,9 @@ class Reporter:
 				overlapList.reverse()
 			textList = map(lambda entry: "\tError: %s pixels overlap at %s ppem In glyph pair '%s %s with kern %s'." % (entry[0], entry[1], entry[2],  entry[3], entry[4]), overlapList)
 			data = os.linesep.join(textList)
+			if self.numReports:
+				self.fp.write(os.linesep)
+			self.numReports += 1
 			self.fp.write("# kernCheck report for font: %s. %s" % (fontName, os.linesep))
 			self.fp.write("%s### Glyph pairs with overlapping contours.%s" % (os.linesep, os.linesep))
 			if not data.strip():
@@ -159,6 +180,9 @@ class Reporter:
 			if not data.strip():
 				data = "\tNone" + os.linesep
 			self.fp.write(data)
+
+	def close(self):
+		if self.fp:
 			self.fp.close()
 			print "Log saved to file <%s>." % (self.fileName)
 
@@ -349,40 +373,8 @@ def parseKernLookup(featureText, fontFlatKernTable, lookup):
 				# it is a contextual positioning rule
 				isContextual = 1
 				posList = re.findall(r"\s(pos\s+[^;]+);", textBlock)
-				leftDict = {}
-				leftTupleDict = {}
-				rightDict = {}
-				rightTupleDict = {}
-				kernPairs = []
-				for line in posList:
-					backTrack, lookAhead, leftSide, rightSide, valueRecord = parseContextPos(line)
-					if leftSide == None:
-						continue
-
-					if type(leftSide) == type(()):
-						try:
-							leftName = leftTupleDict[leftSide]
-						except KeyError:
-							leftName = "@CONTEXT_LEFT_CLASS_%s" % (len(leftDict))
-							leftDict[leftName] = leftSide
-							leftTupleDict[leftSide] = leftName
-					else:
-						leftName = leftSide
-						leftSide = None
-						
-					if type(rightSide) == type(()):
-						try:
-							rightName = rightTupleDict[rightSide]
-						except KeyError:
-							rightName = "@CONTEXT_RIGHT_CLASS_%s" % (len(rightDict))
-							rightDict[rightName] = rightSide
-							rightTupleDict[rightSide] = rightName
-					else:
-						rightName = rightSide
-						rightSide = None
-					
-					kernPairs.append( [leftName, rightName, str(valueRecord)])
-					contextEntry = [backTrack, lookAhead, leftSide, rightSide]
+				contextRuleList = map(parseContextPos, posList)
+				leftDict, rightDict, kernPairs, contextEntry = getContextKernPairs(contextRuleList)
 				
 			elif re.search(r"@", textBlock):
 				# it is a class kern subtable.
@@ -398,77 +390,136 @@ def parseKernLookup(featureText, fontFlatKernTable, lookup):
 					rightDict[classEntry[0] ] = classEntry[1].split()
 				kernPairs = re.findall(r"pos\s+(\S+)\s+(\S+)\s+(-*\d+)", textBlock)
 				kernPairs = filter(lambda kernPair: kernPair[2] != "0", kernPairs)
+				kernPairs = map(lambda kernPair: (kernPair[0], kernPair[1], eval(kernPair[2])), kernPairs)
 			else:
 				# it is a non-class kern subtable.
 				leftDict = rightDict = None
 				kernPairs = re.findall(r"pos\s+(\S+)\s+(\S+)\s+(-*\d+)", textBlock)
 				kernPairs = filter(lambda kernPair: kernPair[2] != "0", kernPairs)
+				kernPairs = map(lambda kernPair: (kernPair[0], kernPair[1], eval(kernPair[2])), kernPairs)
 				
-			kernPairDict = {}
-			for pairEntry in kernPairs:
-				leftName = pairEntry[0]
-				rightName = pairEntry[1]
-				value = eval(pairEntry[2])
-				if type(value) != type(0):
-					#value = value[0] + value[2]
-					temp = 0
-					for v in value:
-						temp += abs(v)
-					if temp:
-						value = str(value)
-					else:
-						value = 0
-				rightSideDict = kernPairDict.get(leftName, {})
-				rightSideDict[rightName] = value
-				kernPairDict[leftName] = rightSideDict
+			subtable = addKernSubtable(kernPairs, leftDict, rightDict, isClassPair, contextEntry, sti, lookup, fontFlatKernTable)
+			if subtable:
+				subtableList.append(subtable)
 				
-				# Now add define fontFlatKernTable, using the full expansion of the classes.
-				leftClassName = rightClassName = None
-				try:
-					leftList = leftDict[leftName]
-					leftClassName = leftName
-				except (TypeError,KeyError):
-					leftList = [leftName]
-				try:
-					rightList = rightDict[rightName]
-					rightClassName = rightName
-				except (TypeError,KeyError):
-					rightList = [rightName]
+	return subtableList, fontFlatKernTable
+
+
+def getContextKernPairs(contextRuleList):
+	"""
+	contextRuleList is a list of (backTrack, lookAhead, leftSide,
+	rightSide, valueRecord) entries, as returned by parseContextPos.
+	Glyph classes on the left and right side get context class names.
+	Returns leftDict, rightDict, the list of (leftName, rightName, value)
+	kern pairs, and the context entry.
+	"""
+	leftDict = {}
+	leftTupleDict = {}
+	rightDict = {}
+	rightTupleDict = {}
+	kernPairs = []
+	contextEntry = None
+	for backTrack, lookAhead, leftSide, rightSide, valueRecord in contextRuleList:
+		if leftSide == None:
+			continue
 
-				for leftGlyphName in leftList:
+		if type(leftSide) == type(()):
+			try:
+				leftName = leftTupleDict[leftSide]
+			except KeyError:
+				leftName = "@CONTEXT_LEFT_CLASS_%s" % (len(leftDict))
+				leftDict[leftName] = leftSide
+				leftTupleDict[leftSide] = leftName
+		else:
+			leftName = leftSide
+			leftSide = None
+			
+		if type(rightSide) == type(()):
+			try:
+				rightName = rightTupleDict[rightSide]
+			except KeyError:
+				rightName = "@CONTEXT_RIGHT_CLASS_%s" % (len(rightDict))
+				rightDict[rightName] = rightSide
+				rightTupleDict[rightSide] = rightName
+		else:
+			rightName = rightSide
+			rightSide = None
+		
+		kernPairs.append( (leftName, rightName, valueRecord))
+		contextEntry = [backTrack, lookAhead, leftSide, rightSide]
+	return leftDict, rightDict, kernPairs, contextEntry
+
+
+def addKernSubtable(kernPairs, leftDict, rightDict, isClassPair, contextEntry, sti, lookup, fontFlatKernTable):
+	"""
+	Adds the (leftName, rightName, value) kern pairs of a subtable to
+	fontFlatKernTable, and returns the KernSubtable, or None if there
+	are no kern pairs. A value which is not an integer is a value record
+	list.
+	"""
+	kernPairDict = {}
+	for pairEntry in kernPairs:
+		leftName = pairEntry[0]
+		rightName = pairEntry[1]
+		value = pairEntry[2]
+		if type(value) != type(0):
+			#value = value[0] + value[2]
+			temp = 0
+			for v in value:
+				temp += abs(v)
+			if temp:
+				value = str(value)
+			else:
+				value = 0
+		rightSideDict = kernPairDict.get(leftName, {})
+		rightSideDict[rightName] = value
+		kernPairDict[leftName] = rightSideDict
+		
+		# Now add define fontFlatKernTable, using the full expansion of the classes.
+		leftClassName = rightClassName = None
+		try:
+			leftList = leftDict[leftName]
+			leftClassName = leftName
+		except (TypeError,KeyError):
+			leftList = [leftName]
+		try:
+			rightList = rightDict[rightName]
+			rightClassName = rightName
+		except (TypeError,KeyError):
+			rightList = [rightName]
+
+		for leftGlyphName in leftList:
+			try:
+				rightSideGlyphDict = fontFlatKernTable[leftGlyphName]
+			except KeyError:
+				rightSideGlyphDict = {}
+				fontFlatKernTable[leftGlyphName] = rightSideGlyphDict
+				
+			for rightGlyphName in rightList:
+				try:
+					valueList = rightSideGlyphDict[rightGlyphName]
+					valueList.append((sti, lookup, leftClassName, rightClassName, value, contextEntry))
+					# Don't overwrite a value we have already seen.
+				except KeyError:
+					rightSideGlyphDict[rightGlyphName] = [(sti, lookup, leftClassName, rightClassName, value, contextEntry)]
+			if  isClassPair:
 					try:
-						rightSideGlyphDict = fontFlatKernTable[leftGlyphName]
+						# Rather than specifying an entry for every other glyph in the font
+						# with a kern value of 0, I add one entry with this name.
+						valueList = rightSideGlyphDict[kAllGlyphs]
+						valueList.append((sti, lookup, leftClassName, rightClassName, 0, None))
+						# Don't overwrite a value we have already seen.
 					except KeyError:
-						rightSideGlyphDict = {}
-						fontFlatKernTable[leftGlyphName] = rightSideGlyphDict
-						
-					for rightGlyphName in rightList:
-						try:
-							valueList = rightSideGlyphDict[rightGlyphName]
-							valueList.append((sti, lookup, leftClassName, rightClassName, value, contextEntry))
-							# Don't overwrite a value we have already seen.
-						except KeyError:
-							rightSideGlyphDict[rightGlyphName] = [(sti, lookup, leftClassName, rightClassName, value, contextEntry)]
-					if  isClassPair:
-							try:
-								# Rather than specifying an entry for every other glyph in the font
-								# with a kern value of 0, I add one entry with this name.
-								valueList = rightSideGlyphDict[kAllGlyphs]
-								valueList.append((sti, lookup, leftClassName, rightClassName, 0, None))
-								# Don't overwrite a value we have already seen.
-							except KeyError:
-								rightSideGlyphDict[kAllGlyphs] = [(sti, lookup, leftClassName, rightClassName, 0, None)]
-					
-				
-					
-			if kernPairDict:
-				subtable = KernSubtable(leftDict, rightDict, kernPairDict)
-				subtableList.append(subtable)
-				
-	return subtableList, fontFlatKernTable
+						rightSideGlyphDict[kAllGlyphs] = [(sti, lookup, leftClassName, rightClassName, 0, None)]
+			
+		
+			
+	if kernPairDict:
+		return KernSubtable(leftDict, rightDict, kernPairDict)
+	return None
 
 
-def collectKernData(fontpath):
+def collectSpotKernData(fontpath):
 	""" return:
 		nameDict[leftGlyphName][rightGlyphName] = kern value
 		tableList[classDicts], where classDict[leftClassNameList][rightClassNameList] = value
@@ -524,6 +575,10 @@ def collectKernData(fontpath):
 		logMsg("Error: did not find any kern feature text in the output of the command '%s'." % (command))
 		return None
 	
+	lookupSequenceDict = getLookupSequenceDict(scriptDict)
+	return lookupIndexDict, lookupSequenceDict, fontFlatKernTable
+
+def getLookupSequenceDict(scriptDict):
 	# Now build the dict mapping unique lookup sequences to script/language pairs.
 	lookupSequenceDict = {}
 	for script in scriptDict.keys():
@@ -534,11 +589,269 @@ def collectKernData(fontpath):
 			slList = lookupSequenceDict.get(lookupSequence, [])
 			slList.append( (script, langTag) )
 			lookupSequenceDict[lookupSequence] = slList
+	return lookupSequenceDict
+
+def getPosSubtable(subtable):
+	# Return the real subtable of an Extension subtable.
+	if hasattr(subtable, "ExtSubTable"):
+		return subtable.ExtSubTable
+	return subtable
+
+def getPosValue(valueRecord, valueFormat):
+	# Return the value record in the same form as the spot text: an integer
+	# when only the x advance is set, else a list < xPla yPla xAdv yAdv >.
+	if valueRecord == None:
+		return 0
+	if valueFormat == 4:
+		return valueRecord.XAdvance
+	return map(lambda name: getattr(valueRecord, name, 0), ["XPlacement", "YPlacement", "XAdvance", "YAdvance"])
+
+def getClassGlyphs(classDef, glyphList, classDefsOnly = 0):
+	# Return a dict of class index : glyph list, for the glyphs in glyphList.
+	# Glyphs not in the class def are class 0, unless classDefsOnly is set.
+	classDefs = {}
+	if classDef:
+		classDefs = classDef.classDefs
+	classGlyphDict = {}
+	for glyphName in glyphList:
+		classIndex = classDefs.get(glyphName, 0)
+		if classIndex or not classDefsOnly:
+			classGlyphDict.setdefault(classIndex, []).append(glyphName)
+	return classGlyphDict
+
+def getGPOSPairKernPairs(subtable, sti, lookup, glyphOrder):
+	# Return leftDict, rightDict and the kern pairs of a PairPos subtable, in the same form
+	# as parseKernLookup. For class pairs, the classes are kept as class names.
+	coverageGlyphs = subtable.Coverage.glyphs
+	kernPairs = []
+	if subtable.Format == 1:
+		for i in range(len(coverageGlyphs)):
+			for pairValueRecord in subtable.PairSet[i].PairValueRecord:
+				value = pairValueRecord.Value1
+				if value and getattr(value, "XAdvance", 0):
+					kernPairs.append((coverageGlyphs[i], pairValueRecord.SecondGlyph, value.XAdvance))
+		return None, None, kernPairs
+
+	leftDict = {}
+	for classIndex, glyphList in getClassGlyphs(subtable.ClassDef1, coverageGlyphs).items():
+		leftDict["@LEFT_CLASS_c%s_s%s_l%s" % (classIndex, sti, lookup)] = glyphList
+	# Right side class 0 is all the glyphs in the font not in ClassDef2; it is built
+	# only if it has a kern value, as it is usually very large.
+	rightDict = {}
+	classGlyphDict = getClassGlyphs(subtable.ClassDef2, glyphOrder, classDefsOnly = 1)
+	for class1Record in subtable.Class1Record:
+		value = class1Record.Class2Record[0].Value1
+		if value and getattr(value, "XAdvance", 0):
+			classGlyphDict = getClassGlyphs(subtable.ClassDef2, glyphOrder)
+			break
+	for classIndex, glyphList in classGlyphDict.items():
+		rightDict["@RIGHT_CLASS_c%s_s%s_l%s" % (classIndex, sti, lookup)] = glyphList
+	for class1Index in range(len(subtable.Class1Record)):
+		leftName = "@LEFT_CLASS_c%s_s%s_l%s" % (class1Index, sti, lookup)
+		if not leftDict.has_key(leftName):
+			continue
+		class2RecordList = subtable.Class1Record[class1Index].Class2Record
+		for class2Index in range(len(class2RecordList)):
+			value = class2RecordList[class2Index].Value1
+			if value and getattr(value, "XAdvance", 0):
+				rightName = "@RIGHT_CLASS_c%s_s%s_l%s" % (class2Index, sti, lookup)
+				if rightDict.has_key(rightName):
+					kernPairs.append((leftName, rightName, value.XAdvance))
+	return leftDict, rightDict, kernPairs
+
+def getChainContextRules(subtable, glyphOrder):
+	# Return the rules of a ChainContextPos subtable as (backTrack, input, lookAhead, PosLookupRecord list)
+	# entries. Each sequence is a list of glyph lists; the backTrack is in text order.
+	ruleList = []
+	if subtable.Format == 1:
+		coverageGlyphs = subtable.Coverage.glyphs
+		for i in range(len(coverageGlyphs)):
+			for rule in subtable.ChainPosRuleSet[i].ChainPosRule:
+				backTrack = map(lambda glyphName: [glyphName], rule.Backtrack)
+				backTrack.reverse()
+				inputSeq = map(lambda glyphName: [glyphName], [coverageGlyphs[i]] + list(rule.Input))
+				lookAhead = map(lambda glyphName: [glyphName], rule.LookAhead)
+				ruleList.append((backTrack, inputSeq, lookAhead, rule.PosLookupRecord))
+	elif subtable.Format == 2:
+		backTrackClasses = getClassGlyphs(subtable.BacktrackClassDef, glyphOrder)
+		inputClasses = getClassGlyphs(subtable.InputClassDef, glyphOrder)
+		lookAheadClasses = getClassGlyphs(subtable.LookAheadClassDef, glyphOrder)
+		coverageDict = dict.fromkeys(subtable.Coverage.glyphs, 1)
+		for classIndex in range(len(subtable.ChainPosClassSet)):
+			classSet = subtable.ChainPosClassSet[classIndex]
+			if not classSet:
+				continue
+			firstGlyphs = filter(coverageDict.has_key, inputClasses.get(classIndex, []))
+			for rule in classSet.ChainPosClassRule:
+				backTrack = map(lambda ci: backTrackClasses.get(ci, []), rule.Backtrack)
+				backTrack.reverse()
+				inputSeq = [firstGlyphs] + map(lambda ci: inputClasses.get(ci, []), rule.Input)
+				lookAhead = map(lambda ci: lookAheadClasses.get(ci, []), rule.LookAhead)
+				ruleList.append((backTrack, inputSeq, lookAhead, rule.PosLookupRecord))
+	elif subtable.Format == 3:
+		backTrack = map(lambda coverage: coverage.glyphs, subtable.BacktrackCoverage)
+		backTrack.reverse()
+		inputSeq = map(lambda coverage: coverage.glyphs, subtable.InputCoverage)
+		lookAhead = map(lambda coverage: coverage.glyphs, subtable.LookAheadCoverage)
+		ruleList.append((backTrack, inputSeq, lookAhead, subtable.PosLookupRecord))
+	return ruleList
+
+def getSinglePosValues(lookupObj, glyphList):
+	# Return a dict of glyph name : value, for the glyphs in glyphList which
+	# are positioned by the SinglePos lookup lookupObj.
+	valueDict = {}
+	for subtable in lookupObj.SubTable:
+		subtable = getPosSubtable(subtable)
+		if subtable.LookupType != 1:
+			continue
+		coverageGlyphs = subtable.Coverage.glyphs
+		coverageIndexDict = dict(zip(coverageGlyphs, range(len(coverageGlyphs))))
+		for glyphName in glyphList:
+			if valueDict.has_key(glyphName) or not coverageIndexDict.has_key(glyphName):
+				continue
+			if subtable.Format == 1:
+				valueDict[glyphName] = getPosValue(subtable.Value, subtable.ValueFormat)
+			else:
+				valueDict[glyphName] = getPosValue(subtable.Value[coverageIndexDict[glyphName]], subtable.ValueFormat)
+	return valueDict
+
+def getGPOSContextKernPairs(subtable, lookupList, glyphOrder):
+	# Convert the rules of a ChainContextPos subtable to the (backTrack, lookAhead, leftSide, rightSide, valueRecord)
+	# entries that parseContextPos returns for the spot text, and return the result of getContextKernPairs().
+	# As with the spot text, only the rules with a single marked glyph run after a backtrack glyph, and the rules
+	# with two marked glyph runs, are used. The value is taken from a SinglePos lookup applied to the right side.
+	def getRun(glyphList):
+		if len(glyphList) == 1:
+			return glyphList[0]
+		return list(glyphList)
+
+	contextRuleList = []
+	for backTrack, inputSeq, lookAhead, posLookupRecordList in getChainContextRules(subtable, glyphOrder):
+		if len(inputSeq) == 1:
+			if not backTrack:
+				continue
+			leftSide = backTrack[-1]
+			backTrack = backTrack[:-1]
+		elif len(inputSeq) == 2:
+			leftSide = inputSeq[0]
+		else:
+			continue
+		rightSide = inputSeq[-1]
+		valueDict = {}
+		for posLookupRecord in posLookupRecordList:
+			if posLookupRecord.SequenceIndex == len(inputSeq) - 1:
+				valueDict = getSinglePosValues(lookupList.Lookup[posLookupRecord.LookupListIndex], rightSide)
+			elif getSinglePosValues(lookupList.Lookup[posLookupRecord.LookupListIndex], leftSide):
+				logMsg("\tError: Can deal only with value record at end of marked glyph run. ! Contextual rule with left side '%s'." % (" ".join(leftSide)))
+		if not backTrack:
+			backTrack = None
+		else:
+			backTrack = map(getRun, backTrack)
+		if not lookAhead:
+			lookAhead = None
+		else:
+			lookAhead = map(getRun, lookAhead)
+		leftSide = getRun(leftSide)
+		if type(leftSide) != type(""):
+			leftSide = tuple(leftSide)
+		# The right side glyphs may have different values; make a rule for each value.
+		valueGlyphDict = {}
+		for glyphName in rightSide:
+			valueGlyphDict.setdefault(repr(valueDict.get(glyphName, 0)), []).append(glyphName)
+		for valueKey, glyphList in valueGlyphDict.items():
+			rightRun = getRun(glyphList)
+			if type(rightRun) != type(""):
+				rightRun = tuple(rightRun)
+			contextRuleList.append((backTrack, lookAhead, leftSide, rightRun, valueDict.get(glyphList[0], 0)))
+	return getContextKernPairs(contextRuleList)
+
+def parseGPOSKernLookup(gposTable, lookupIndex, glyphOrder, fontFlatKernTable):
+	# The same as parseKernLookup, but reads the lookup from the GPOS table.
+	lookup = str(lookupIndex)
+	lookupObj = gposTable.LookupList.Lookup[lookupIndex]
+	subtableList = []
+	for i in range(len(lookupObj.SubTable)):
+		sti = i + 1 # In the spot text, the subtables follow the lookup header, and so are counted from 1.
+		subtable = getPosSubtable(lookupObj.SubTable[i])
+		contextEntry = None
+		if subtable.LookupType == 2:
+			leftDict, rightDict, kernPairs = getGPOSPairKernPairs(subtable, sti, lookup, glyphOrder)
+			isClassPair = (subtable.Format == 2)
+		elif subtable.LookupType == 8:
+			leftDict, rightDict, kernPairs, contextEntry = getGPOSContextKernPairs(subtable, gposTable.LookupList, glyphOrder)
+			isClassPair = 0
+		else:
+			continue
+		subtable = addKernSubtable(kernPairs, leftDict, rightDict, isClassPair, contextEntry, sti, lookup, fontFlatKernTable)
+		if subtable:
+			subtableList.append(subtable)
+	return subtableList, fontFlatKernTable
+
+def collectGPOSKernData(fontpath):
+	"""
+	The same as collectSpotKernData, but reads the kern feature lookups
+	directly from the GPOS table with the fontTools otTables, rather than
+	parsing the text dump from spot.
+	"""
+	try:
+		ttFont = TTFont(fontpath)
+		hasGPOS = ttFont.has_key("GPOS")
+	except TTLibError:
+		logMsg("Error: could not open font '%s' with fontTools. %s" % (fontpath, traceback.format_exception_only(sys.exc_type, sys.exc_value)[-1]))
+		return None
+	if not hasGPOS:
+		logMsg("Error: did not find a GPOS table in font '%s'." % (fontpath))
+		return None
+	gposTable = ttFont["GPOS"].table
+	glyphOrder = ttFont.getGlyphOrder()
+	scriptDict = {}
+	lookupIndexDict = {}
+	fontFlatKernTable = {}
+	if gposTable.ScriptList and gposTable.FeatureList and gposTable.LookupList:
+		featureRecordList = gposTable.FeatureList.FeatureRecord
+		for scriptRecord in gposTable.ScriptList.ScriptRecord:
+			langSysList = []
+			if scriptRecord.Script.DefaultLangSys:
+				langSysList.append(("dflt", scriptRecord.Script.DefaultLangSys))
+			for langSysRecord in scriptRecord.Script.LangSysRecord:
+				langSysList.append((langSysRecord.LangSysTag, langSysRecord.LangSys))
+			for lang, langSys in langSysList:
+				featureIndexList = list(langSys.FeatureIndex)
+				if langSys.ReqFeatureIndex != 0xFFFF:
+					featureIndexList.insert(0, langSys.ReqFeatureIndex)
+				lookupDict = {}
+				for featureIndex in featureIndexList:
+					featureRecord = featureRecordList[featureIndex]
+					if featureRecord.FeatureTag != "kern":
+						continue
+					for lookupIndex in featureRecord.Feature.LookupListIndex:
+						lookup = str(lookupIndex)
+						lookupDict[lookup] = lookup
+						# As with spot, each lookup is read only the first time it is seen.
+						if not lookupIndexDict.has_key(lookup):
+							subtableList, fontFlatKernTable = parseGPOSKernLookup(gposTable, lookupIndex, glyphOrder, fontFlatKernTable)
+							lookupIndexDict[lookup] = subtableList
+				if lookupDict:
+					scriptDict.setdefault(scriptRecord.ScriptTag, {})[lang] = lookupDict
+	ttFont.close()
+			
+	if not scriptDict:
+		logMsg("Error: did not find any kern feature in the GPOS table of font '%s'." % (fontpath))
+		return None
+	
+	lookupSequenceDict = getLookupSequenceDict(scriptDict)
 	return lookupIndexDict, lookupSequenceDict, fontFlatKernTable
 
+def collectKernData(fontpath, useSpot = 0):
+	if useSpot:
+		return collectSpotKernData(fontpath)
+	return collectGPOSKernData(fontpath)
+
 class TXBitMap:
 	kIndexPat = re.compile(r"(-*\d+)")
 	kAdvWidthPath = re.compile(r"(-*\d+),(-*\d+)")
+	kBitTable = string.maketrans("#. ", "100")
+	kNoPixel = 9999999
 	def __init__(self,glyphName, txReport, ppEM):
 		"""
 		A tx bit map is a series of scan lines that covers the vertical
@@ -601,7 +914,33 @@ class TXBitMap:
 				lineLength -= self.lsb
 		
 		self.scanLines = map(lambda line: line[:lineLength], scanLines) # get rid of the final spaces and line indices.
+		self.makeBitRows()
 		setGlyphClasses(self)
+
+	def makeBitRows(self):
+		"""
+		Pack each scan line into an integer, with bit i set when the
+		pixel at index i in the line is on. For each scan line, also
+		record the index of the first and last pixel that is on
+		(kNoPixel and -1 when the line is empty), and its length.
+		The overlap and distance checks work on these instead of
+		comparing the scan line strings one character at a time.
+		"""
+		self.bitRows = bitRows = []
+		self.leftProfile = leftProfile = []
+		self.rightProfile = rightProfile = []
+		self.lineLengths = lineLengths = []
+		for scanLine in self.scanLines:
+			lineLengths.append(len(scanLine))
+			first = scanLine.find("#")
+			if first < 0:
+				bitRows.append(0)
+				leftProfile.append(self.kNoPixel)
+				rightProfile.append(-1)
+				continue
+			bitRows.append(int(scanLine[::-1].translate(self.kBitTable), 2))
+			leftProfile.append(first)
+			rightProfile.append(scanLine.rfind("#"))
 	
 	def getCenter(self):
 		if self.center == None:
@@ -894,8 +1233,31 @@ def getCase(glyphName):
 
 		
 			
+def scaleKernValue(value, ppEM):
+	# Convert a kern value in font units to pixels at ppEM, rounding away from zero.
+	if value >= 0:
+		return int(0.5 + value*ppEM/1000.0)
+	else:
+		return int(-0.5 + value*ppEM/1000.0)
+
 def checkGlyphOverlap(leftBitMap, rightBitMap, value, limitVal):
+	overlapArea = calcGlyphOverlapArea(leftBitMap, rightBitMap, scaleKernValue(value, leftBitMap.ppEM))
+	return reportGlyphOverlap(overlapArea, leftBitMap, rightBitMap, value, limitVal)
+
+def reportGlyphOverlap(overlapArea, leftBitMap, rightBitMap, origValue, limitVal):
+	if (overlapArea != None) and (overlapArea >= limitVal):
+		ppEM = leftBitMap.ppEM
+		logMsg("\tError: %s pixels overlap at %s ppem In glyph pair '%s %s with kern %s'." % (overlapArea, ppEM, leftBitMap.glyphName, rightBitMap.glyphName, origValue))
+		return overlapArea, ppEM, leftBitMap.glyphName, rightBitMap.glyphName, origValue
+	return None
+
+def calcGlyphOverlapArea(leftBitMap, rightBitMap, value):
 	"""
+	Returns the number of overlapping pixels when the right bitmap is
+	placed at the left bitmap's advance width plus 'value', a kern
+	value in pixels. Returns None when the bounding boxes cannot
+	overlap.
+
 	If the sum of the left RSB and the right bitmap LSB  and the kern
 	value are greater than zero, there cannot be an overlap.
 
@@ -906,12 +1268,6 @@ def checkGlyphOverlap(leftBitMap, rightBitMap, value, limitVal):
 	a pixel is on in both  bitmaps, there is overlap.
 	"""
 	
-	ppEM = leftBitMap.ppEM
-	origValue = value
-	if value >= 0:
-		value = int(0.5 + value*ppEM/1000.0)
-	else:
-		value = int(-0.5 + value*ppEM/1000.0)
 	overlapRange = leftBitMap.rsb + rightBitMap.lsb + value
 	if overlapRange >= 0:
 		return None # Can't have an overlap - there is space between the glyph bounding boxes
@@ -949,25 +1305,25 @@ def checkGlyphOverlap(leftBitMap, rightBitMap, value, limitVal):
 	if testRange >= lsEnd - lsStart: # very long swashes on the left side can extend further than the right side of the right bitmap.
 		testRange = lsEnd - lsStart
 	overlapArea = 0
-	lineCount = 0
-	while lineCount < bboxHeight:
-		leftLine = leftBitMap.scanLines[leftLineIndex]
-		rightLine = rightBitMap.scanLines[rightLineIndex]
-		leftLineIndex += 1
-		rightLineIndex += 1
-		lineCount += 1
-		lsi = lsStart
-		rsi = rsStart
-		for i in range(testRange):
-			if (leftLine[lsi] == "#") and (rightLine[rsi] == "#"):
-				overlapArea  +=1
-			lsi += 1
-			rsi +=1
+	if testRange > 0:
+		# Compare the packed scan lines. A line pair is skipped when the
+		# last 'on' pixel of the left line is before the test range, or the first
+		# 'on' pixel of the right line is after it.
+		mask = (1 << testRange) - 1
+		rsLast = rsStart + testRange
+		leftBitRows = leftBitMap.bitRows
+		rightBitRows = rightBitMap.bitRows
+		leftRightProfile = leftBitMap.rightProfile
+		rightLeftProfile = rightBitMap.leftProfile
+		for lineCount in xrange(bboxHeight):
+			if (leftRightProfile[leftLineIndex] >= lsStart) and (rightLeftProfile[rightLineIndex] < rsLast):
+				bits = (leftBitRows[leftLineIndex] >> lsStart) & (rightBitRows[rightLineIndex] >> rsStart) & mask
+				if bits:
+					overlapArea += bin(bits).count("1")
+			leftLineIndex += 1
+			rightLineIndex += 1
 			
-	if overlapArea >= limitVal:
-		logMsg("\tError: %s pixels overlap at %s ppem In glyph pair '%s %s with kern %s'." % (overlapArea, ppEM, leftBitMap.glyphName, rightBitMap.glyphName, origValue))
-		return overlapArea, ppEM, leftBitMap.glyphName, rightBitMap.glyphName, origValue
-	return None
+	return overlapArea
 
 def skipGlyphPair(leftBitMap, rightBitMap):
 	skip = 0
@@ -995,9 +1351,185 @@ def skipGlyphPair(leftBitMap, rightBitMap):
 		
 	return 0
 	
+class GlyphPairIndex:
+	"""
+	Prunes and shares the work of the glyph pair overlap checks.
+
+	For each glyph, the scan lines are grouped into horizontal bands
+	of kBandHeight pixels, indexed up from the base-line. For each band,
+	the index keeps the right-most 'on' pixel, relative to the advance
+	width, for when the glyph is on the left side of a pair, and the
+	left-most 'on' pixel, relative to the origin, for when the glyph is
+	on the right side of a pair. Two glyphs can only overlap if, in some
+	band, the left glyph's right edge reaches the right glyph's left edge
+	once the kern value is applied. For unkerned pairs, the right side
+	glyphs that can overlap a left side glyph are found by bisecting
+	lists of the right side glyphs sorted by their left edge in each band.
+
+	Glyphs are also grouped into classes which have exactly the same
+	side profile: the same vertical extent and side bearing, and the same
+	pixels in the part of the bitmap which can be reached by any kern
+	value in the font. This is common with composite glyphs and with
+	glyphs in kerning classes. The overlap area is then calculated only
+	once for each pair of left and right classes and kern value.
+	"""
+	kBandHeight = 4
+	
+	def __init__(self, glyphBitMapDict, fontFlatKernTable, ppEM, limitVal):
+		self.glyphBitMapDict = glyphBitMapDict
+		self.limitVal = limitVal
+		self.ppEM = ppEM
+		# When limitVal is 0 or less, pairs are reported even if no pixels overlap,
+		# so only pairs whose bounding boxes do not overlap can be skipped.
+		self.doPrune = limitVal > 0
+		self.areaCache = {}
+		self.numPruned = 0
+		self.numChecked = 0
+		self.numShared = 0
+
+		# Find how far any glyph pair can be pushed together, in order to know how
+		# far into each bitmap the overlap check can look.
+		minValue = 0
+		for rightSideDict in fontFlatKernTable.values():
+			for valueList in rightSideDict.values():
+				for entry in valueList:
+					minValue = min(minValue, scaleKernValue(entry[4], ppEM))
+		bitMapList = glyphBitMapDict.values()
+		self.minLSB = min([0] + map(lambda bitMap: bitMap.lsb, bitMapList))
+		self.minRSB = min([0] + map(lambda bitMap: bitMap.rsb, bitMapList))
+		self.minValue = minValue
+
+		# The band edges, the class ids and the sorted band lists are built only when first needed.
+		self.bandEdgeDict = {}
+		self.leftClassDict = {}
+		self.rightClassDict = {}
+		self.leftClassKeys = {}
+		self.rightClassKeys = {}
+		self.bandEdgeLists = None
+		self.bandNameLists = None
+
+	def buildBandLists(self):
+		bandDict = {}
+		for glyphName in self.glyphBitMapDict.keys():
+			for band, edge in self.getBandEdges(glyphName)[1].items():
+				bandDict.setdefault(band, []).append((edge, glyphName))
+		self.bandEdgeLists = {}
+		self.bandNameLists = {}
+		for band, edgeList in bandDict.items():
+			edgeList.sort()
+			self.bandEdgeLists[band] = map(lambda entry: entry[0], edgeList)
+			self.bandNameLists[band] = map(lambda entry: entry[1], edgeList)
+
+	def getLeftClass(self, bitMap):
+		try:
+			return self.leftClassDict[bitMap.glyphName]
+		except KeyError:
+			key = self.getLeftSideKey(bitMap, -(bitMap.rsb + self.minLSB + self.minValue))
+			classID = self.leftClassDict[bitMap.glyphName] = self.leftClassKeys.setdefault(key, len(self.leftClassKeys))
+			return classID
+
+	def getRightClass(self, bitMap):
+		try:
+			return self.rightClassDict[bitMap.glyphName]
+		except KeyError:
+			key = self.getRightSideKey(bitMap, -(self.minRSB + bitMap.lsb + self.minValue))
+			classID = self.rightClassDict[bitMap.glyphName] = self.rightClassKeys.setdefault(key, len(self.rightClassKeys))
+			return classID
+
+	def getBandEdges(self, glyphName):
+		"""
+		Returns the side edges of the glyph for each band: for the right
+		side, when the glyph is on the left side of a pair, the max x -
+		advanceWidth, and for the left side, when the glyph is on the
+		right side of a pair, the min x.
+		"""
+		try:
+			return self.bandEdgeDict[glyphName]
+		except KeyError:
+			pass
+		bitMap = self.glyphBitMapDict[glyphName]
+		rightSideEdges = {}
+		leftSideEdges = {}
+		origin = min(bitMap.lsb, 0) # when the lsb is negative, the scan lines start at the lsb.
+		for i in range(bitMap.bboxHeight):
+			if bitMap.rightProfile[i] < 0:
+				continue # no pixels on in this line.
+			band = (bitMap.bboxTopIndex - i) / self.kBandHeight
+			edge = bitMap.rightProfile[i] + origin - bitMap.advanceWidth
+			if edge > rightSideEdges.get(band, edge - 1):
+				rightSideEdges[band] = edge
+			edge = bitMap.leftProfile[i] + origin
+			if edge < leftSideEdges.get(band, edge + 1):
+				leftSideEdges[band] = edge
+		self.bandEdgeDict[glyphName] = rightSideEdges, leftSideEdges
+		return rightSideEdges, leftSideEdges
+
+	def getLeftSideKey(self, bitMap, maxRange):
+		# When the glyph is on the left side, calcGlyphOverlapArea looks only
+		# at the maxRange pixels to the left of the BBox right.
+		if maxRange <= 0:
+			return None
+		bboxRightIndex = bitMap.advanceWidth - (bitMap.rsb + 1) - min(bitMap.lsb, 0)
+		shift = max(0, bboxRightIndex - maxRange)
+		bitRows = tuple(map(lambda bitRow: bitRow >> shift, bitMap.bitRows))
+		return bitMap.bboxTopIndex, bitMap.bboxBottomIndex, bitMap.rsb, bboxRightIndex - shift, bitRows
+
+	def getRightSideKey(self, bitMap, maxRange):
+		# When the glyph is on the right side, calcGlyphOverlapArea looks only
+		# at the maxRange pixels to the right of the BBox left.
+		if maxRange <= 0:
+			return None
+		mask = (1 << (max(bitMap.lsb, 0) + maxRange)) - 1
+		bitRows = tuple(map(lambda bitRow: bitRow & mask, bitMap.bitRows))
+		lineRange = min(bitMap.advanceWidth - (bitMap.lsb + 1), maxRange)
+		return bitMap.bboxTopIndex, bitMap.bboxBottomIndex, bitMap.lsb, lineRange, bitRows
+
+	def canOverlap(self, leftName, rightName, value):
+		# value is the kern value in pixels. Because of the way calcGlyphOverlapArea
+		# aligns the scan lines, a left pixel at x - 1 is tested against a right pixel at x.
+		if not self.doPrune:
+			return 1
+		leftSideEdges = self.getBandEdges(rightName)[1]
+		for band, edge in self.getBandEdges(leftName)[0].items():
+			if edge - leftSideEdges.get(band, edge + 1) >= value - 1:
+				return 1
+		return 0
+
+	def getCandidates(self, leftName, value):
+		# Return the names of the glyphs which can overlap when on the right side of leftName.
+		if self.bandEdgeLists == None:
+			self.buildBandLists()
+		candidateDict = {}
+		for band, edge in self.getBandEdges(leftName)[0].items():
+			edgeList = self.bandEdgeLists.get(band, None)
+			if edgeList:
+				nameList = self.bandNameLists[band]
+				for i in range(bisect.bisect_right(edgeList, edge + 1 - value)):
+					candidateDict[nameList[i]] = 1
+		return candidateDict.keys()
+
+	def checkPair(self, leftBitMap, rightBitMap, value):
+		pixelValue = scaleKernValue(value, self.ppEM)
+		if (leftBitMap.rsb + rightBitMap.lsb + pixelValue >= 0) or not self.canOverlap(leftBitMap.glyphName, rightBitMap.glyphName, pixelValue):
+			# There is space between the glyph bounding boxes, or between their side extents.
+			self.numPruned += 1
+			return None
+		classKey = (self.getLeftClass(leftBitMap), self.getRightClass(rightBitMap), pixelValue)
+		if self.areaCache.has_key(classKey):
+			self.numShared += 1
+			overlapArea = self.areaCache[classKey]
+		else:
+			self.numChecked += 1
+			overlapArea = self.areaCache[classKey] = calcGlyphOverlapArea(leftBitMap, rightBitMap, pixelValue)
+		return reportGlyphOverlap(overlapArea, leftBitMap, rightBitMap, value, self.limitVal)
+
+	def logStats(self):
+		logMsg("Glyph pairs: %s pruned by side extents, %s checked, %s shared with a glyph pair with the same side profiles. %s left side and %s right side profile classes for %s glyphs." % (self.numPruned, self.numChecked, self.numShared, len(self.leftClassKeys), len(self.rightClassKeys), len(self.glyphBitMapDict)))
+
 def checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, limitVal):
 	overlapList = []
 	glyphNameList = glyphBitMapDict.keys()
+	pairIndex = GlyphPairIndex(glyphBitMapDict, fontFlatKernTable, ppEM, limitVal)
 	if doAll:
 		doSome = (doAll == 1) # If doAll ==1, we skip some glyph pairs.
 		leftCaseValue = 0
@@ -1012,11 +1544,19 @@ def checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, l
 				skipLeft = 1
 			else:
 				skipLeft = 0 # I don't skip it here, as I do need to check the pair if it is kerned.
-			for rightName in glyphNameList:
-				if rightSideDict:
-					 valueList = rightSideDict.get(rightName, [(0, 0, None, None, 0, None)])
-				else:
-					value = 0
+			if pairIndex.doPrune:
+				# Unkerned right side glyphs are checked only if their side extents can overlap this glyph.
+				rightNameDict = dict.fromkeys(pairIndex.getCandidates(leftName, 0), 1)
+				for rightName in rightSideDict.keys():
+					if glyphBitMapDict.has_key(rightName):
+						rightNameDict[rightName] = 1
+				rightNames = rightNameDict.keys()
+				rightNames.sort()
+				pairIndex.numPruned += len(glyphNameList) - len(rightNames)
+			else:
+				rightNames = glyphNameList
+			for rightName in rightNames:
+				valueList = rightSideDict.get(rightName, [(0, 0, None, None, 0, None)])
 				seenValue = {}
 				for entry in valueList:
 					sti, lookup, leftClassName, rightClassName, value, contextEntry = entry
@@ -1033,7 +1573,7 @@ def checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, l
 							continue
 					if doSome and skipGlyphPair(leftBitMap, rightBitMap):
 						continue
-					overlapEntry = checkGlyphOverlap(leftBitMap, rightBitMap, value, limitVal)
+					overlapEntry = pairIndex.checkPair(leftBitMap, rightBitMap, value)
 					if overlapEntry:
 						overlapList.append(overlapEntry)
 	else:
@@ -1060,10 +1600,11 @@ def checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, l
 					else:
 						seenValue[value] = 1
 					rightBitMap = glyphBitMapDict[rightName]
-					overlapEntry = checkGlyphOverlap(leftBitMap, rightBitMap, value, limitVal)
+					overlapEntry = pairIndex.checkPair(leftBitMap, rightBitMap, value)
 					if overlapEntry:
 						overlapList.append(overlapEntry)
 		
+	pairIndex.logStats()
 	return overlapList
 	
 def sequenceMatches(prev_seq, seq, sameLookup):
@@ -1406,27 +1947,23 @@ class AdjustmentMedthod_RMS(AdjustmentMedthod_Base):
 		#logMsg("leftBitMap.bboxTopIndex %s rightBitMap.bboxTopIndex %s." % (leftBitMap.bboxTopIndex, rightBitMap.bboxTopIndex))
 		#logMsg("leftBitMap.bboxBottomIndex %s rightBitMap.bboxBottomIndex %s." % (leftBitMap.bboxBottomIndex, rightBitMap.bboxBottomIndex))
 		#logMsg("leftLineIndex %s rightLineIndex %s." % (leftLineIndex, rightLineIndex))
+		# find first black pixel in left image, searching from the right, but not past lLimit,
+		# and first black pixel in right image, searching from the left, but not past rLimit.
+		# The per-line pixel extents of the bitmaps give these directly.
+		advw = leftBitMap.advanceWidth
+		lLimit = max(0, advw/2)
+		rLimit = max(0, min( rightBitMap.advanceWidth/2, rightBitMap.advanceWidth - rightBitMap.rsb))
+		leftRightProfile = leftBitMap.rightProfile
+		leftLineLengths = leftBitMap.lineLengths
+		rightLeftProfile = rightBitMap.leftProfile
 		while lineCount < bboxHeight:
 				
-			leftLine = leftBitMap.scanLines[leftLineIndex]
-			rightLine = rightBitMap.scanLines[rightLineIndex]
+			lsi = max(leftRightProfile[leftLineIndex], min(lLimit, leftLineLengths[leftLineIndex]-1))
+			rsi = min(rightLeftProfile[rightLineIndex], rLimit)
 			leftLineIndex += 1
 			rightLineIndex += 1
 			lineCount += 1
-			
-			# find first black pixel in left image, searching from 
-			advw = leftBitMap.advanceWidth
-			lLimit = max(0, advw/2)
-			lsi = len(leftLine)-1
-			while (leftLine[lsi] != "#") and (lsi > lLimit):
-				lsi -= 1
 			lDist = advw - (lsi+ leftOffset + 1)
-			
-			# find first black pixel in right image
-			rsi = 0 
-			rLimit = min( rightBitMap.advanceWidth/2, rightBitMap.advanceWidth - rightBitMap.rsb)
-			while (rightLine[rsi] != "#") and (rsi < rLimit):
-				rsi += 1
 			rDist = rsi - rightOffset
 			
 			#if (lsi == lLimit) and (rsi == rLimit):
@@ -1546,6 +2083,9 @@ class AdjustmentMedthod_Lookup(AdjustmentMedthod_Base):
 		rightOffset = 0
 		if rightBitMap.lsb < 0:
 			rightOffset = -rightBitMap.lsb
+		advw = leftBitMap.advanceWidth
+		lLimit = max(0, advw - self.maxIn)
+		rLimit = max(0, min(self.maxIn, rightBitMap.advanceWidth - rightBitMap.rsb))
 			
 		while lineCount < bboxHeight:
 			if (leftLineIndex < 0) or (leftLineIndex >= leftBitMap.bboxHeight):
@@ -1565,25 +2105,14 @@ class AdjustmentMedthod_Lookup(AdjustmentMedthod_Base):
 				opticalDistance += dist
 				continue
 				
-			leftLine = leftBitMap.scanLines[leftLineIndex]
-			rightLine = rightBitMap.scanLines[rightLineIndex]
+			# find first black pixel in left image, searching from the right, but not past lLimit,
+			# and first black pixel in right image, searching from the left, but not past rLimit.
+			lsi = max(leftBitMap.rightProfile[leftLineIndex], min(lLimit, leftBitMap.lineLengths[leftLineIndex]-1))
+			rsi = min(rightBitMap.leftProfile[rightLineIndex], rLimit)
 			leftLineIndex += 1
 			rightLineIndex += 1
 			lineCount += 1
-			
-			# find first black pixel in left image, searching from 
-			advw = leftBitMap.advanceWidth
-			lLimit = max(0, advw - self.maxIn)
-			lsi = len(leftLine)-1
-			while (leftLine[lsi] != "#") and (lsi > lLimit):
-				lsi -= 1
 			lDist = advw - (lsi+ leftOffset + 1)
-			
-			# find first black pixel in right image
-			rsi = 0 
-			rLimit = min(self.maxIn, rightBitMap.advanceWidth - rightBitMap.rsb)
-			while (rightLine[rsi] != "#") and (rsi < rLimit):
-				rsi += 1
 			rDist = rsi - rightOffset
 			
 			#if (lsi == lLimit) and (rsi == rLimit):
@@ -1718,8 +2247,57 @@ def getBitMaps(fontPath, ppEM, doAll):
 		
 	return glyphBitMapDict
 
+def loadAGDDict():
+	fdkToolsDir, fdkSharedDataDir = FDKUtils.findFDKDirs()
+	sys.path.append(fdkSharedDataDir)
+	kAGD_TXTPath = os.path.join(fdkSharedDataDir, "AGD.TXT")
+	fp = open(kAGD_TXTPath, "rU")
+	agdTextPath = fp.read()
+	fp.close()
+	return agd.dictionary(agdTextPath)
+
+def collectFontKernTable(fontPath, useSpot):
+	kernData = collectKernData(fontPath, useSpot)
+	if not kernData:
+		return {}
+	lookupIndexDict, lookupSequenceDict, fontFlatKernTable = kernData
+	return fontFlatKernTable
+
+def checkFontOverlap(fontPath, ppEM, doAll, limitVal, fontFlatKernTable):
+	glyphBitMapDict = getBitMaps(fontPath, ppEM, doAll)
+	return checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, limitVal)
+
+def initKernCheckWorker():
+	# Pool initializer for -j. The worker processes need the AGD to classify glyphs.
+	global gAGDDict
+	if not gAGDDict:
+		gAGDDict = loadAGDDict()
+
+def runKernCheckTask(task):
+	# Worker process entry point for -j. task is (function, argument tuple).
+	# The log messages are collected and returned with the result, so that the main
+	# process can report them in task order.
+	global logMsg
+	function, args = task
+	msgList = []
+	logMsg = msgList.append
+	result = function(*args)
+	return msgList, result
+
+def runTaskList(pool, function, argsList):
+	# Returns the results of calling function with each argument tuple in argsList,
+	# in order. If there is a pool, the calls are made in the worker processes.
+	if not pool:
+		return map(lambda args: function(*args), argsList)
+	resultList = []
+	for msgList, result in pool.imap(runKernCheckTask, map(lambda args: (function, args), argsList)):
+		for msg in msgList:
+			logMsg(msg)
+		resultList.append(result)
+	return resultList
+
 def getOptions(argv):
-	ppEM = kDefaultppEM
+	ppEMList = [kDefaultppEM]
 	doAll = 0
 	doMore = 0
 	doPDF = 0
@@ -1731,6 +2309,9 @@ def getOptions(argv):
 	limitVal = 1
 	ptSize = 24
 	sortType = 1
+	numWorkers = 1
+	useSpot = 0
+	fontPathList = []
 	i = 0
 	while i < len(argv):
 		arg = argv[i]
@@ -1740,9 +2321,19 @@ def getOptions(argv):
 			value = argv[i]
 			i += 1
 			try:
-				ppEM = eval(value)
-			except:
-				print "Error: option %s must be followed by an integer value." % (arg)
+				ppEMList = map(int, value.split(","))
+			except ValueError:
+				print "Error: option %s must be followed by an integer value, or a comma-separated list of integer values." % (arg)
+				sys.exit(1)
+		elif arg == "-j":
+			try:
+				numWorkers = int(argv[i])
+				i += 1
+			except (IndexError, ValueError):
+				print "Error: option %s must be followed by the number of worker processes." % (arg)
+				sys.exit(1)
+			if numWorkers < 1:
+				print "Error: the number of worker processes following %s must be at least 1." % (arg)
 				sys.exit(1)
 		elif arg == "-ptSize":
 			value = argv[i]
@@ -1762,6 +2353,8 @@ def getOptions(argv):
 				sys.exit(1)
 		elif arg == "-doAll":
 			doAll = 2
+		elif arg == "-useSpot":
+			useSpot = 1
 		elif arg == "-doMore":
 			doAll = 1
 			doMore = 1
@@ -1782,6 +2375,7 @@ def getOptions(argv):
 			doSubtableCheck = 0
 			try:
 				fontPath = arg = argv[i]
+				fontPathList.append(fontPath)
 				i += 1
 				if not os.path.exists(fontPath):
 					print "Error: font file path <%s> does not exist." % (fontPath)
@@ -1816,28 +2410,34 @@ def getOptions(argv):
 			print "Error: do not recognize option %s." % (arg)
 			sys.exit(1)
 		else:
-			if fontPath:
-				print "Error: only one font path is allowed! Paths: %s, %s." % (fontPath, arg)
+			if doPDF:
+				print "Error: only one font path is allowed with -makePDF! Paths: %s, %s." % (fontPath, arg)
 				sys.exit(1)
 			fontPath = arg
 			if not os.path.isfile(fontPath):
 				print "\tError: fontpath '%s' does not exist." % (fontPath)
 				sys.exit(0)
+			fontPathList.append(fontPath)
 
-	if fontPath == None:
+	if not fontPathList:
 		print "\tError: fontpath must be specified."
 		sys.exit(0)
 
 	if logPath == None:
-		logPath = fontPath + kLogFileExt
+		if len(fontPathList) > 1:
+			logPath = os.path.join(os.path.dirname(fontPathList[0]), "kernCheck" + kLogFileExt)
+		else:
+			logPath = fontPathList[0] + kLogFileExt
 
 	if pdfPath == None:
 		pdfPath = logPath + kPDFExt
 		
 		
-	return ppEM, ptSize, doAll, sortType, limitVal, doCollisionCheck, doPDF, doSubtableCheck, fontPath, logPath, pdfPath
+	return ppEMList, ptSize, doAll, sortType, limitVal, doCollisionCheck, doPDF, doSubtableCheck, fontPathList, logPath, pdfPath, numWorkers, useSpot
 
-def parseKernLog(logFilePath):
+def parseKernLog(logFilePath, fontPath = None):
+	# If the log file has the reports for several fonts, return only the overlaps
+	# from the report for fontPath.
 	kernOverlapList = None
 	try:
 		fp = open(logFilePath)
@@ -1847,6 +2447,17 @@ def parseKernLog(logFilePath):
 		return kernOverlapList
 	data = fp.read()
 	fp.close()
+	if fontPath:
+		# The header line may end with "\r" when the log was written on Windows.
+		reportList = re.split(r"(?m)^# kernCheck report for font: (.+?)\.[ \t\r]*$", data)
+		fontName = os.path.abspath(fontPath)
+		for i in range(1, len(reportList) - 1, 2):
+			if os.path.abspath(reportList[i]) == fontName:
+				data = reportList[i+1]
+				break
+		else:
+			print "Error: could not find the report for font <%s> in kern log file <%s>. Will not save pdf." % (fontName, logFilePath)
+			return kernOverlapList
 	kernOverlapList = re.findall("(\d+)\s+pixels overlap at (\d+) ppem In glyph pair '(\S+) (\S+) with kern (-*\d+)", data)
 	kernOverlapList = map(lambda entry: (entry[2], entry[3], eval(entry[4]), eval(entry[0]), entry[1]), kernOverlapList)
 	return kernOverlapList
@@ -1908,7 +2519,7 @@ def makeOverlapPDF(fontPath, logPath, pdfPath, ptSize, sortType, limitVal):
 	else:
 		logMsg( "Quitting. Font type is not recognized. %s.." % (path))
 		return
-	kernOverlapList = parseKernLog(logPath)
+	kernOverlapList = parseKernLog(logPath, fontPath)
 	if not kernOverlapList:
 		return
 	# Now sort and threshold the list.
@@ -1942,7 +2553,7 @@ def run():
 		print __help__ 
 		return
 
-	ppEM, ptSize, doAll, sortType, limitVal, doCollisionCheck, doPDF, doSubtableCheck, fontPath, logPath, pdfPath = getOptions(sys.argv[1:])
+	ppEMList, ptSize, doAll, sortType, limitVal, doCollisionCheck, doPDF, doSubtableCheck, fontPathList, logPath, pdfPath, numWorkers, useSpot = getOptions(sys.argv[1:])
 
 	# kerncheck has two very different modes. With the option -makePDF, it processes a log file to make a PDF. 
 	# Without the option -makePDF, it makes the log file.
@@ -1950,39 +2561,51 @@ def run():
 		reporter = Reporter()
 		logMsg = reporter.write
 		logMsg( "Building PDF...")
-		makeOverlapPDF(fontPath, logPath, pdfPath, ptSize, sortType, limitVal)
+		makeOverlapPDF(fontPathList[0], logPath, pdfPath, ptSize, sortType, limitVal)
 		logMsg( "All done.")
 		return
 	
 	reporter = Reporter(logPath)
 	logMsg = reporter.write
 	print "Loading Adobe Glyph Dict..."
-	fdkToolsDir, fdkSharedDataDir = FDKUtils.findFDKDirs()
-	sys.path.append(fdkSharedDataDir)
-	kAGD_TXTPath = os.path.join(fdkSharedDataDir, "AGD.TXT")
-	fp = open(kAGD_TXTPath, "rU")
-	agdTextPath = fp.read()
-	fp.close()
-	gAGDDict = agd.dictionary(agdTextPath)
-	overlapList = []
-	print "Collecting font kern data..."
-	lookupIndexDict, lookupSequenceDict, fontFlatKernTable = collectKernData(fontPath)
-
-	if doCollisionCheck:
-		print "Building bitmaps for font..."
-	
-		glyphBitMapDict = getBitMaps(fontPath, ppEM, doAll)
-		
-		print "Checking for glyph overlap in all glyph pairs..."
-		overlapList = checkForOverlap(fontFlatKernTable, fontPath, ppEM, glyphBitMapDict, doAll, limitVal)
+	gAGDDict = loadAGDDict()
+
+	# The kern data is collected once for each font. The overlap check is then run for each font
+	# and ppEM size, and the subtable check for each font. With -j, these are run on a pool of
+	# worker processes. The results are returned in task order, so the report is the same.
+	pool = None
+	if (numWorkers > 1) and (len(fontPathList)*len(ppEMList) > 1):
+		pool = multiprocessing.Pool(numWorkers, initKernCheckWorker)
+	overlapListDict = {}
+	conflictMsgListDict = {}
+	try:
+		print "Collecting font kern data..."
+		kernTableList = runTaskList(pool, collectFontKernTable, map(lambda fontPath: (fontPath, useSpot), fontPathList))
+
+		if doCollisionCheck:
+			print "Building bitmaps for font and checking for glyph overlap in all glyph pairs..."
+			argsList = []
+			for fontPath, fontFlatKernTable in zip(fontPathList, kernTableList):
+				overlapListDict[fontPath] = []
+				for ppEM in ppEMList:
+					argsList.append((fontPath, ppEM, doAll, limitVal, fontFlatKernTable))
+			resultList = runTaskList(pool, checkFontOverlap, argsList)
+			for args, overlapList in zip(argsList, resultList):
+				overlapListDict[args[0]].extend(overlapList)
 	
-	if doSubtableCheck:
-		print "Checking for subtable conflicts in kern feature..."
-		conflictMsgList = checkForSubtableConflict(fontFlatKernTable)
-	#print "Comparing font kern vs calculated values..."
-	#compareKernValues(lookupIndexDict, fontPath, ppEM, glyphBitMapDict)
-
-	reporter.close(fontPath, sortType, overlapList , conflictMsgList)
+		if doSubtableCheck:
+			print "Checking for subtable conflicts in kern feature..."
+			resultList = runTaskList(pool, checkForSubtableConflict, map(lambda fontFlatKernTable: (fontFlatKernTable,), kernTableList))
+			conflictMsgListDict = dict(zip(fontPathList, resultList))
+		#print "Comparing font kern vs calculated values..."
+		#compareKernValues(lookupIndexDict, fontPath, ppEM, glyphBitMapDict)
+	finally:
+		if pool:
+			pool.terminate()
+
+	for fontPath in fontPathList:
+		reporter.writeReport(fontPath, sortType, overlapListDict.get(fontPath, []), conflictMsgListDict.get(fontPath, []))
+	reporter.close()
 
 	print "All done."
 	
@@ -11,7 +11,7 @@ __usage__ = """
    makeInstances -u
    makeInstances [-a] [-f <instance file path>] [-m <MM font path>] 
                  [-o <instance parent directory>] [-d <instance file name>]
-                 [-uf] [-ui] [-a]
+                 [-uf] [-ui] [-a] [-j <n>]
 
    -f <instance file path> .... Specifies alternate path to instance specification 
                                 file. Default: instances
@@ -28,6 +28,13 @@ __usage__ = """
    -i <list of instance indices> Build only the listed instances, as 0-based instance index in the isntance file.
    -a ... do NOT autohint the instance font files. Default is to do so, as IS strips out all hints.
    -c ... do NOT run checkOutlines to remove overlaps from the instance font files. Default is to do so.
+   -j <n> ... Build up to <n> instances at once, using <n> worker processes. The log
+           of each instance is written to '<instance font path>.log', and copied to the
+           main log in instance order when all instances are done. If an instance fails,
+           the other instances are still built; its log file is kept, and the script
+           reports the failures and quits with an error at the end. Instances that
+           are written to the same font file path are built one after the other by
+           the same worker. The default is 1, which builds the instances one after the other.
 """
 
 __help__ = __usage__ + """
@@ -148,6 +155,7 @@ import time
 import copy
 import copy
 import traceback
+import multiprocessing
 import FDKUtils
 from subprocess import PIPE, Popen
 
@@ -218,6 +226,7 @@ class Options:
 		self.doOverlapRemoval = 1
 		self.logFile = None
 		self.indexList = []
+		self.numWorkers = 1
 		lenArgs = len(args)
 		
 		i = 0
@@ -262,6 +271,17 @@ class Options:
 				self.indexList =eval(ilist)
 				if type(self.indexList) == type(0):
 					self.indexList = (self.indexList,)
+			elif arg == "-j":
+				try:
+					self.numWorkers = int(args[i])
+				except (IndexError, ValueError):
+					logMsg.log("Error: '-j' must be followed by the number of worker processes.")
+					hadError = 1
+				else:
+					if self.numWorkers < 1:
+						logMsg.log("Error: the number of worker processes following '-j' must be at least 1.")
+						hadError = 1
+				i +=1
 			else:
 				logMsg.log("Error: unrcognized argument:", arg)
 				hadError = 1
@@ -1372,8 +1392,96 @@ def makeInstance(instanceDict, updateDict, options, instanceFontPaths, extraGlyp
 	logMsg.log("\tDone generating instance:", fontInstancePath)
 
 	return diffValueDict
-	
-		
+
+def makeInstanceTask(task):
+	# Worker process entry point for -j. task is
+	# (options, extraGlyphList, compositeDict, log path, job list), where each job is
+	# [instanceDict, updateDict, instanceFontPaths, exceptionList]. The jobs in one task
+	# write the same font file, so they are built in order; the first failure stops the task.
+	# All output goes to the task's log file. Returns (log path, result list), with one
+	# (instanceDict, diffValueDict, error) entry per job built or failed. error is None
+	# if the instance was built.
+	options, extraGlyphList, compositeDict, logPath, jobList = task
+	logMsg.logFilePath = None
+	logMsg.logFile = None
+	savedStdout = sys.stdout
+	sys.stdout = open(logPath, "wt")
+	resultList = []
+	try:
+		for instanceDict, updateDict, instanceFontPaths, exceptionList in jobList:
+			try:
+				diffValueDict = makeInstance(instanceDict, updateDict, options, instanceFontPaths, extraGlyphList, exceptionList, compositeDict)
+			except KeyboardInterrupt:
+				raise
+			except:
+				error = traceback.format_exception_only(sys.exc_type, sys.exc_value)[-1].strip()
+				traceback.print_exc(file=sys.stdout)
+				resultList.append((instanceDict, {}, error))
+				break
+			resultList.append((instanceDict, diffValueDict, None))
+	finally:
+		sys.stdout.close()
+		sys.stdout = savedStdout
+	return logPath, resultList
+
+def makeInstancesInParallel(jobList, options, extraGlyphList, compositeDict):
+	""" Build the instances in jobList on a pool of options.numWorkers processes.
+	Each job is [instanceDict, updateDict, instanceFontPaths, exceptionList].
+	The changes that makeInstance makes to each instanceDict are copied back,
+	and the per-instance logs are merged into the main log in instance order.
+	Returns 1 if any instance has values that differ from the instances file.
+	"""
+	# Group jobs by font file path, so that two instances never write the same files at once.
+	taskDict = {}
+	taskList = []
+	for job in jobList:
+		fontInstancePath = job[2].fontInstancePath
+		try:
+			taskDict[fontInstancePath][4].append(job)
+		except KeyError:
+			task = (options, extraGlyphList, compositeDict, fontInstancePath + ".log", [job])
+			taskDict[fontInstancePath] = task
+			taskList.append(task)
+	numWorkers = min(options.numWorkers, len(taskList))
+	logMsg.log("Building %s instances with %s worker processes ..." % (len(jobList), numWorkers))
+	pool = multiprocessing.Pool(numWorkers)
+	try:
+		taskResultList = pool.map(makeInstanceTask, taskList, 1)
+	finally:
+		pool.terminate()
+
+	haveUpdates = 0
+	numBuilt = 0
+	failedList = []
+	for task, (logPath, resultList) in zip(taskList, taskResultList):
+		try:
+			fp = open(logPath, "rt")
+			data = fp.read()
+			fp.close()
+		except (IOError, OSError):
+			data = ""
+		logMsg.log(data.rstrip())
+		taskJobList = task[4]
+		for job, (newInstanceDict, diffValueDict, error) in zip(taskJobList, resultList):
+			if error:
+				failedList.append((job[0][kFontName], error, logPath))
+				continue
+			job[0].update(newInstanceDict)
+			numBuilt += 1
+			if diffValueDict:
+				haveUpdates = 1
+		for job in taskJobList[len(resultList):]:
+			failedList.append((job[0][kFontName], "not built after an earlier instance with the same font path failed", logPath))
+		if len(resultList) == len(taskJobList) and not resultList[-1][2]:
+			os.remove(logPath)
+
+	logMsg.log("Built %s of %s instances." % (numBuilt, len(jobList)))
+	if failedList:
+		for psName, error, logPath in failedList:
+			logMsg.log("Error: failed to build instance %s: %s. See log file %s." % (psName, error, logPath))
+		raise(SnapShotError)
+	return haveUpdates
+
 def writeNewInstancesFile(instancePath, instancesList):
 
 	# The keys added may not have been the same for all instanceDicts. Compile the union of all keys.
@@ -1578,6 +1686,7 @@ def run(args):
 	else:
 		compositeDict = {}
 		
+	jobList = []
 	instanceIndex = 0
 	for instanceDict in instancesList:
 		instanceIndex += 1
@@ -1596,10 +1705,16 @@ def run(args):
 			exceptionList = exceptionDict[psName]
 		except KeyError:
 			exceptionList = None
+		if options.numWorkers > 1:
+			jobList.append([instanceDict, updateDict, instanceFontPaths, exceptionList])
+			continue
 		haveChange = makeInstance(instanceDict, updateDict, options, instanceFontPaths, extraGlyphList, exceptionList, compositeDict)
 		if haveChange:
 			haveUpdates = 1 # 
 
+	if jobList:
+		haveUpdates = makeInstancesInParallel(jobList, options, extraGlyphList, compositeDict)
+
 	if options.updateInstances:
 		# Update the instances file with values from the pre-existing
 		# instance fonts.
@@ -1629,5 +1744,8 @@ if __name__=='__main__':
 	except (OptError, ParseError):
 		logMsg.log("Quitting after error.")
 		pass
+	except SnapShotError:
+		logMsg.log("Quitting after error.")
+		sys.exit(1)
 	
 	
@@ -10,7 +10,7 @@ __usage__ = """
    makeInstancesUFO -h
    makeInstancesUFO -u
    makeInstancesUFO [-a] [-f <instance file path>]  [-d <design space file name>]
-                 [-c] [-a] [-i ,i0,i1..,in]
+                 [-c] [-a] [-i ,i0,i1..,in] [-j <n>]
 
    -f <instance file path> .... Specifies alternate path to instance specification 
                                 file. Default: instanceList.txt
@@ -21,6 +21,12 @@ __usage__ = """
    -i <list of instance indices> Build only the listed instances, i is a  0-based index of the instance records in the instance file.
    -a ... do NOT autohint the instance font files. Default is to do so, as master designs are unhinted.
    -c ... do NOT run checkOutlines to remove overlaps from the instance font files. Default is to do so.
+   -j <n> ... Update, checkOutlines and autohint up to <n> instances at once, using <n>
+           worker processes. The log of each instance is written to '<instance path>.log',
+           and copied to the main log in instance order when all instances are done. If an
+           instance fails, the other instances are still built; its log file is kept, and
+           the script reports the failures and quits with an error at the end.
+           The default is 1, which builds the instances one after the other.
 """
 
 __help__ = __usage__ + """
@@ -82,6 +88,7 @@ import os
 import re
 import time
 import traceback
+import multiprocessing
 import FDKUtils
 from subprocess import PIPE, Popen
 from mutatorMath import build as mutatorMathBuild
@@ -161,6 +168,7 @@ class Options:
 		self.doOverlapRemoval = 1
 		self.logFile = None
 		self.indexList = []
+		self.numWorkers = 1
 		lenArgs = len(args)
 		
 		i = 0
@@ -194,6 +202,17 @@ class Options:
 				self.indexList =eval(ilist)
 				if type(self.indexList) == type(0):
 					self.indexList = (self.indexList,)
+			elif arg == "-j":
+				try:
+					self.numWorkers = int(args[i])
+				except (IndexError, ValueError):
+					logMsg.log("Error: '-j' must be followed by the number of worker processes.")
+					hadError = 1
+				else:
+					if self.numWorkers < 1:
+						logMsg.log("Error: the number of worker processes following '-j' must be at least 1.")
+						hadError = 1
+				i +=1
 			else:
 				logMsg.log("Error: unrcognized argument:", arg)
 				hadError = 1
@@ -564,8 +583,67 @@ def updateInstance(instanceDict, options, fontInstancePath):
 	logMsg.log("\tDone generating instance:", fontInstancePath)
 
 	return
-	
-		
+
+def updateInstanceTask(task):
+	# Worker process entry point for -j. task is
+	# (instanceDict, options, instance path, log path). All output for the
+	# instance goes to its own log file. Returns (instance path, log path, error);
+	# error is None if the instance was built.
+	instanceDict, options, fontInstancePath, logPath = task
+	logMsg.logFilePath = None
+	logMsg.logFile = None
+	savedStdout = sys.stdout
+	sys.stdout = open(logPath, "wt")
+	error = None
+	try:
+		try:
+			updateInstance(instanceDict, options, fontInstancePath)
+		except KeyboardInterrupt:
+			raise
+		except:
+			error = traceback.format_exception_only(sys.exc_type, sys.exc_value)[-1].strip()
+			traceback.print_exc(file=sys.stdout)
+	finally:
+		sys.stdout.close()
+		sys.stdout = savedStdout
+	return fontInstancePath, logPath, error
+
+def updateInstancesInParallel(instancesList, options):
+	""" Run updateInstance for all the instances on a pool of options.numWorkers
+	processes. The per-instance logs are merged into the main log in instance order.
+	"""
+	taskList = []
+	for instancePath, instanceDict in instancesList:
+		logPath = "%s.log" % (instancePath.rstrip(os.sep))
+		taskList.append((instanceDict, options, instancePath, logPath))
+	numWorkers = min(options.numWorkers, len(taskList))
+	logMsg.log("Updating %s instances with %s worker processes ..." % (len(taskList), numWorkers))
+	pool = multiprocessing.Pool(numWorkers)
+	try:
+		resultList = pool.map(updateInstanceTask, taskList, 1)
+	finally:
+		pool.terminate()
+
+	failedList = []
+	for fontInstancePath, logPath, error in resultList:
+		try:
+			fp = open(logPath, "rt")
+			data = fp.read()
+			fp.close()
+		except (IOError, OSError):
+			data = ""
+		logMsg.log(data.rstrip())
+		if error:
+			failedList.append((fontInstancePath, logPath, error))
+		elif os.path.exists(logPath):
+			os.remove(logPath)
+
+	logMsg.log("Built %s of %s instances." % (len(resultList) - len(failedList), len(resultList)))
+	if failedList:
+		for fontInstancePath, logPath, error in failedList:
+			logMsg.log("Error: failed to build instance %s: %s. See log file %s." % (fontInstancePath, error, logPath))
+		raise(SnapShotError)
+
 
 def run(args):
 	options = Options(args)
@@ -579,11 +657,17 @@ def run(args):
 		print "Building 1 instance.."
 	else:
 		print "Building %s instances.." % (len(newInstancesList))
-	mutatorMathBuild(documentPath=dsPath, outputUFOFormatVersion=version)
+	# When there are several instances, build each glyph for all of them at once, so the
+	# masters of a glyph are read and interpolated only once.
+	mutatorMathBuild(documentPath=dsPath, outputUFOFormatVersion=version, batchGlyphs=(len(newInstancesList) > 1))
 	if (dsPath != options.dsPath) and os.path.exists(dsPath):
 		os.remove(dsPath)
 
 	# Update instance fonts with data from the instanceList.txt file. Apply autohint and checkoutlines, if requested.
+	if (options.numWorkers > 1) and (len(newInstancesList) > 1):
+		updateInstancesInParallel(newInstancesList, options)
+		return
+
 	for instancePath, instanceDict in newInstancesList:
 		# make new instance font.
 		psName = instanceDict[kFontName]
@@ -596,5 +680,8 @@ if __name__=='__main__':
 	except (OptError, ParseError):
 		logMsg.log("Quitting after error.")
 		pass
+	except SnapShotError:
+		logMsg.log("Quitting after error.")
+		sys.exit(1)
 	
 	
@@ -25,6 +25,8 @@ import sys
 import os
 import struct
 
+kCopyBufferSize = 1024*1024
+
 class OTCError(TypeError):
 	pass
 
@@ -48,7 +50,6 @@ class TableEntry:
 		self.tag = tag
 		self.checksum = checkSum
 		self.length = length
-		self.data = None
 		self.offset = None
 		self.isPreferred = False
 
@@ -166,23 +167,25 @@ def getPSName(data):
 
 	return psName
 
-def readFontFile(fontOffset, data, tableDict, doReportOnly):
-	sfntType, numTables, searchRange, entrySelector, rangeShift = struct.unpack(sfntDirectoryFormat, data[fontOffset:fontOffset + sfntDirectorySize])
+def readFontFile(fontOffset, fp, tableDict, doReportOnly):
+	# Only the sfnt directory and the name table are read; the other table data stays in the file.
+	fp.seek(fontOffset)
+	data = fp.read(sfntDirectorySize)
+	sfntType, numTables, searchRange, entrySelector, rangeShift = struct.unpack(sfntDirectoryFormat, data)
 	fontEntry = FontEntry(sfntType, searchRange, entrySelector, rangeShift)
-	entryData = data[fontOffset + sfntDirectorySize:]
+	entryData = fp.read(numTables*sfntDirectoryEntrySize)
 	i = 0
 	seenGlyf = False
 	while i < numTables:
-		tag, checksum, offset, length = struct.unpack(sfntDirectoryEntryFormat, entryData[:sfntDirectoryEntrySize])
+		tag, checksum, offset, length = struct.unpack_from(sfntDirectoryEntryFormat, entryData, i*sfntDirectoryEntrySize)
 		tableEntry = TableEntry(tag, checksum, length)
 		tableEntry.offset = offset
-		tableEntry.data = data[offset:offset+length]
 		fontEntry.tableList.append(tableEntry)
 		if tag == "name":
-			fontEntry.psName = getPSName(tableEntry.data)
+			fp.seek(offset)
+			fontEntry.psName = getPSName(fp.read(length))
 		elif tag == "glyf":
 			seenGlyf = True
-		entryData =  entryData[sfntDirectoryEntrySize:]
 		i += 1
 	if seenGlyf:
 			fontEntry.fileName = fontEntry.psName + ".ttf"
@@ -203,35 +206,43 @@ def readFontFile(fontOffset, data, tableDict, doReportOnly):
 	return fontEntry
 
 
-def writeOTFFont(fontEntry):
+def copyTableData(srcFile, srcOffset, length, fp):
+	srcFile.seek(srcOffset)
+	remaining = length
+	while remaining > 0:
+		data = srcFile.read(min(remaining, kCopyBufferSize))
+		if not data:
+			raise OTCError("Table data extends past the end of the input font.")
+		fp.write(data)
+		remaining -= len(data)
+
+def writeOTFFont(fontEntry, srcFile):
 
-	dataList = []
+	fp = file(fontEntry.fileName, "wb")
 	numTables = len(fontEntry.tableList)
 	# Build the SFNT header
 	data = struct.pack(sfntDirectoryFormat, fontEntry.sfntType, numTables, fontEntry.searchRange, fontEntry.entrySelector, fontEntry.rangeShift)
-	dataList.append(data)
+	fp.write(data)
 	
 	fontOffset = sfntDirectorySize + numTables*sfntDirectoryEntrySize
-	# Set the offsets in the tables.
+	# Set the offsets in the output font, remembering where the table data is in the source file.
+	srcOffsetList = []
 	for tableEntry in fontEntry.tableList:
+		srcOffsetList.append(tableEntry.offset)
 		tableEntry.offset = fontOffset
 		fontOffset += tableEntry.length
 	
 	# build table entries in sfnt directory
 	for tableEntry in fontEntry.tableList:
 		tableData = struct.pack(sfntDirectoryEntryFormat, tableEntry.tag, tableEntry.checksum, tableEntry.offset, tableEntry.length)
-		dataList.append(tableData)
-	
-	# add table data to font.
-	for tableEntry in fontEntry.tableList:
-		tableData = tableEntry.data
-		dataList.append(tableData)
-	
-	fontData = "".join(dataList)
+		fp.write(tableData)
 	
-	fp = file(fontEntry.fileName, "wb")
-	fp.write(fontData)
-	fp.close()
+	# copy the table data to the font.
+	try:
+		for tableEntry, srcOffset in zip(fontEntry.tableList, srcOffsetList):
+			copyTableData(srcFile, srcOffset, tableEntry.length, fp)
+	finally:
+		fp.close()
 	return
 
 def run(args):
@@ -240,28 +251,28 @@ def run(args):
 	
 
 	fp = file(fontPath, "rb")
-	data = fp.read()
-	fp.close()
-
-	TTCTag, version, numFonts = struct.unpack(ttcHeaderFormat, data[:ttcHeaderSize])
-	offsetdata = data[ttcHeaderSize:]
+	data = fp.read(ttcHeaderSize)
+	TTCTag, version, numFonts = struct.unpack(ttcHeaderFormat, data)
+	offsetdata = fp.read(numFonts*offsetSize)
 	
 	fontList = []
 	i = 0
 	tableDict = {} # Used to record whcih tables have been reported before.
 	while i < numFonts:
-		offset = struct.unpack(offsetFormat, offsetdata[:offsetSize])[0]
+		offset = struct.unpack_from(offsetFormat, offsetdata, i*offsetSize)[0]
 		if doReportOnly:
 			print "font %s offset: %s/0x%08X." % (i, offset,offset),
-		fontEntry = readFontFile(offset, data, tableDict, doReportOnly)
+		fontEntry = readFontFile(offset, fp, tableDict, doReportOnly)
 		fontList.append(fontEntry)
-		offsetdata = offsetdata[offsetSize:]
 		i += 1
 		
-	if not doReportOnly:		
-		for fontEntry in fontList:
-			writeOTFFont(fontEntry)
-			print "Output font:", fontEntry.fileName
+	try:
+		if not doReportOnly:		
+			for fontEntry in fontList:
+				writeOTFFont(fontEntry, fp)
+				print "Output font:", fontEntry.fileName
+	finally:
+		fp.close()
 	print "Done"
 
 if __name__ == "__main__":
@@ -28,19 +28,26 @@ identical for more than one font file, it is shared.
 __methods__="""
 For each file, check that it looks like an sfnt file.
 
-For each file, read in tables. Build a font object list, and dict of table tags to table data blocks.
+For each file, read in the sfnt directory. Build a font object list, and dict of table tags to table entries.
 
 A font object contains;
  font file name
- list of [tableTag, table data, shared] pairs
+ list of table entries, each with the tag, checksum, length, and the location of the table data in the source file.
  
-as the font tables are being read in, they are compared against the list of already seen data items.
-If any match, the font table reference is replaced by the reference to the tabel already seen.
+as the font tables are being read in, they are compared against the list of already seen tables
+with the same tag, length and checksum. If these match, a digest of the table data is compared.
+If that matches too, the font table reference is replaced by the reference to the table already seen.
+
+The table data is not held in memory: when the ttc file is written, the tables are copied
+from the source font files in blocks of at most kCopyBufferSize bytes.
 """
 
 import sys
 import os
 import struct
+import hashlib
+
+kCopyBufferSize = 1024*1024
 
 class OTCError(TypeError):
 	pass
@@ -70,10 +77,29 @@ class TableEntry:
 		self.tag = tag
 		self.checksum = checkSum
 		self.length = length
-		self.data = None
+		self.srcPath = None
+		self.srcOffset = None
+		self.digest = None
 		self.offset = None
 		self.isPreferred = False
 
+	def getDigest(self):
+		# Computed only when another table with the same tag, length and checksum is seen.
+		if self.digest == None:
+			hash = hashlib.sha256()
+			fp = file(self.srcPath, "rb")
+			fp.seek(self.srcOffset)
+			remaining = self.length
+			while remaining > 0:
+				data = fp.read(min(remaining, kCopyBufferSize))
+				if not data:
+					break
+				hash.update(data)
+				remaining -= len(data)
+			fp.close()
+			self.digest = hash.digest()
+		return self.digest
+
 ttcHeaderFormat = ">4sLL"
 """
 		> # big endian
@@ -161,36 +187,59 @@ def parseArgs(args):
 			allOK = False
 	if not allOK:
 		raise OTCError()
-	
+
+	# The table data is copied from the input fonts while the output is
+	# written, so the output must not overwrite one of them.
+	outputPath = os.path.normcase(os.path.realpath(ttcFilePath))
+	for fontPath in fontList:
+		if os.path.normcase(os.path.realpath(fontPath)) == outputPath:
+			raise OTCError("The output file '%s' must not be one of the input fonts." % (ttcFilePath))
+
 	return tagOverrideMap, fontList, ttcFilePath
 
 def readFontFile(fontPath):
+	# Only the sfnt directory is read; the table data stays in the file.
 	fp = file(fontPath, "rb")
-	data = fp.read()
+	data = fp.read(sfntDirectorySize)
+	sfntType, numTables, searchRange, entrySelector, rangeShift = struct.unpack(sfntDirectoryFormat, data)
+	data = fp.read(numTables*sfntDirectoryEntrySize)
 	fp.close()
-	
-	sfntType, numTables, searchRange, entrySelector, rangeShift = struct.unpack(sfntDirectoryFormat, data[:sfntDirectorySize])
 	fontEntry = FontEntry(sfntType, searchRange, entrySelector, rangeShift)
-	curData = data[sfntDirectorySize:]
 
 	i = 0
 	while i < numTables:
-		tag, checkSum, offset, length = struct.unpack(sfntDirectoryEntryFormat, curData[:sfntDirectoryEntrySize])
+		tag, checkSum, offset, length = struct.unpack_from(sfntDirectoryEntryFormat, data, i*sfntDirectoryEntrySize)
 		tableEntry = TableEntry(tag, checkSum, length)
-		tableEntry.data = data[offset:offset+length]
+		tableEntry.srcPath = fontPath
+		tableEntry.srcOffset = offset
 		fontEntry.append(tableEntry)
-		curData =  curData[sfntDirectoryEntrySize:]
 		i += 1
 	return fontEntry
 
 
+def copyTableData(tableEntry, fp, srcFileDict):
+	try:
+		srcFile = srcFileDict[tableEntry.srcPath]
+	except KeyError:
+		srcFile = srcFileDict[tableEntry.srcPath] = file(tableEntry.srcPath, "rb")
+	srcFile.seek(tableEntry.srcOffset)
+	remaining = tableEntry.length
+	while remaining > 0:
+		data = srcFile.read(min(remaining, kCopyBufferSize))
+		if not data:
+			raise OTCError("Table '%s' extends past the end of '%s'." % (tableEntry.tag, tableEntry.srcPath))
+		fp.write(data)
+		remaining -= len(data)
+
+
 def writeTTC(fontList, tableList, ttcFilePath):
 	numFonts = len(fontList)
+	fp = file(ttcFilePath, "wb")
 	header = struct.pack(ttcHeaderFormat, 'ttcf', 0x00010000,  numFonts)
-	dataList = [header]
+	fp.write(header)
 	fontOffset = ttcHeaderSize + numFonts*struct.calcsize(">L")
 	for fontEntry in fontList:
-		dataList.append(struct.pack(">L",fontOffset))
+		fp.write(struct.pack(">L",fontOffset))
 		fontOffset += sfntDirectorySize + len(fontEntry.tableList)*sfntDirectoryEntrySize
 
 	# Set the offsets in the tables.
@@ -202,21 +251,21 @@ def writeTTC(fontList, tableList, ttcFilePath):
 	# save the font sfnt directories
 	for fontEntry in fontList:
 		data = struct.pack(sfntDirectoryFormat, fontEntry.sfntType, len(fontEntry.tableList), fontEntry.searchRange, fontEntry.entrySelector, fontEntry.rangeShift)
-		dataList.append(data)
+		fp.write(data)
 		for tableEntry in fontEntry.tableList:
 			data = struct.pack(sfntDirectoryEntryFormat, tableEntry.tag, tableEntry.checksum, tableEntry.offset, tableEntry.length)
-			dataList.append(data)
+			fp.write(data)
 		
-	# save the tables.
-	for tableEntryList in tableList:
-		for tableEntry in tableEntryList:
-			dataList.append(tableEntry.data)
-	
-	fontData = "".join(dataList)
-	
-	fp = file(ttcFilePath, "wb")
-	fp.write(fontData)
-	fp.close()
+	# save the tables, copying them from the source font files.
+	srcFileDict = {}
+	try:
+		for tableEntryList in tableList:
+			for tableEntry in tableEntryList:
+				copyTableData(tableEntry, fp, srcFileDict)
+	finally:
+		for srcFile in srcFileDict.values():
+			srcFile.close()
+		fp.close()
 	return
 
 def run(args):
@@ -250,7 +299,7 @@ def run(args):
 				tableEntryList = tableMap[tableEntry.tag]
 				matched = 0
 				for tEntry in tableEntryList:
-					if (tEntry.checksum == tableEntry.checksum) and (tEntry.length == tableEntry.length) and (tEntry.data == tableEntry.data):
+					if (tEntry.checksum == tableEntry.checksum) and (tEntry.length == tableEntry.length) and ((tEntry is tableEntry) or (tEntry.getDigest() == tableEntry.getDigest())):
 						matched = 1
 						fontEntry.tableList[tableIndex] = tEntry
 						break
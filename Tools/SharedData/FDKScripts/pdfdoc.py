@@ -66,10 +66,17 @@ class PDFDocument:
     For cross-linking, it provides getPosition(key) which tells you where
     another object is, or raises a KeyError if not found.  The rule is that
     objects should only refer ones previously written to file.
+
+    If beginStream(fileobj) is called before the first page is added, the
+    document is written incrementally: each page and its content stream are
+    written to fileobj as soon as the page is added, and only their file
+    offsets are kept. The remaining objects, the xref table and the trailer
+    are written by endStream().
     """
     def __init__(self):
         self.objects = []
         self.objectPositions = {}
+        self.streamFile = None
         
         self.pages = []
         self.pagepositions = []
@@ -178,17 +185,10 @@ class PDFDocument:
         the file.  Keep track of the file position at each point for
         use in the index at the end"""
         f = fileobj
-        i = 1
         self.xref = []
-        f.write("%PDF-1.2" + LINEEND)  # for CID support
-        f.write("%\xed\xec\xb6\xbe" + LINEEND)
-        for obj in self.objects:
-            pos = f.tell()
-            self.xref.append(pos)
-            f.write(str(i) + ' 0 obj' + LINEEND)
-            obj.save(f)
-            f.write('endobj' + LINEEND)
-            i = i + 1
+        self.writeHeader(f)
+        for i in range(len(self.objects)):
+            self.writeObject(f, i)
         self.writeXref(f)
         self.writeTrailer(f)
         f.write('%%EOF')  # no lineend needed on this one!
@@ -204,6 +204,42 @@ class PDFDocument:
                 pass
 
 
+    def writeHeader(self, f):
+        f.write("%PDF-1.2" + LINEEND)  # for CID support
+        f.write("%\xed\xec\xb6\xbe" + LINEEND)
+
+    def writeObject(self, f, index):
+        """Write the object at 0-based position index to f, and record its
+        file offset in self.xref."""
+        obj = self.objects[index]
+        numXref = len(self.xref)
+        if numXref <= index:
+            self.xref.extend([None]*(index + 1 - numXref))
+        self.xref[index] = f.tell()
+        f.write(str(index + 1) + ' 0 obj' + LINEEND)
+        obj.save(f)
+        f.write('endobj' + LINEEND)
+
+    def beginStream(self, fileobj):
+        """Start writing the document incrementally to fileobj. From now on,
+        addPage() writes each page and its content stream as soon as it is
+        added, and drops them from memory."""
+        self.streamFile = fileobj
+        self.xref = []
+        self.writeHeader(fileobj)
+
+    def endStream(self):
+        """Write all objects not yet written by addPage(), followed by the
+        xref table and the trailer. Does not close the file."""
+        f = self.streamFile
+        for i in range(len(self.objects)):
+            if self.objects[i] != None:
+                self.writeObject(f, i)
+        self.writeXref(f)
+        self.writeTrailer(f)
+        f.write('%%EOF')  # no lineend needed on this one!
+        self.streamFile = None
+
     def printPDF(self):
         "prints it to standard output.  Logs positions for doing trailer"
         print "%PDF-1.0"
@@ -238,6 +274,11 @@ class PDFDocument:
         #self.objects.append(page)
         self.add('PageStream%06d'% len(self.PageCol.PageList), page.stream)
         #self.objects.append(page.stream)
+        if self.streamFile:
+            # Write the page and its stream now, and keep only their offsets.
+            for i in [pos, pos + 1]:
+                self.writeObject(self.streamFile, i)
+                self.objects[i] = None
 
     def hasFont(self, psfontname, encoding=kDefaultEncoding):
         if encoding == None:
@@ -106,11 +106,18 @@ class Canvas:
     state'.  Just started development at 5/9/99, not in use yet.
 
     """
-    def __init__(self,filename,pagesize=(595.27,841.89), bottomup = 1):
+    def __init__(self,filename,pagesize=(595.27,841.89), bottomup = 1, streamPages = 0):
         """Most of the attributes are private - we will use set/get methods
-        as the preferred interface.  Default page size is A4."""
+        as the preferred interface.  Default page size is A4.
+        If streamPages is set, the file is opened now and each page is
+        written to it by showPage(), so that memory use does not grow with
+        the number of pages; save() then just finishes the file."""
         self._filename = filename
         self._doc = pdfdoc.PDFDocument()
+        self._fileobj = None
+        if streamPages:
+            self._fileobj = open(filename, 'wb')
+            self._doc.beginStream(self._fileobj)
         self._pagesize = pagesize
         self._currentPageHasImages = 1
         self._pageTransitionString = ''
@@ -208,11 +215,17 @@ class Canvas:
     def save(self, filename=None, fileobj=None):
 
         """Saves the pdf document to fileobj or to file with name filename.
-        If holding data, do a showPage() to save them having to."""
+        If holding data, do a showPage() to save them having to.
+        If the canvas was created with streamPages, the document always goes
+        to the file opened then, and filename and fileobj are ignored."""
         
         if len(self._code):  
             self.showPage()  # what's the effect of multiple 'showPage's 
-        if fileobj:
+        if self._fileobj:
+            self._doc.endStream()
+            self._fileobj.close()
+            self._fileobj = None
+        elif fileobj:
             self._doc.SaveToFileObject(fileobj)
         elif filename:
             self._doc.SaveToFile(filename)
@@ -57,6 +57,12 @@ entry contains:
 - a flag 'editStatus' of whether the path data was altered by a program.
 - a history list: a list of the names of each program that has been run, in order.
 
+The hash map is stored in the SQLite database
+"data/com.adobe.type.processedHashMap.db" in the UFO font, with one row
+per glyph, so that entries can be looked up and updated one glyph at a
+time. A hash map in the older text format, "data/com.adobe.type.processedHashMap",
+is converted to the database the first time it is saved.
+
 New GLIF data is always written to the Adobe processed glyph layer. The
 program may or may not have altered the outline data. For example,
 autohint adds private hint data, and adds names to points, but does not
@@ -185,6 +191,8 @@ import time
 import os
 import plistlib
 import hashlib
+import ast
+import sqlite3
 
 try:
     import xml.etree.cElementTree as ET
@@ -208,7 +216,10 @@ kLibName = "lib.plist"
 kPublicGlyphOrderKey = "public.glyphOrder"
 
 kAdobeDomainPrefix = "com.adobe.type"
-kAdobHashMapName = "%s.processedHashMap" % (kAdobeDomainPrefix)
+kAdobHashMapName = "%s.processedHashMap" % (kAdobeDomainPrefix) # legacy text format, copied to the database on first use.
+kAdobHashMapDBName = "%s.processedHashMap.db" % (kAdobeDomainPrefix)
+kHashMapTableName = "hashMap"
+kFileIndexTableName = "fileIndex"
 kAutohintName = "autohint"
 kCheckOutlineName = "checkOutlines"
 
@@ -242,6 +253,163 @@ class UFOParseError(ValueError):
 class BezParseError(ValueError):
 	pass
 
+class UFOHashMap:
+	"""
+	The glyph hash map, stored in an SQLite database in the UFO data
+	directory, with one row per glyph. Entries are read from the
+	database one glyph at a time, as they are looked up, and only the
+	entries that have been added or changed are written back by save().
+	
+	Each entry is the list [hash, editStatus, historyList]. Callers may
+	change an entry in place; save() compares the cached entries with
+	the values last read from or written to the database.
+	
+	If there is no database, but there is a hash map in the older text
+	format, the old map is read once and saved to the new database on the
+	first save(). The old file is left in place for older versions of
+	the FDK that share the UFO; it is not updated.
+	
+	The database is opened when it is first needed, and again after
+	close().
+	
+	The database also holds an index of GLIF file stats, so that the
+	hash of a GLIF file which has not changed since it was last hashed
+	can be used without parsing the file. Each index entry is
+	(mtime, size, hash, componentList), where componentList holds a
+	(component glyph name, GLIF path, mtime, size) tuple for every
+	component the glyph uses, directly or through other components.
+	GLIF paths are relative to the UFO font directory.
+	"""
+	def __init__(self, dataDir):
+		self.dataDir = dataDir
+		self.dbPath = os.path.join(dataDir, kAdobHashMapDBName)
+		self.legacyPath = os.path.join(dataDir, kAdobHashMapName)
+		self.entries = {} # cached entries, by glyph name.
+		self.savedEntries = {} # the database value of each cached entry, as a tuple.
+		self.fileIndex = {} # cached file index entries, by GLIF path.
+		self.changedFileIndex = {} # file index entries to be written by save().
+		self.db = None
+		if not os.path.exists(self.dbPath) and os.path.exists(self.legacyPath):
+			self.readLegacyHashMap()
+
+	def getDB(self):
+		"""Return the open database, or None if it has not been created yet."""
+		if self.db == None and os.path.exists(self.dbPath):
+			self.db = self.openDB()
+		return self.db
+
+	def openDB(self):
+		db = sqlite3.connect(self.dbPath)
+		db.text_factory = str
+		db.execute("CREATE TABLE IF NOT EXISTS %s (glyphName TEXT PRIMARY KEY, hash TEXT, editStatus INTEGER, history TEXT)" % (kHashMapTableName))
+		db.execute("CREATE TABLE IF NOT EXISTS %s (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, hash TEXT, components TEXT)" % (kFileIndexTableName))
+		return db
+
+	def readLegacyHashMap(self):
+		fp = open(self.legacyPath, "rt")
+		data = fp.read()
+		fp.close()
+		try:
+			legacyMap = ast.literal_eval(data)
+		except (SyntaxError, ValueError):
+			print "Warning: could not parse hash map file '%s'. All glyphs will be processed." % (self.legacyPath)
+			legacyMap = {}
+		for glyphName, entry in legacyMap.items():
+			srcHash, editStatus, historyList = entry
+			self.entries[glyphName] = [srcHash, editStatus, list(historyList)]
+
+	def __getitem__(self, glyphName):
+		try:
+			return self.entries[glyphName]
+		except KeyError:
+			pass
+		db = self.getDB()
+		if db == None:
+			raise KeyError(glyphName)
+		row = db.execute("SELECT hash, editStatus, history FROM %s WHERE glyphName = ?" % (kHashMapTableName), (glyphName,)).fetchone()
+		if row == None:
+			raise KeyError(glyphName)
+		srcHash, editStatus, history = row
+		entry = [srcHash, editStatus, history.split()]
+		self.entries[glyphName] = entry
+		self.savedEntries[glyphName] = (srcHash, editStatus, tuple(entry[2]))
+		return entry
+
+	def __setitem__(self, glyphName, entry):
+		self.entries[glyphName] = entry
+
+	def has_key(self, glyphName):
+		try:
+			self[glyphName]
+		except KeyError:
+			return 0
+		return 1
+	__contains__ = has_key
+
+	def keys(self):
+		keyDict = dict.fromkeys(self.entries.keys())
+		db = self.getDB()
+		if db != None:
+			for (glyphName,) in db.execute("SELECT glyphName FROM %s" % (kHashMapTableName)):
+				keyDict[glyphName] = None
+		return keyDict.keys()
+
+	def __len__(self):
+		return len(self.keys())
+
+	def getFileEntry(self, path):
+		try:
+			return self.fileIndex[path]
+		except KeyError:
+			pass
+		entry = None
+		db = self.getDB()
+		if db != None:
+			row = db.execute("SELECT mtime, size, hash, components FROM %s WHERE path = ?" % (kFileIndexTableName), (path,)).fetchone()
+			if row != None:
+				mtime, size, srcHash, components = row
+				componentList = []
+				for line in components.splitlines():
+					compGlyphName, compPath, compMTime, compSize = line.split("\t")
+					componentList.append((compGlyphName, compPath, float(compMTime), int(compSize)))
+				entry = (mtime, size, srcHash, componentList)
+		self.fileIndex[path] = entry
+		return entry
+
+	def setFileEntry(self, path, entry):
+		self.fileIndex[path] = entry
+		self.changedFileIndex[path] = entry
+
+	def save(self):
+		changedRows = []
+		for glyphName, entry in self.entries.items():
+			srcHash, editStatus, historyList = entry
+			value = (srcHash, editStatus, tuple(historyList))
+			if self.savedEntries.get(glyphName) != value:
+				changedRows.append((glyphName, srcHash, editStatus, " ".join(historyList)))
+				self.savedEntries[glyphName] = value
+		if not (changedRows or self.changedFileIndex):
+			return # no glyphs were processed.
+
+		if self.getDB() == None:
+			if not os.path.exists(self.dataDir):
+				os.makedirs(self.dataDir)
+			self.db = self.openDB()
+		self.db.executemany("INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?)" % (kHashMapTableName), changedRows)
+		fileRows = []
+		for path, (mtime, size, srcHash, componentList) in self.changedFileIndex.items():
+			components = "\n".join(["%s\t%s\t%r\t%s" % compEntry for compEntry in componentList])
+			fileRows.append((path, mtime, size, srcHash, components))
+		self.db.executemany("INSERT OR REPLACE INTO %s VALUES (?, ?, ?, ?, ?)" % (kFileIndexTableName), fileRows)
+		self.changedFileIndex = {}
+		self.db.commit()
+
+	def close(self):
+		if self.db != None:
+			self.db.close()
+			self.db = None
+
+
 class UFOFontData:
 	def __init__(self, parentPath, useHashMap, programName):
 		self.parentPath = parentPath
@@ -250,11 +418,13 @@ class UFOFontData:
 		self.glyphList = []
 		self.fontInfo = None
 		self.useHashMap = useHashMap # if true, will skip building bez string when glyph matches current glyph name.
-		self.hashMap = {} #  Used to skip getting glyph data when glyph hash matches hash of current glyph data.
+		self.hashMap = None #  UFOHashMap. Used to skip getting glyph data when glyph hash matches hash of current glyph data.
 		self.fontDict = None
 		self.programName = programName
 		self.curSrcDir = None
 		self.hashMapChanged = 0
+		self.componentHashData = {} # hash data list and component list for each component GLIF path hashed in this run.
+		self.fileStats = {} # (mtime, size) of each GLIF path checked in this run.
 		
 		self.glyphDefaultDir = os.path.join(parentPath, "glyphs")
 		self.glyphLayerDir = os.path.join(parentPath, kProcessedGlyphsLayer)
@@ -291,8 +461,7 @@ class UFOFontData:
 		self.newGlyphMap[glyphName] = glifXML
 	
 	def saveChanges(self):
-		if self.hashMapChanged:
-			self.writeHashMap()
+		self.writeHashMap()
 		self.hashMapChanged = 0
 		
 		if not os.path.exists(self.glyphWriteDir):
@@ -326,37 +495,13 @@ class UFOFontData:
 		return self.glyphMap
 		
 	def readHashMap(self):
-		hashPath = os.path.join(self.parentPath, "data", kAdobHashMapName)
-		if os.path.exists(hashPath):
-			fp = open(hashPath, "rt")
-			data = fp.read()
-			fp.close()
-			newMap =  eval(data)
-		else:
-			newMap = {}
-			
-		self.hashMap = newMap
+		if self.hashMap == None:
+			self.hashMap = UFOHashMap(os.path.join(self.parentPath, "data"))
 		return
 		
 	def writeHashMap(self):
-		hashMap = self.hashMap
-		if len(hashMap) == 0:
-			return # no glyphs were processed.
-			
-		hashDir = os.path.join(self.parentPath, "data")
-		if not os.path.exists(hashDir):
-			os.makedirs(hashDir)
-		hashPath = os.path.join(hashDir, kAdobHashMapName)
-		
-		hasMapKeys = hashMap.keys()
-		hasMapKeys.sort()
-		data = "{" + os.linesep
-		for gName in hasMapKeys:
-			data += "'%s': %s,%s" % (gName, hashMap[gName], os.linesep)
-		data += "}"
-		fp = open(hashPath, "wt")
-		fp.write(data)
-		fp.close()
+		if self.hashMap != None:
+			self.hashMap.save()
 		return
 	
 	def getCurGlyphPath(self, glyphName):
@@ -416,7 +561,7 @@ class UFOFontData:
 
 		srcDir = self.glyphDefaultDir
 		usingLayer = 0
-		if len(self.hashMap) == 0:
+		if self.hashMap == None:
 			# Hash maps have not yet been read in. Get them.
 			self.readHashMap()
 
@@ -453,7 +598,7 @@ class UFOFontData:
 
 		self.curSrcDir = self.glyphDefaultDir
 		usingLayer = 0
-		if len(self.hashMap) == 0:
+		if self.hashMap == None:
 			# Hash maps have not yet been read in. Get them.
 			self.readHashMap()
 
@@ -478,20 +623,27 @@ class UFOFontData:
 		
 		# Get default glyph layer data, so we can check if the glyph has been edited since this program was last run.
 		# If the program name is in the history list, and the srcHash matches the default glyph layer data, we can skip.
+		# The file index gives the hash without parsing the GLIF, if neither it nor its components have changed.
 		glyphPath = os.path.join(self.glyphDefaultDir, glyphFileName) # default
-		etRoot = ET.ElementTree()
-		glifXML = etRoot.parse(glyphPath)
-		outlineXML = glifXML.find("outline")
-		try:
-			widthXML = glifXML.find("advance")
-			if widthXML != None:
-				width = int(eval(widthXML.get("width")))
-			else:
-				width = 1000
-			newHash, dataList = self.buildGlyphHashValue(width, outlineXML, glyphName)
-		except UFOParseError,e:
-			print "Error. skipping glyph '%s' because of parse error: %s" % (glyphName, e.message)
-			return None, None, 1
+		glifXML = outlineXML = None
+		newHash = self.getIndexedGlyphHash(glyphPath)
+		if newHash == None:
+			glyphStat = self.getFileStat(glyphPath)
+			etRoot = ET.ElementTree()
+			glifXML = etRoot.parse(glyphPath)
+			outlineXML = glifXML.find("outline")
+			try:
+				widthXML = glifXML.find("advance")
+				if widthXML != None:
+					width = int(eval(widthXML.get("width")))
+				else:
+					width = 1000
+				componentList = []
+				newHash, dataList = self.buildGlyphHashValue(width, outlineXML, glyphName, 0, componentList)
+			except UFOParseError,e:
+				print "Error. skipping glyph '%s' because of parse error: %s" % (glyphName, e.message)
+				return None, None, 1
+			self.setIndexedGlyphHash(glyphPath, glyphStat, newHash, componentList)
 		if self.useHashMap and (hashEntry != None) and (srcHash == newHash) and (programHistoryIndex >= 0):
 			# The glyph has already been processed by this program, and there have been no changes since.
 			skip = 1
@@ -514,6 +666,10 @@ class UFOFontData:
 				historyList.append(self.programName)
 				
 		# If the glyph needs to be read from the processed layer instead of the default layer, we still need to get it.
+		if (glifXML == None) and not usingProcessedLayer:
+			etRoot = ET.ElementTree()
+			glifXML = etRoot.parse(glyphPath)
+			outlineXML = glifXML.find("outline")
 		if usingProcessedLayer:
 			self.curSrcDir = self.glyphLayerDir
 			glyphPath = os.path.join(self.glyphLayerDir, glyphFileName)
@@ -740,11 +896,28 @@ class UFOFontData:
 			raise UFOParseError("Could not find glyph name '%s' in UFO font contents plist. '%s'. " % (glyphName, self.parentPath))
 		return gid
 		
-	def buildGlyphHashValue(self, width, outlineXML, glyphName, level = 0):
+	def buildGlyphHashValue(self, width, outlineXML, glyphName, level = 0, componentList = None):
 		"""  glyphData must be the official <outline> XML from a GLIF.
 		We skip contours with only one point.
+		If componentList is given, a (component glyph name, GLIF path)
+		tuple is added to it for every component used by the glyph.
 		"""
-		dataList = [str(width)]
+		if componentList == None:
+			componentList = []
+		strWidth = str(width)
+		dataList = [strWidth if item == None else item for item in self.getHashDataList(outlineXML, glyphName, level, componentList)]
+		data = "".join(dataList)
+		if len(data) < 128:
+			hash = data
+		else:
+			hash = hashlib.sha512(data).hexdigest()
+		return hash, dataList
+
+	def getHashDataList(self, outlineXML, glyphName, level, componentList):
+		# Returns the hash data list for buildGlyphHashValue, with None
+		# wherever the glyph width goes. Component data does not depend on
+		# anything else, so it is built once per component GLIF in a run.
+		dataList = [None]
 		if level > 10:
 			raise UFOParseError("In parsing component, exceeded 10 levels of reference. '%s'. " % (glyphName))
 		for childContour in outlineXML:
@@ -776,20 +949,69 @@ class UFOFontData:
 					componentPath = self.getCurGlyphPath(compGlyphName)
 				except KeyError:
 					raise UFOParseError("'%s' component glyph is missing from contents.plist." % (compGlyphName))
-				if not os.path.exists(componentPath):
-					raise UFOParseError("'%s' component file is missing: '%s'." % (compGlyphName, componentPath))
-				etRoot = ET.ElementTree()
-				componentXML = etRoot.parse(componentPath)
-				componentOutlineXML = componentXML.find("outline")
-				componentHash, componentDataList = self.buildGlyphHashValue(width, componentOutlineXML, glyphName, level+1)
+				try:
+					componentDataList, compComponentList = self.componentHashData[componentPath]
+				except KeyError:
+					if not os.path.exists(componentPath):
+						raise UFOParseError("'%s' component file is missing: '%s'." % (compGlyphName, componentPath))
+					etRoot = ET.ElementTree()
+					componentXML = etRoot.parse(componentPath)
+					componentOutlineXML = componentXML.find("outline")
+					compComponentList = []
+					componentDataList = self.getHashDataList(componentOutlineXML, glyphName, level+1, compComponentList)
+					self.componentHashData[componentPath] = (componentDataList, compComponentList)
 				dataList.extend(componentDataList)
-				
-		data = "".join(dataList)
-		if len(data) < 128:
-			hash = data
-		else:
-			hash = hashlib.sha512(data).hexdigest()
-		return hash, dataList
+				componentList.append((compGlyphName, componentPath))
+				componentList.extend(compComponentList)
+		return dataList
+
+	def getFileStat(self, path):
+		try:
+			return self.fileStats[path]
+		except KeyError:
+			pass
+		try:
+			st = os.stat(path)
+			fileStat = (st.st_mtime, st.st_size)
+		except OSError:
+			fileStat = None
+		self.fileStats[path] = fileStat
+		return fileStat
+
+	def getIndexedGlyphHash(self, glyphPath):
+		# Return the hash stored in the file index for the GLIF file, or
+		# None if the file or any of its components has changed since.
+		if self.hashMap == None:
+			self.readHashMap()
+		entry = self.hashMap.getFileEntry(os.path.relpath(glyphPath, self.parentPath))
+		if entry == None:
+			return None
+		mtime, size, srcHash, componentList = entry
+		if self.getFileStat(glyphPath) != (mtime, size):
+			return None
+		for compGlyphName, compPath, compMTime, compSize in componentList:
+			try:
+				componentPath = self.getCurGlyphPath(compGlyphName)
+			except KeyError:
+				return None
+			if os.path.relpath(componentPath, self.parentPath) != compPath:
+				return None
+			if self.getFileStat(componentPath) != (compMTime, compSize):
+				return None
+		return srcHash
+
+	def setIndexedGlyphHash(self, glyphPath, glyphStat, srcHash, componentList):
+		# glyphStat is the stat of the GLIF file from before it was parsed.
+		if glyphStat == None:
+			return
+		indexComponentList = []
+		for compGlyphName, componentPath in componentList:
+			compStat = self.getFileStat(componentPath)
+			if compStat == None:
+				return
+			indexComponentList.append((compGlyphName, os.path.relpath(componentPath, self.parentPath)) + compStat)
+		mtime, size = glyphStat
+		self.hashMap.setFileEntry(os.path.relpath(glyphPath, self.parentPath), (mtime, size, srcHash, indexComponentList))
 
 	def getComponentOutline(self, componentItem):
 		try:
@@ -814,9 +1036,11 @@ class UFOFontData:
 		return
 		
 	def close(self):
-		if self.hashMapChanged:
-			self.writeHashMap()
+		# Also saves any new file index entries when no glyph was processed.
+		self.writeHashMap()
 		self.hashMapChanged = 0
+		if self.hashMap != None:
+			self.hashMap.close()
 		return
 
 def parseGlyphOrder(filePath):
@@ -1699,30 +1923,37 @@ def checkHashMaps(fontPath, doSync):
 	ufoFontData.readHashMap()
 	# Don't need to check the glyph hashes if there aren't any.
 	if len(ufoFontData.hashMap) > 0:
+		hashMap = ufoFontData.hashMap
 		for glyphName in gNameList:
+			try:
+				oldHash, oldEdited, historyList = hashMap[glyphName] 
+			except KeyError:
+				continue # the glyph has not been processed; nothing to check.
 			glyphFileName = gm[glyphName]
 			glyphPath = os.path.join(ufoFontData.glyphDefaultDir, glyphFileName)
-			etRoot = ET.ElementTree()
-			glifXML = etRoot.parse(glyphPath)
-			outlineXML = glifXML.find("outline")
 			failedMatch = 0
-			if outlineXML != None:
-				hashMap = ufoFontData.hashMap
+			newHash = ufoFontData.getIndexedGlyphHash(glyphPath)
+			if newHash == None:
+				glyphStat = ufoFontData.getFileStat(glyphPath)
+				etRoot = ET.ElementTree()
+				glifXML = etRoot.parse(glyphPath)
+				outlineXML = glifXML.find("outline")
+				if outlineXML == None:
+					continue
 				try:
 					widthXML = glifXML.find("advance")
 					if widthXML != None:
 						width = int(eval(widthXML.get("width")))
 					else:
 						width = 1000
-					oldHash, oldEdited, historyList = hashMap[glyphName] 
-					newHash, dataList = ufoFontData.buildGlyphHashValue(width, outlineXML, glyphName)
-					#print "\toldHash", oldHash
-					if oldHash != newHash:
-						failedMatch = 1
+					componentList = []
+					newHash, dataList = ufoFontData.buildGlyphHashValue(width, outlineXML, glyphName, 0, componentList)
 				except KeyError:
-					pass
-			else:
-				continue
+					continue
+				ufoFontData.setIndexedGlyphHash(glyphPath, glyphStat, newHash, componentList)
+			#print "\toldHash", oldHash
+			if oldHash != newHash:
+				failedMatch = 1
 		
 			if failedMatch:
 				allMatch = False
@@ -1756,6 +1987,7 @@ def checkHashMaps(fontPath, doSync):
 				print "Removed outdate file:", glyphPath
 			except OSError:
 				print "Cannot delete outdated file:", glyphPath
+	ufoFontData.close() # saves any new file index entries.
 	return allMatch, msgList
 				
 			
@@ -5,7 +5,9 @@ from fontTools.misc.py23 import *
 from fontTools.misc import sstruct
 from fontTools.misc import psCharStrings
 from fontTools.misc.textTools import safeEval
+from array import array
 import struct
+import sys
 
 DEBUG = 0
 
@@ -319,13 +321,7 @@ class Index(object):
 		if DEBUG:
 			print("    index count: %s offSize: %s" % (count, offSize))
 		assert offSize <= 4, "offSize too large: %s" % offSize
-		self.offsets = offsets = []
-		pad = b'\0' * (4 - offSize)
-		for index in range(count+1):
-			chunk = file.read(offSize)
-			chunk = pad + chunk
-			offset, = struct.unpack(">L", chunk)
-			offsets.append(int(offset))
+		self.offsets = offsets = readOffsets(file, count+1, offSize)
 		self.offsetBase = file.tell() - 1
 		file.seek(self.offsetBase + offsets[-1])  # pretend we've read the whole lot
 		if DEBUG:
@@ -452,7 +448,6 @@ class	FDSelect:
 			# read data in from file
 			self.format = readCard8(file)
 			if self.format == 0:
-				from array import array
 				self.gidArray = array("B", file.read(numGlyphs)).tolist()
 			elif self.format == 3:
 				gidArray = [None] * numGlyphs
@@ -601,6 +596,31 @@ class CharStrings(object):
 			self[glyphName] = charString
 
 
+if array("I").itemsize == 4:
+	uint32Code = "I"
+else:
+	uint32Code = "L"
+
+def readOffsets(file, count, offSize):
+	"""Read an array of 'count' big-endian offsets, 'offSize' bytes each,
+	with one read, and decode it into a compact array of uint32 values.
+	"""
+	data = file.read(count * offSize)
+	assert len(data) == count * offSize, "INDEX offset array is truncated"
+	if offSize != 4:
+		# Widen each offset to 4 bytes by copying byte columns into a
+		# zeroed buffer, so that the decoding below stays in C.
+		raw = array("B", data)
+		padded = array("B", b"\0" * (4 * count))
+		for i in range(offSize):
+			padded[4 - offSize + i::4] = raw[i::offSize]
+		data = padded.tostring()
+	offsets = array(uint32Code)
+	offsets.fromstring(data)
+	if sys.byteorder != "big":
+		offsets.byteswap()
+	return offsets
+
 def readCard8(file):
 	return byteord(file.read(1))
 
@@ -938,13 +958,15 @@ def packCharset1(charset, isCID, strings):
 
 def parseCharset0(numGlyphs, file, strings, isCID):
 	charset = [".notdef"]
+	ids = array("H")
+	ids.fromstring(file.read(2 * (numGlyphs - 1)))
+	if sys.byteorder != "big":
+		ids.byteswap()
 	if isCID:
-		for i in range(numGlyphs - 1):
-			CID = readCard16(file)
+		for CID in ids:
 			charset.append("cid" + str(CID).zfill(5))
 	else:
-		for i in range(numGlyphs - 1):
-			SID = readCard16(file)
+		for SID in ids:
 			charset.append(strings[SID])
 	return charset
 
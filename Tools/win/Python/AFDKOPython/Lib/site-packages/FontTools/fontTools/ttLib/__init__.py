@@ -123,6 +123,11 @@ class TTFont(object):
 		If lazy is set to True, many data structures are loaded lazily, upon
 		access only.  If it is set to False, many data structures are loaded
 		immediately.  The default is lazy=None which is somewhere in between.
+		With lazy=True, a font file on disk is also memory mapped rather
+		than read table by table. The map is shared by all TTFont objects
+		that have the same file open, such as several fonts from one TTC;
+		use self.reader.getTableView(tag) to get raw table data without
+		copying it.
 		"""
 		
 		from fontTools.ttLib import sfnt
@@ -163,7 +168,7 @@ class TTFont(object):
 				file = open(file, "rb")
 		else:
 			pass # assume "file" is a readable file object
-		self.reader = sfnt.SFNTReader(file, checkChecksums, fontNumber=fontNumber)
+		self.reader = sfnt.SFNTReader(file, checkChecksums, fontNumber=fontNumber, useMMap=(lazy is True))
 		self.sfntVersion = self.reader.sfntVersion
 		self.flavor = self.reader.flavor
 		self.flavorData = self.reader.flavorData
@@ -17,13 +17,88 @@ from fontTools.misc.py23 import *
 from fontTools.misc import sstruct
 from fontTools.ttLib import getSearchRange
 import struct
+import os
+import sys
+import weakref
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+class SFNTFileMap(object):
+
+	"""A read-only memory map of a font file, shared by all the SFNTReader
+	objects that have the same file open: for example, several fonts of
+	one TTC collection. Use acquire() and release() rather than the
+	constructor; the map is closed when the last reader releases it.
+	The registry of shared maps holds only weak references, so the map
+	of a reader that is never closed is unmapped, and its file handle
+	closed, when the reader is garbage collected.
+	"""
+
+	_maps = weakref.WeakValueDictionary()
+
+	def __init__(self, key, fileno):
+		import mmap
+		self.key = key
+		self.map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+		self.refCount = 0
+
+	@classmethod
+	def acquire(cls, file):
+		"""Return the shared map for 'file', or None if the file cannot be
+		memory mapped (for example, an in-memory file object).
+		"""
+		try:
+			fileno = file.fileno()
+			st = os.fstat(fileno)
+			key = (os.path.realpath(file.name), st.st_size, st.st_mtime)
+		except (AttributeError, IOError, OSError, ValueError):
+			return None
+		if not st.st_size:
+			return None
+		fileMap = cls._maps.get(key)
+		if fileMap is None:
+			try:
+				fileMap = cls(key, fileno)
+			except (EnvironmentError, ValueError):
+				return None
+			cls._maps[key] = fileMap
+		fileMap.refCount += 1
+		return fileMap
+
+	def release(self):
+		self.refCount -= 1
+		if self.refCount <= 0:
+			if self._maps.get(self.key) is self:
+				del self._maps[self.key]
+			try:
+				self.map.close()
+			except BufferError:
+				# Views handed out by getView() are still alive; the map
+				# is unmapped when they are garbage collected.
+				pass
+
+	def getView(self, offset, length):
+		"""Return a zero-copy view of 'length' bytes starting at 'offset'."""
+		try:
+			return memoryview(self.map)[offset:offset+length]
+		except TypeError:
+			# Python 2 mmap objects support only the old buffer interface.
+			return buffer(self.map, offset, length)
 
 
 class SFNTReader(object):
 	
-	def __init__(self, file, checkChecksums=1, fontNumber=-1):
+	def __init__(self, file, checkChecksums=1, fontNumber=-1, useMMap=False):
 		self.file = file
 		self.checkChecksums = checkChecksums
+		self.fileMap = None
+		if useMMap:
+			self.fileMap = SFNTFileMap.acquire(file)
+		self.checkedTags = {}
 
 		self.flavor = None
 		self.flavorData = None
@@ -72,26 +147,62 @@ class SFNTReader(object):
 	
 	def __getitem__(self, tag):
 		"""Fetch the raw table data."""
-		entry = self.tables[Tag(tag)]
-		data = entry.loadData (self.file)
-		if self.checkChecksums:
-			if tag == 'head':
-				# Beh: we have to special-case the 'head' table.
-				checksum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
-			else:
-				checksum = calcChecksum(data)
-			if self.checkChecksums > 1:
-				# Be obnoxious, and barf when it's wrong
-				assert checksum == entry.checksum, "bad checksum for '%s' table" % tag
-			elif checksum != entry.checkSum:
-				# Be friendly, and just print a warning.
-				print("bad checksum for '%s' table" % tag)
+		tag = Tag(tag)
+		entry = self.tables[tag]
+		if self.fileMap is not None:
+			data = entry.loadDataFromMap(self.fileMap)
+		else:
+			data = entry.loadData (self.file)
+		if self.checkChecksums and tag not in self.checkedTags:
+			if not self.verifyChecksum(tag, data):
+				if self.checkChecksums > 1:
+					# Be obnoxious, and barf when it's wrong
+					assert 0, "bad checksum for '%s' table" % tag
+				else:
+					# Be friendly, and just print a warning.
+					print("bad checksum for '%s' table" % tag)
 		return data
+
+	def getTableView(self, tag):
+		"""Return the raw table data without copying it, when the reader
+		is memory mapped and the table is stored uncompressed. The result is
+		a memoryview (or a buffer, on Python 2) of the file map, and stays
+		valid until the reader is closed. Otherwise, returns the same data
+		as reader[tag]. Checksums are not checked; use verifyChecksum().
+		"""
+		tag = Tag(tag)
+		entry = self.tables[tag]
+		if self.fileMap is not None and not entry.isCompressed():
+			return self.fileMap.getView(entry.offset, entry.length)
+		return self[tag]
+
+	def verifyChecksum(self, tag, data=None):
+		"""Return True if the table data matches the checksum in the table
+		directory. The result is remembered, so each table is checksummed at
+		most once.
+		"""
+		tag = Tag(tag)
+		if tag in self.checkedTags:
+			return self.checkedTags[tag]
+		entry = self.tables[tag]
+		if data is None:
+			data = self.getTableView(tag)
+		if tag == 'head':
+			# Beh: we have to special-case the 'head' table.
+			data = bytes(data)
+			checksum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+		else:
+			checksum = calcChecksum(data)
+		self.checkedTags[tag] = ok = (checksum == entry.checkSum)
+		return ok
 	
 	def __delitem__(self, tag):
 		del self.tables[Tag(tag)]
 	
 	def close(self):
+		if self.fileMap is not None:
+			self.fileMap.release()
+			self.fileMap = None
 		self.file.close()
 
 
@@ -363,6 +474,16 @@ class DirectoryEntry(object):
 			data = self.decodeData(data)
 		return data
 
+	def loadDataFromMap(self, fileMap):
+		data = fileMap.map[self.offset:self.offset+self.length]
+		assert len(data) == self.length
+		if hasattr(self.__class__, 'decodeData'):
+			data = self.decodeData(data)
+		return data
+
+	def isCompressed(self):
+		return False
+
 	def saveData(self, file, data):
 		if hasattr(self.__class__, 'encodeData'):
 			data = self.encodeData(data)
@@ -387,6 +508,9 @@ class WOFFDirectoryEntry(DirectoryEntry):
 	formatSize = woffDirectoryEntrySize
 	zlibCompressionLevel = 6
 
+	def isCompressed(self):
+		return self.length != self.origLength
+
 	def decodeData(self, rawData):
 		import zlib
 		if self.length == self.origLength:
@@ -440,31 +564,86 @@ class WOFFFlavorData():
 
 def calcChecksum(data):
 	"""Calculate the checksum for an arbitrary block of data.
-	Optionally takes a 'start' argument, which allows you to
-	calculate a checksum in chunks by feeding it a previous
-	result.
+	The data may be a byte string, or a memoryview or buffer such as
+	SFNTReader.getTableView() returns.
 	
 	If the data length is not a multiple of four, it assumes
 	it is to be padded with null byte. 
 
-		>>> print calcChecksum(b"abcd")
+		>>> print(calcChecksum(b"abcd"))
 		1633837924
-		>>> print calcChecksum(b"abcdxyz")
+		>>> print(calcChecksum(b"abcdxyz"))
 		3655064932
 	"""
 	remainder = len(data) % 4
 	if remainder:
-		data += b"\0" * (4 - remainder)
+		data = bytes(data) + b"\0" * (4 - remainder)
+	if numpy is not None:
+		return _calcChecksumNumpy(data)
+	return _calcChecksumPython(data)
+
+
+def _calcChecksumNumpy(data):
+	# View the data as big-endian uint32 values, without copying it, and
+	# sum them in 64 bits.
+	longs = numpy.frombuffer(data, dtype=">u4")
+	return int(longs.sum(dtype=numpy.uint64)) & 0xffffffff
+
+
+_checksumBlockSize = 4096
+_checksumBlockStruct = struct.Struct(">%dL" % (_checksumBlockSize // 4))
+
+def _calcChecksumPython(data):
+	# Pure Python fallback. unpack_from() decodes each block in place,
+	# rather than first slicing it out of the data.
 	value = 0
-	blockSize = 4096
-	assert blockSize % 4 == 0
-	for i in range(0, len(data), blockSize):
-		block = data[i:i+blockSize]
-		longs = struct.unpack(">%dL" % (len(block) // 4), block)
-		value = (value + sum(longs)) & 0xffffffff
-	return value
+	length = len(data)
+	end = length - length % _checksumBlockSize
+	unpack_from = _checksumBlockStruct.unpack_from
+	for i in range(0, end, _checksumBlockSize):
+		value += sum(unpack_from(data, i))
+	if end < length:
+		value += sum(struct.unpack_from(">%dL" % ((length - end) // 4), data, end))
+	return value & 0xffffffff
+
+
+def benchmarkChecksum(fontPaths, repeat=3):
+	"""Time the table checksum implementations on each table of the
+	given fonts, largest tables first, and print the results.
+	"""
+	import time
+	funcs = [("python", _calcChecksumPython)]
+	if numpy is not None:
+		funcs.append(("numpy", _calcChecksumNumpy))
+	for path in fontPaths:
+		f = open(path, "rb")
+		reader = SFNTReader(f, checkChecksums=0, fontNumber=0, useMMap=True)
+		print(path)
+		tags = sorted(reader.keys(), key=lambda tag: -reader.tables[tag].length)
+		for tag in tags:
+			data = reader[tag]
+			remainder = len(data) % 4
+			if remainder:
+				data += b"\0" * (4 - remainder)
+			results = []
+			for name, func in funcs:
+				best = None
+				for i in range(repeat):
+					start = time.time()
+					checksum = func(data)
+					elapsed = time.time() - start
+					if best is None or elapsed < best:
+						best = elapsed
+				results.append("%s %.2f ms" % (name, best * 1000))
+				assert checksum == funcs[0][1](data)
+			print("\t'%s' %10d bytes: %s" % (tag, len(data), ", ".join(results)))
+		reader.close()
 
 
 if __name__ == "__main__":
-    import doctest
-    doctest.testmod()
+	if sys.argv[1:]:
+		# python sfnt.py font1.otf font2.otf ...
+		benchmarkChecksum(sys.argv[1:])
+	else:
+		import doctest
+		doctest.testmod()
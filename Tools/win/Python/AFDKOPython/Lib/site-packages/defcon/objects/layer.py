@@ -1,6 +1,9 @@
 import os
 import weakref
+import json
 from fontTools.misc.arrayTools import unionRect, calcBounds
+from fontTools.misc.transform import Transform
+from ufoLib.glifLib import _fetchUnicodes, _fetchImageFileName
 from defcon.objects.base import BaseObject
 from defcon.objects.glyph import Glyph
 from defcon.objects.lib import Lib
@@ -90,6 +93,7 @@ class Layer(BaseObject):
 
         self._glyphs = {}
         self._glyphSet = glyphSet
+        self._glyphIndex = None
         self._scheduledForDeletion = {}
         self._keys = set()
 
@@ -343,13 +347,12 @@ class Layer(BaseObject):
             if len(glyph):
                 found.append(glyphName)
         # scan glyphs that have not been loaded
-        if self._glyphSet is not None:
+        glyphIndex = self._getGlyphIndex()
+        if glyphIndex is not None:
             for glyphName, fileName in self._glyphSet.contents.items():
                 if glyphName in self._glyphs or glyphName in self._scheduledForDeletion:
                     continue
-                glif = self._glyphSet.getGLIF(glyphName)
-                containsPoints = _fetchHasOutlineData(glif)
-                if containsPoints:
+                if glyphIndex.getEntry(glyphName)["hasOutline"]:
                     found.append(glyphName)
         return found
 
@@ -371,10 +374,11 @@ class Layer(BaseObject):
                     found[baseGlyph] = set()
                 found[baseGlyph].add(glyphName)
         # scan glyphs that have not been loaded
-        if self._glyphSet is not None:
+        glyphIndex = self._getGlyphIndex()
+        if glyphIndex is not None:
             glyphNames = set(self._glyphSet.contents.keys()) - set(self._glyphs.keys())
-            for glyphName, baseList in self._glyphSet.getComponentReferences(glyphNames).items():
-                for baseGlyph in baseList:
+            for glyphName in glyphNames:
+                for baseGlyph, transformation in glyphIndex.getEntry(glyphName)["components"]:
                     if baseGlyph not in found:
                         found[baseGlyph] = set()
                     found[baseGlyph].add(glyphName)
@@ -397,9 +401,13 @@ class Layer(BaseObject):
                     found[fileName] = []
                 found[fileName].append(glyphName)
         # scan glyphs that have not been loaded
-        if self._glyphSet is not None:
+        glyphIndex = self._getGlyphIndex()
+        if glyphIndex is not None:
             glyphNames = set(self._glyphSet.contents.keys()) - set(self._glyphs.keys())
-            for glyphName, fileName in self._glyphSet.getImageReferences(glyphNames).items():
+            for glyphName in glyphNames:
+                fileName = glyphIndex.getEntry(glyphName)["image"]
+                if fileName is None:
+                    continue
                 if fileName not in found:
                     found[fileName] = []
                 found[fileName].append(glyphName)
@@ -411,8 +419,13 @@ class Layer(BaseObject):
 
     def _get_bounds(self):
         fontRect = None
-        for glyph in self:
-            glyphRect = glyph.bounds
+        glyphIndex = self._getGlyphIndex()
+        glyphRects = {}
+        for glyphName in self.keys():
+            if glyphIndex is None:
+                glyphRect = self[glyphName].bounds
+            else:
+                glyphRect = self._getIndexedGlyphBounds(glyphName, glyphIndex, glyphRects, set())
             if glyphRect is None:
                 continue
             if fontRect is None:
@@ -421,12 +434,46 @@ class Layer(BaseObject):
                 fontRect = unionRect(fontRect, glyphRect)
         return fontRect
 
-    bounds = property(_get_bounds, doc="The bounds of all glyphs in the layer. This can be an expensive operation.")
+    bounds = property(_get_bounds, doc="The bounds of all glyphs in the layer. Glyphs that have not been loaded are measured with the glyph index instead of being loaded. This can be an expensive operation.")
+
+    def _getIndexedGlyphBounds(self, glyphName, glyphIndex, glyphRects, visited):
+        """
+        Get the bounds of a glyph the way the glyph would measure itself:
+        the contour bounds combined with the transformed bounds of the
+        component base glyphs. Loaded glyphs measure themselves, the others
+        are measured with the glyph index.
+        """
+        if glyphName in glyphRects:
+            return glyphRects[glyphName]
+        if glyphName in self._glyphs or glyphName not in self._glyphSet.contents:
+            glyphRect = self[glyphName].bounds
+        elif glyphName in visited:
+            # a component cycle
+            return None
+        else:
+            visited.add(glyphName)
+            glyphRect = glyphIndex.getContourBounds(glyphName)
+            for baseGlyph, transformation in glyphIndex.getEntry(glyphName)["components"]:
+                if baseGlyph not in self:
+                    continue
+                componentRect = self._getIndexedGlyphBounds(baseGlyph, glyphIndex, glyphRects, visited)
+                if componentRect is None:
+                    continue
+                if tuple(transformation) != _defaultTransformation:
+                    xMin, yMin, xMax, yMax = componentRect
+                    t = Transform(*transformation)
+                    (xMin, yMin), (xMax, yMax) = t.transformPoints([(xMin, yMin), (xMax, yMax)])
+                    componentRect = (xMin, yMin, xMax, yMax)
+                if glyphRect is None:
+                    glyphRect = componentRect
+                else:
+                    glyphRect = unionRect(glyphRect, componentRect)
+        glyphRects[glyphName] = glyphRect
+        return glyphRect
 
     # control point bounds
 
     def _get_controlPointBounds(self):
-        from fontTools.misc.transform import Transform
         # storage
         glyphRects = {}
         componentReferences = {}
@@ -438,15 +485,15 @@ class Layer(BaseObject):
             if glyphRect:
                 glyphRects[glyphName] = glyphRect
         # scan glyphs that have not been loaded
-        if self._glyphSet is not None:
+        glyphIndex = self._getGlyphIndex()
+        if glyphIndex is not None:
             for glyphName, fileName in self._glyphSet.contents.items():
                 if glyphName in self._glyphs or glyphName in self._scheduledForDeletion:
                     continue
-                glif = self._glyphSet.getGLIF(glyphName)
-                points, components = _fetchControlPointBoundsData(glif)
-                if points:
-                    glyphRects[glyphName] = calcBounds(points)
-                for base, transformation in components:
+                entry = glyphIndex.getEntry(glyphName)
+                if entry["pointBounds"] is not None:
+                    glyphRects[glyphName] = tuple(entry["pointBounds"])
+                for base, transformation in entry["components"]:
                     xScale, xyScale, yxScale, yScale, xOffset, yOffset = transformation
                     if glyphName not in componentReferences:
                         componentReferences[glyphName] = []
@@ -473,6 +520,9 @@ class Layer(BaseObject):
                     glyphRect = componentRect
                 else:
                     glyphRect = unionRect(glyphRect, componentRect)
+            # none of the base glyphs could be measured
+            if None in glyphRect:
+                continue
             # store the updated rect
             glyphRects[glyphName] = glyphRect
         # work out the unified rect
@@ -552,10 +602,11 @@ class Layer(BaseObject):
                         cmap[code].append(glyphName)
                     else:
                         cmap[code] = [glyphName]
-            if self._glyphSet is not None:
+            glyphIndex = self._getGlyphIndex()
+            if glyphIndex is not None:
                 glyphNames = set(self._glyphSet.keys()) - set(self._glyphs.keys())
-                for glyphName, unicodes in self._glyphSet.getUnicodes(glyphNames=glyphNames).items():
-                    for code in unicodes:
+                for glyphName in glyphNames:
+                    for code in glyphIndex.getEntry(glyphName)["unicodes"]:
                         if code in cmap:
                             cmap[code].append(glyphName)
                         else:
@@ -593,6 +644,7 @@ class Layer(BaseObject):
         if saveAs:
             for glyph in self:
                 glyph.dirty = True
+        savedGlyphNames = [glyphName for glyphName, glyph in self._glyphs.items() if glyph.dirty]
         for glyphName, glyph in sorted(self._glyphs.items()):
             self.saveGlyph(glyph, glyphSet, saveAs=saveAs)
         # remove deleted glyphs
@@ -603,6 +655,23 @@ class Layer(BaseObject):
         glyphSet.writeContents()
         self._glyphSet = glyphSet
         self._scheduledForDeletion.clear()
+        self.saveGlyphIndex(savedGlyphNames)
+
+    def saveGlyphIndex(self, glyphNames):
+        """
+        Update the glyph index entries of **glyphNames** and write the index
+        to the data directory of the UFO. This is only done if the index has
+        been used or was already in the UFO. This method should not be called externally.
+        Subclasses may override this method to implement custom saving behavior.
+        """
+        if self._glyphIndex is None and not os.path.exists(_getGlyphIndexPath(self._glyphSet.dirName)):
+            return
+        glyphIndex = self._getGlyphIndex()
+        for glyphName in glyphNames:
+            if glyphName in self._glyphSet.contents:
+                glyphIndex.getEntry(glyphName)
+        if glyphIndex.dirty:
+            glyphIndex.write()
 
     def saveGlyph(self, glyph, glyphSet, saveAs=False):
         """
@@ -613,6 +682,24 @@ class Layer(BaseObject):
             glyphSet.writeGlyph(glyph.name, glyph, glyph.drawPoints)
             self._stampGlyphDataState(glyph)
 
+    # -----------
+    # Glyph Index
+    # -----------
+
+    def _getGlyphIndex(self):
+        """
+        Get the index of the data skimmed from the GLIF files of the layer,
+        or None if the layer has no glyph set.
+        """
+        glyphSet = self._glyphSet
+        if glyphSet is None:
+            return None
+        glyphIndex = self._glyphIndex
+        if glyphIndex is None or glyphIndex.dirName != glyphSet.dirName:
+            glyphIndex = self._glyphIndex = _GlyphIndex(glyphSet)
+        glyphIndex.glyphSet = glyphSet
+        return glyphIndex
+
     # ---------------------
     # External Edit Support
     # ---------------------
@@ -870,6 +957,139 @@ class _FetchHasOutlineDataParser(_BaseParser):
             raise _DoneParsing
         super(_FetchHasOutlineDataParser, self).endElementHandler(name)
 
+# -----------
+# Glyph Index
+# -----------
+
+_glyphIndexDirectoryName = "com.adobe.type.defcon.glyphIndex"
+_glyphIndexFormatVersion = 1
+_defaultTransformation = (1, 0, 0, 1, 0, 0)
+
+def _getGlyphIndexPath(glyphSetDirName):
+    ufoPath, glyphSetDirectoryName = os.path.split(os.path.normpath(glyphSetDirName))
+    return os.path.join(ufoPath, "data", _glyphIndexDirectoryName, glyphSetDirectoryName + ".json")
+
+class _GlyphIndex(object):
+
+    """
+    Data skimmed from the GLIF files of a glyph set: outline presence,
+    control point bounds, contour bounds, components, unicodes and image
+    file name. Entries are keyed by GLIF file name and are only used while
+    the modification time and size of the file have not changed.
+    The index is stored as a JSON file in the data directory of the UFO.
+    """
+
+    def __init__(self, glyphSet):
+        self.glyphSet = glyphSet
+        self.dirName = glyphSet.dirName
+        self.path = _getGlyphIndexPath(glyphSet.dirName)
+        self.entries = {}
+        self.dirty = False
+        self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            f = open(self.path, "rb")
+            data = json.load(f)
+            f.close()
+        except (IOError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("formatVersion") != _glyphIndexFormatVersion:
+            return
+        entries = data.get("glyphs")
+        if not isinstance(entries, dict):
+            return
+        self.entries = entries
+
+    def getEntry(self, glyphName):
+        fileName = self.glyphSet.contents[glyphName]
+        try:
+            st = os.stat(os.path.join(self.dirName, fileName))
+            stamp = [st.st_mtime, st.st_size]
+        except OSError:
+            stamp = None
+        entry = self.entries.get(fileName)
+        if entry is None or stamp is None or entry["stamp"] != stamp or entry["glyphName"] != glyphName:
+            entry = self._makeEntry(glyphName, stamp)
+            self.entries[fileName] = entry
+            self.dirty = True
+        return entry
+
+    def _makeEntry(self, glyphName, stamp):
+        glif = self.glyphSet.getGLIF(glyphName)
+        points, components = _fetchControlPointBoundsData(glif)
+        pointBounds = None
+        if points:
+            pointBounds = list(calcBounds(points))
+        return dict(
+            glyphName=glyphName,
+            stamp=stamp,
+            hasOutline=_fetchHasOutlineData(glif),
+            pointBounds=pointBounds,
+            components=components,
+            unicodes=_fetchUnicodes(glif),
+            image=_fetchImageFileName(glif)
+        )
+
+    def getContourBounds(self, glyphName):
+        """
+        Get the bounds of the contours of a glyph, ignoring its components.
+        These are calculated the first time they are needed.
+        """
+        entry = self.getEntry(glyphName)
+        if "contourBounds" not in entry:
+            from fontTools.pens.boundsPen import BoundsPen
+            from robofab.pens.adapterPens import PointToSegmentPen
+            pen = BoundsPen(None)
+            self.glyphSet.readGlyph(glyphName, None, _ContourPointPen(PointToSegmentPen(pen)))
+            bounds = pen.bounds
+            if bounds is not None:
+                bounds = list(bounds)
+            entry["contourBounds"] = bounds
+            self.dirty = True
+        bounds = entry["contourBounds"]
+        if bounds is not None:
+            bounds = tuple(bounds)
+        return bounds
+
+    def write(self):
+        fileNames = set(self.glyphSet.contents.values())
+        entries = {}
+        for fileName, entry in self.entries.items():
+            if fileName in fileNames:
+                entries[fileName] = entry
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        f = open(self.path, "wb")
+        json.dump(dict(formatVersion=_glyphIndexFormatVersion, glyphs=entries), f)
+        f.close()
+        self.entries = entries
+        self.dirty = False
+
+class _ContourPointPen(object):
+
+    """
+    Point pen that passes contours on and ignores components.
+    """
+
+    def __init__(self, pointPen):
+        self._pointPen = pointPen
+
+    def beginPath(self, **kwargs):
+        self._pointPen.beginPath()
+
+    def endPath(self):
+        self._pointPen.endPath()
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, **kwargs):
+        self._pointPen.addPoint(pt, segmentType=segmentType, smooth=smooth, name=name)
+
+    def addComponent(self, baseGlyphName, transformation, **kwargs):
+        pass
+
 # -----
 # Tests
 # -----
@@ -1193,6 +1413,28 @@ def _testBounds():
     (0, 0, 700, 700)
     """
 
+def _testGlyphIndex():
+    """
+    >>> import os
+    >>> from defcon import Font
+    >>> from defcon.test.testTools import makeTestFontCopy, tearDownTestFontCopy
+    >>> path = makeTestFontCopy()
+    >>> font = Font(path)
+    >>> layer = font.layers["public.default"]
+    >>> layer.bounds
+    (0, 0, 700, 700)
+    >>> font.save()
+    >>> os.path.exists(os.path.join(path, "data", "com.adobe.type.defcon.glyphIndex", "glyphs.json"))
+    True
+    >>> font = Font(path)
+    >>> layer = font.layers["public.default"]
+    >>> layer.bounds
+    (0, 0, 700, 700)
+    >>> len(layer._glyphs)
+    0
+    >>> tearDownTestFontCopy()
+    """
+
 def _testControlPointBounds():
     """
     >>> from defcon import Font
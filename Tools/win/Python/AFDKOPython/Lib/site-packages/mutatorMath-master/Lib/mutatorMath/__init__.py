@@ -38,10 +38,12 @@ def build(
 		outputUFOFormatVersion=2,
 		roundGeometry=True,
 		verbose=True,
-		logPath=None):
+		logPath=None,
+		batchGlyphs=False):
 	"""
 
 		Simple builder for UFO designspaces.
+		With batchGlyphs, each glyph is made for all instances at once.
 
 	"""
 	from mutatorMath.ufo.document import DesignSpaceDocumentReader
@@ -57,7 +59,7 @@ def build(
 	        roundGeometry=True,
 	        verbose=verbose,
 	        logPath=logPath)
-	results = reader.process()
+	results = reader.process(batchGlyphs=batchGlyphs)
 	return results
 
 def makeBuildScript(path):
@@ -11,6 +11,14 @@ _EPSILON = 1e-15
 _ONE_EPSILON = 1 - _EPSILON
 _MINUS_ONE_EPSILON = -1 + _EPSILON
 
+# Factors depend only on the delta locations of a mutator and on the location
+# of the instance, not on the math objects. When instances are built, the masters
+# of most glyphs are the same set of locations, so getFactors keeps the factors
+# for each (mutator class, delta locations, instance location, axisOnly)
+# and computes them only once for each instance.
+_factorCache = {}
+_FACTOR_CACHE_SIZE = 10000
+
 
 def buildMutator(items):
     """
@@ -221,11 +229,16 @@ class Mutator(BaseMutator):
         self._collectAxisPoints()
         factors = self.getFactors(aLocation, axisOnly)
         total = None
-        for f, item, name in factors:
-            if total is None:
-                total = f * item
-            else:
-                total += f * item
+        if factors and hasattr(factors[0][1], "weightedSum"):
+            # Objects such as fontMath.MathGlyph can add up all the
+            # weighted deltas in one pass.
+            total = factors[0][1].weightedSum([(f, item) for f, item, name in factors])
+        else:
+            for f, item, name in factors:
+                if total is None:
+                    total = f * item
+                else:
+                    total += f * item
         if total is None:
             total = 0 * self._neutral
         if getFactors:
@@ -249,13 +262,24 @@ class Mutator(BaseMutator):
             factor, mathItem, deltaName
         """
         deltas = []
-        aLocation.expand(self.getAxisNames())
-        limits = getLimits(self._allLocations(), aLocation)
+        axisNames = self.getAxisNames()
+        aLocation.expand(axisNames)
+        deltaLocationTuples = self.keys()
+        deltaLocationTuples.sort()
+        key = (self.__class__, tuple(deltaLocationTuples), aLocation.asTuple(), axisOnly)
+        factors = _factorCache.get(key)
+        if factors is None:
+            factors = {}
+            limits = getLimits(self._allLocations(), aLocation)
+            for deltaLocationTuple in deltaLocationTuples:
+                deltaLocation = Location(deltaLocationTuple)
+                deltaLocation.expand(axisNames)
+                factors[deltaLocationTuple] = self._accumulateFactors(aLocation, deltaLocation, limits, axisOnly)
+            if len(_factorCache) >= _FACTOR_CACHE_SIZE:
+                _factorCache.clear()
+            _factorCache[key] = factors
         for deltaLocationTuple, (mathItem, deltaName) in self.items():
-            deltaLocation = Location(deltaLocationTuple)
-            deltaLocation.expand( self.getAxisNames())
-            factor = self._accumulateFactors(aLocation, deltaLocation, limits, axisOnly)
-            deltas.append((factor, mathItem, deltaName))
+            deltas.append((factors[deltaLocationTuple], mathItem, deltaName))
         return deltas
 
     #
@@ -614,6 +638,26 @@ if __name__ == "__main__":
         4.5
         """
 
+    def test_factorCache():
+        """ Mutators with the same master locations share the factors,
+        but not the values.
+
+        >>> items = [
+        ...    (Location(pop=0), 0),
+        ...    (Location(pop=1), 100),
+        ...    (Location(pop=2), 300),
+        ... ]
+        >>> bias, m1 = buildMutator(items)
+        >>> m1.makeInstance(Location(pop=1.5))
+        200.0
+        >>> items = [(loc, value * 2) for loc, value in items]
+        >>> bias, m2 = buildMutator(items)
+        >>> m2.makeInstance(Location(pop=1.5))
+        400.0
+        >>> [f for f, item, name in m1.getFactors(Location(pop=0.5))] == [f for f, item, name in m2.getFactors(Location(pop=0.5))]
+        True
+        """
+
         
     def _test():
         import doctest
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+"""
+
+    These are tests for processing designspace documents with batchGlyphs
+        - make the glyphs of all instances glyph by glyph
+        - write UFO2 and UFO3 instances
+        - compare them with the instances made one by one
+
+
+"""
+
+import os
+
+import defcon.objects.font
+
+from mutatorMath.ufo.document import DesignSpaceDocumentWriter, DesignSpaceDocumentReader
+
+
+def writeBatchDocument(documentPath, sourcePath, instancePath):
+    """ Write a designspace with four masters and three instances into instancePath. """
+    doc = DesignSpaceDocumentWriter(documentPath, verbose=False)
+    masters = [
+        (os.path.join(sourcePath, "light", "LightCondensed.ufo"), dict(weight=0, width=0)),
+        (os.path.join(sourcePath, "light", "LightWide.ufo"), dict(weight=0, width=1)),
+        (os.path.join(sourcePath, "bold", "BoldCondensed.ufo"), dict(weight=1, width=0)),
+        (os.path.join(sourcePath, "bold", "BoldWide.ufo"), dict(weight=1, width=1)),
+        ]
+    for index, (path, location) in enumerate(masters):
+        doc.addSource(
+            path,
+            name="master_%d"%index,
+            location=location,
+            copyLib=index==0,
+            copyGroups=index==0,
+            copyInfo=index==0,
+            muteKerning=False,
+            muteInfo=False)
+    locations = [dict(weight=0.25, width=0.2), dict(weight=0.5, width=0.5), dict(weight=0.9, width=0.7)]
+    for index, location in enumerate(locations):
+        doc.startInstance(
+            fileName=os.path.join(instancePath, "testOutput_batch_%d.ufo"%index),
+            familyName="TestFamily",
+            styleName="TestStyleName%d"%index,
+            location=location)
+        if index == 1:
+            # a glyph with its own location is made after the batch.
+            doc.writeGlyph("M", location=dict(weight=0.1, width=0.1))
+        doc.writeInfo()
+        doc.writeKerning()
+        doc.endInstance()
+    doc.save()
+
+def readUFOFiles(path):
+    """ Return a dict with the relative paths and the data of all files in a UFO. """
+    data = {}
+    for dirPath, dirNames, fileNames in os.walk(path):
+        for fileName in fileNames:
+            filePath = os.path.join(dirPath, fileName)
+            f = open(filePath, "rb")
+            data[os.path.relpath(filePath, path)] = f.read()
+            f.close()
+    return data
+
+
+if __name__ == "__main__":
+    import doctest
+    def test1():
+        """
+        >>> testRoot = os.path.join(os.getcwd(), 'data')
+        >>> sourcePath = os.path.join(testRoot, 'sources')
+        >>> instancePath = os.path.join(testRoot, 'instances')
+        >>> logPath = os.path.join(testRoot, "tests.log")
+
+        >>> for ufoVersion in [2, 3]:
+        ...     for batchGlyphs in [False, True]:
+        ...         documentPath = os.path.join(testRoot, 'exporttest_batch_%d_%d.designspace'%(ufoVersion, batchGlyphs))
+        ...         writeBatchDocument(documentPath, sourcePath, os.path.join(instancePath, "F", "ufo%d_batch%d"%(ufoVersion, batchGlyphs)))
+        ...         doc = DesignSpaceDocumentReader(documentPath, ufoVersion, roundGeometry=True, verbose=False, logPath=logPath)
+        ...         doc.process(makeGlyphs=True, makeKerning=True, makeInfo=True, batchGlyphs=batchGlyphs)
+        ...         assert len(doc.results) == 3
+
+            # the UFO3 instances made in a batch can be opened again
+        >>> path = os.path.join(instancePath, "F", "ufo3_batch1", "testOutput_batch_0.ufo")
+        >>> assert os.path.exists(os.path.join(path, "layercontents.plist"))
+        >>> instance = defcon.objects.font.Font(path)
+        >>> assert instance.ufoFormatVersion == 3
+        >>> assert len(instance) > 0
+        >>> assert instance.kerning.items() != []
+
+            # the batch makes the same files as the instances made one by one
+        >>> for ufoVersion in [2, 3]:
+        ...     for index in range(3):
+        ...         fileName = "testOutput_batch_%d.ufo"%index
+        ...         one = readUFOFiles(os.path.join(instancePath, "F", "ufo%d_batch0"%ufoVersion, fileName))
+        ...         batch = readUFOFiles(os.path.join(instancePath, "F", "ufo%d_batch1"%ufoVersion, fileName))
+        ...         assert one == batch, (ufoVersion, fileName)
+
+            # the glyph with its own location is not the batch glyph
+        >>> path = os.path.join(instancePath, "F", "ufo3_batch1")
+        >>> instance1 = defcon.objects.font.Font(os.path.join(path, "testOutput_batch_1.ufo"))
+        >>> instance2 = defcon.objects.font.Font(os.path.join(path, "testOutput_batch_2.ufo"))
+        >>> assert instance1["M"].width < instance2["M"].width
+        """
+
+    doctest.testmod()
@@ -329,14 +329,19 @@ class DesignSpaceDocumentReader(object):
             self.logger.info("Building designspace document: %s", documentPath)
         self.results = {}   # dict with instancename / filepaths for post processing.
 
-    def process(self, makeGlyphs=True, makeKerning=True, makeInfo=True):
-        """ Process the input file and generate the instances. """
+    def process(self, makeGlyphs=True, makeKerning=True, makeInfo=True, batchGlyphs=False):
+        """ Process the input file and generate the instances.
+            With batchGlyphs the glyphs of all instances are made together, see readInstancesBatch.
+        """
         tree = ET.parse(self.path)        
         self.root = tree.getroot()
         self.readVersion()
         assert self.documentFormatVersion == 3
         self.readSources()
-        self.readInstances(makeGlyphs=makeGlyphs, makeKerning=makeKerning, makeInfo=makeInfo)
+        if batchGlyphs and makeGlyphs:
+            self.readInstancesBatch(makeKerning=makeKerning, makeInfo=makeInfo)
+        else:
+            self.readInstances(makeGlyphs=makeGlyphs, makeKerning=makeKerning, makeInfo=makeInfo)
     
     def readVersion(self):
         """ Read the document version.
@@ -482,12 +487,79 @@ class DesignSpaceDocumentReader(object):
         """
         for instanceElement in self.root.findall('.instances/instance'):
             self._readSingleInstanceElement(instanceElement, makeGlyphs=makeGlyphs, makeKerning=makeKerning, makeInfo=makeInfo)
-    
+
+    def readInstancesBatch(self, makeKerning=True, makeInfo=True):
+        """ Read all instance elements and make their glyphs glyph by glyph.
+
+            The masters of a glyph are read and its mutator is built only once,
+            then the glyph is made for all instances before moving on to the next glyph.
+            The instance glyphs are written to the UFOs as they are made,
+            so the memory use does not grow with the number of instances.
+        """
+        instanceElements = self.root.findall('.instances/instance')
+        if not instanceElements:
+            return
+        instanceObjects = []
+        unicodeMap = None
+        for instanceElement in instanceElements:
+            instanceObject = self._makeInstanceWriter(instanceElement, unicodeMap=unicodeMap)
+            # the unicode map only depends on the sources, make it once.
+            unicodeMap = self.unicodeMap
+            instanceObject.startGlyphStream()
+            instanceObjects.append(instanceObject)
+        # all instances have the same sources and muted glyphs
+        names = instanceObjects[0].getAvailableGlyphnames()
+        for n in names:
+            unicodeValue = self.unicodeMap.get(n, None)
+            mutator = mutatorError = None
+            try:
+                mutator = instanceObjects[0].buildGlyphMutator(n)
+            except (IndexError, TypeError, MutatorError) as error:
+                # incompatible masters, no master for the neutral, or a delta that can not be added.
+                # the instances get the glyph without an outline, as when made one by one.
+                mutatorError = error
+                if self.verbose:
+                    self.logger.info("Problem making glyph %s for all instances, skipping: %s", n, error)
+            for instanceObject in instanceObjects:
+                try:
+                    instanceObject.addGlyph(n, unicodeValue, mutator=mutator, mutatorError=mutatorError)
+                except AssertionError:
+                    if self.verbose:
+                        self.logger.info("Problem making glyph %s, skipping.", n)
+        for instanceElement, instanceObject in zip(instanceElements, instanceObjects):
+            # the glyphs that have special definitions.
+            for glyphElement in instanceElement.findall('.glyphs/glyph'):
+                self.readGlyphElement(glyphElement, instanceObject)
+            self._finishInstance(instanceElement, instanceObject, makeKerning=makeKerning, makeInfo=makeInfo)
+
     def _readSingleInstanceElement(self, instanceElement, makeGlyphs=True, makeKerning=True, makeInfo=True):
         """ Read a single instance element.
             If we have glyph specifications, only make those.
             Otherwise make all available glyphs.
         """
+        instanceObject = self._makeInstanceWriter(instanceElement)
+
+        if makeGlyphs:
+
+            # step 1: generate all glyphs we have mutators for. 
+            names = instanceObject.getAvailableGlyphnames()
+            for n in names:
+                unicodeValue = self.unicodeMap.get(n, None)
+                try:
+                    instanceObject.addGlyph(n, unicodeValue)
+                except AssertionError:
+                    if self.verbose:
+                        self.logger.info("Problem making glyph %s, skipping.", n)
+            # step 2: generate all the glyphs that have special definitions.
+            for glyphElement in instanceElement.findall('.glyphs/glyph'):
+                self.readGlyphElement(glyphElement, instanceObject)
+
+        self._finishInstance(instanceElement, instanceObject, makeKerning=makeKerning, makeInfo=makeInfo)
+
+    def _makeInstanceWriter(self, instanceElement, unicodeMap=None):
+        """ Make the instance writer for an instance element, with the sources, names and location set.
+            If no unicodeMap is given, it is made from the sources.
+        """
         # get the data from the instanceElement itself
         filename = instanceElement.attrib.get('filename')
         filenameTokenForResults = os.path.basename(filename)
@@ -504,7 +576,9 @@ class DesignSpaceDocumentReader(object):
 
         # set the masters
         instanceObject.setSources(self.sources)
-        self.unicodeMap = instanceObject.makeUnicodeMapFromSources()
+        if unicodeMap is None:
+            unicodeMap = instanceObject.makeUnicodeMapFromSources()
+        self.unicodeMap = unicodeMap
         instanceObject.setMuted(self.muted)
         familyname = instanceElement.attrib.get('familyname')
         if familyname is not None:
@@ -527,22 +601,10 @@ class DesignSpaceDocumentReader(object):
 
         if instanceLocation is not None:
             instanceObject.setLocation(instanceLocation)
-        
-        if makeGlyphs:
-
-            # step 1: generate all glyphs we have mutators for. 
-            names = instanceObject.getAvailableGlyphnames()
-            for n in names:
-                unicodeValue = self.unicodeMap.get(n, None)
-                try:
-                    instanceObject.addGlyph(n, unicodeValue)
-                except AssertionError:
-                    if self.verbose:
-                        self.logger.info("Problem making glyph %s, skipping.", n)
-            # step 2: generate all the glyphs that have special definitions.
-            for glyphElement in instanceElement.findall('.glyphs/glyph'):
-                self.readGlyphElement(glyphElement, instanceObject)
+        return instanceObject
 
+    def _finishInstance(self, instanceElement, instanceObject, makeKerning=True, makeInfo=True):
+        """ Add the kerning, info, groups and lib to the instance and save it. """
         # read the kerning
         if makeKerning:
             for kerningElement in instanceElement.findall('.kerning'):
@@ -8,6 +8,7 @@ from fontMath.mathKerning import MathKerning
 from fontMath.mathInfo import MathInfo
 
 import defcon
+from ufoLib import UFOWriter
 
 class InstanceWriter(object):
     """ 
@@ -22,6 +23,7 @@ class InstanceWriter(object):
             Don't represent the data.
     """
     _fontClass = defcon.objects.font.Font
+    _glyphClass = defcon.objects.glyph.Glyph
     _tempFontLibGlyphMuteKey = "_mutatorMath.temp.mutedGlyphNames"
     
     def __init__(self, path, ufoVersion=1, roundGeometry=False, verbose=False, logger=None):
@@ -40,6 +42,17 @@ class InstanceWriter(object):
         self.verbose=verbose
         self.log = []
         self.logger=logger
+        self._glyphStream = None
+        self._glyphStreamWriter = None
+        self._streamedGlyphNames = set()
+
+    def startGlyphStream(self):
+        """ Write the glyphs to the instance UFO as soon as they are made,
+            instead of keeping them in the font until save().
+            This keeps the memory use bounded when many instances are built at once.
+        """
+        self._glyphStreamWriter = UFOWriter(self.path, formatVersion=self.ufoVersion)
+        self._glyphStream = self._glyphStreamWriter.getGlyphSet()
     
     def setSources(self, sources):
         """ Set a list of sources."""
@@ -55,7 +68,7 @@ class InstanceWriter(object):
         for name, members in groups.items():
             checked = []
             for m in members:
-                if m in self.font:
+                if m in self.font or m in self._streamedGlyphNames:
                     checked.append(m)
                 else:
                     skipping.append(m)
@@ -245,7 +258,7 @@ class InstanceWriter(object):
         instanceObject.extractKerning(self.font)
         # self.font.kerningGroupConversionRenameMaps = groupsProvider.font.kerningGroupConversionRenameMaps
         
-    def addGlyph(self, glyphName, unicodeValue=None, instanceLocation=None, sources=None, note=None):
+    def addGlyph(self, glyphName, unicodeValue=None, instanceLocation=None, sources=None, note=None, mutator=None, mutatorError=None):
         """
         Calculate a new glyph and add it to this instance.
         
@@ -254,9 +267,17 @@ class InstanceWriter(object):
         *   instanceLocation:   Location for this glyph
         *   sources:    List of sources for this glyph.
         *   note:   Note for this glyph.
+        *   mutator:    A mutator already built for the default sources of this glyph,
+                        as returned by buildGlyphMutator (optional).
+        *   mutatorError:   The error buildGlyphMutator raised for this glyph (optional).
+                        The glyph is then added without an outline, and the mutator is not built again.
         """
-        self.font.newGlyph(glyphName)
-        glyphObject = self.font[glyphName]
+        if self._glyphStream is None:
+            self.font.newGlyph(glyphName)
+            glyphObject = self.font[glyphName]
+        else:
+            glyphObject = self._glyphClass()
+            glyphObject.name = glyphName
         if note is not None:
             glyphObject.note = note
             # why does this not save?
@@ -264,42 +285,59 @@ class InstanceWriter(object):
             glyphObject.unicode = unicodeValue
         if instanceLocation is None:
             instanceLocation = self.locationObject
-        glyphMasters = []
         if sources is None:
             # glyph has no special requests, add the default sources
-            #sources = self.sources
-            for sourceName, (source, sourceLocation) in self.sources.items():
-                if glyphName in self.muted['glyphs'].get(sourceName, []):
-                    # this glyph in this master was muted, so do not add.
-                    continue
-                d = dict(   font=source,
-                            location=sourceLocation,
-                            glyphName=glyphName)
-                glyphMasters.append(d)
+            glyphMasters = self._getDefaultGlyphMasters(glyphName)
         else:
             # use the glyph sources provided
             self.logger.info("glyph %s has special masters %s", glyphName, sources)
             glyphMasters = sources
         # make the glyphs
-        try:
-            self._calculateGlyph(glyphObject, instanceLocation, glyphMasters)
-        except:
-            # probably a compatibility error.
-            # do we need to make more checks?
-            # print("Error while calculating glyph %s"%glyphName, glyphMasters)
+        if mutatorError is not None and sources is None:
             self.log.append("\t\tError making glyph %s"%(glyphName))
-    
-    def _calculateGlyph(self, targetGlyphObject, instanceLocationObject, glyphMasters):
+        else:
+            try:
+                if mutator is not None and sources is None:
+                    self._makeGlyphInstance(glyphObject, instanceLocation, mutator)
+                else:
+                    self._calculateGlyph(glyphObject, instanceLocation, glyphMasters)
+            except:
+                # probably a compatibility error.
+                # do we need to make more checks?
+                # print("Error while calculating glyph %s"%glyphName, glyphMasters)
+                self.log.append("\t\tError making glyph %s"%(glyphName))
+        if self._glyphStream is not None:
+            self._glyphStream.writeGlyph(glyphName, glyphObject, glyphObject.drawPoints)
+            self._streamedGlyphNames.add(glyphName)
+
+    def _getDefaultGlyphMasters(self, glyphName):
+        """ Return the glyph masters for this glyph from the default sources. """
+        glyphMasters = []
+        for sourceName, (source, sourceLocation) in self.sources.items():
+            if glyphName in self.muted['glyphs'].get(sourceName, []):
+                # this glyph in this master was muted, so do not add.
+                continue
+            d = dict(   font=source,
+                        location=sourceLocation,
+                        glyphName=glyphName)
+            glyphMasters.append(d)
+        return glyphMasters
+
+    def buildGlyphMutator(self, glyphName):
         """
-        Build a Mutator object for this glyph.
+        Build the mutator for this glyph from the default sources.
+        Instances that share the sources can all use it with addGlyph(),
+        so the master glyphs are read and converted only once.
+        """
+        return self._buildGlyphMutator(self._getDefaultGlyphMasters(glyphName))
+
+    def _buildGlyphMutator(self, glyphMasters):
+        """
+        Build a Mutator object from the glyph masters.
 
-        *   name:   glyphName
-        *   location:   Location object
         *   glyphMasters:    dict with font objects.
         """
-        sources = None
         items = []
-
         for item in glyphMasters:
             locationObject = item['location']
             fontObject = item['font']
@@ -309,12 +347,35 @@ class InstanceWriter(object):
             glyphObject = MathGlyph(fontObject[glyphName])
             items.append((locationObject, glyphObject))
         bias, m = buildMutator(items)
-        instanceObject = m.makeInstance(instanceLocationObject)
+        return m
+
+    def _makeGlyphInstance(self, targetGlyphObject, instanceLocationObject, mutator):
+        """ Calculate the glyph at this location with the mutator, and extract it into the target glyph. """
+        instanceObject = mutator.makeInstance(instanceLocationObject)
         if self.roundGeometry:
             instanceObject = instanceObject.round()
         instanceObject.extractGlyph(targetGlyphObject, onlyGeometry=True)
+
+    def _calculateGlyph(self, targetGlyphObject, instanceLocationObject, glyphMasters):
+        """
+        Build a Mutator object for this glyph.
+
+        *   name:   glyphName
+        *   location:   Location object
+        *   glyphMasters:    dict with font objects.
+        """
+        m = self._buildGlyphMutator(glyphMasters)
+        self._makeGlyphInstance(targetGlyphObject, instanceLocationObject, m)
         
     def save(self):
         """ Save the UFO."""
+        if self._glyphStream is not None:
+            # the font saves its other data and the glyphs
+            # it has next to the glyphs already written.
+            self._glyphStream.writeContents()
+            # UFO3 needs the layer contents before the font can open the UFO again.
+            self._glyphStreamWriter.writeLayerContents([None])
+            self._glyphStream = None
+            self._glyphStreamWriter = None
         self.font.save(self.path, self.ufoVersion)
         
@@ -12,6 +12,7 @@ glyph data. See the class doc string for details.
 """
 
 import os
+import time
 from cStringIO import StringIO
 from warnings import warn
 from xmlTreeBuilder import buildTree, stripCharacterData
@@ -125,6 +126,10 @@ class GlyphSet(object):
 		if glyphNameToFileNameFunc is None:
 			glyphNameToFileNameFunc = glyphNameToFileName
 		self.glyphNameToFileName = glyphNameToFileNameFunc
+		self._contentsStamp = None
+		self._validatedContents = None
+		self.contentsReadTime = 0
+		self.contentsValidationTime = 0
 		self.rebuildContents()
 		self._reverseContents = None
 		self._glifCache = {}
@@ -132,29 +137,70 @@ class GlyphSet(object):
 	def rebuildContents(self):
 		"""
 		Rebuild the contents dict by loading contents.plist.
+
+		The existence of the referenced files is checked against a single
+		listing of the directory. If neither contents.plist nor the directory
+		changed since the last rebuild, the contents validated then are reused.
+		The time spent reading and validating contents.plist is stored in
+		the contentsReadTime and contentsValidationTime attributes.
 		"""
 		contentsPath = os.path.join(self.dirName, "contents.plist")
-		if not os.path.exists(contentsPath):
+		start = time.time()
+		stamp = self._getContentsStamp(contentsPath)
+		if stamp is not None and stamp == self._contentsStamp:
+			self.contents = dict(self._validatedContents)
+			self._reverseContents = None
+			self.contentsReadTime = time.time() - start
+			self.contentsValidationTime = 0
+			return
+		if stamp is None:
 			# missing, consider the glyphset empty.
 			contents = {}
 		else:
 			contents = self._readPlist(contentsPath)
+		self.contentsReadTime = time.time() - start
+		start = time.time()
 		# validate the contents
 		invalidFormat = False
 		if not isinstance(contents, dict):
 			invalidFormat = True
 		else:
+			fileNames = None
+			if contents:
+				fileNames = set(os.listdir(self.dirName))
 			for name, fileName in contents.items():
 				if not isinstance(name, basestring):
 					invalidFormat = True
 				if not isinstance(fileName, basestring):
 					invalidFormat = True
-				elif not os.path.exists(os.path.join(self.dirName, fileName)):
+				elif fileName not in fileNames and not os.path.exists(os.path.join(self.dirName, fileName)):
+					# the listing can differ in case or normalization
+					# from the file name, so check the file itself.
 					raise GlifLibError("contents.plist references a file that does not exist: %s" % fileName)
 		if invalidFormat:
 			raise GlifLibError("contents.plist is not properly formatted")
+		self.contentsValidationTime = time.time() - start
 		self.contents = contents
 		self._reverseContents = None
+		# only reuse the validated contents if the modification times are
+		# old enough for a later change to show up in them.
+		if stamp is not None and time.time() - max(stamp[0], stamp[2]) > 2:
+			self._contentsStamp = stamp
+			self._validatedContents = dict(contents)
+		else:
+			self._contentsStamp = None
+			self._validatedContents = None
+
+	def _getContentsStamp(self, contentsPath):
+		"""
+		Return the modification time and size of contents.plist and the
+		modification time of the directory, or None if there is no contents.plist.
+		"""
+		try:
+			st = os.stat(contentsPath)
+		except OSError:
+			return None
+		return st.st_mtime, st.st_size, os.stat(self.dirName).st_mtime
 
 	def getReverseContents(self):
 		"""
@@ -254,12 +300,14 @@ class GlyphSet(object):
 			needRead = True
 		if needRead:
 			fileName = self.contents[glyphName]
-			if not os.path.exists(path):
+			try:
+				f = open(path, "rb")
+			except IOError:
 				raise KeyError, glyphName
-			f = open(path, "rb")
 			text = f.read()
+			modTime = os.fstat(f.fileno()).st_mtime
 			f.close()
-			self._glifCache[glyphName] = (text, os.path.getmtime(path))
+			self._glifCache[glyphName] = (text, modTime)
 		return self._glifCache[glyphName][0]
 
 	def getGLIFModificationTime(self, glyphName):
@@ -4,7 +4,7 @@ import shutil
 import unittest
 
 from robofab.test.testSupport import getDemoFontGlyphSetPath
-from ufoLib.glifLib import GlyphSet, glyphNameToFileName, READ_MODE
+from ufoLib.glifLib import GlyphSet, GlifLibError, glyphNameToFileName, READ_MODE
 from robofab.tools.glyphNameSchemes import glyphNameToShortFileName
 
 
@@ -42,6 +42,26 @@ class GlyphSetTests(unittest.TestCase):
 		gset.rebuildContents()
 		self.assertEqual(contents, gset.contents)
 
+	def testRebuildContentsMissingFile(self):
+		class _Glyph(object):
+			width = 500
+		dst = GlyphSet(self.dstDir)
+		for glyphName in ["a", "b", "c"]:
+			dst.writeGlyph(glyphName, _Glyph())
+		dst.writeContents()
+		# make the contents old enough to be reused
+		past = os.path.getmtime(self.dstDir) - 10
+		os.utime(os.path.join(self.dstDir, "contents.plist"), (past, past))
+		os.utime(self.dstDir, (past, past))
+		dst.rebuildContents()
+		contents = dict(dst.contents)
+		dst.contents["b"] = "x.glif"
+		dst.rebuildContents()
+		self.assertEqual(contents, dst.contents)
+		self.assertEqual(dst.contentsValidationTime, 0)
+		os.remove(os.path.join(self.dstDir, contents["a"]))
+		self.assertRaises(GlifLibError, dst.rebuildContents)
+
 	def testReverseContents(self):
 		gset = GlyphSet(GLYPHSETDIR)
 		d = {}